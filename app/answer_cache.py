@@ -0,0 +1,165 @@
+"""
+Answer Cache - Ponowne użycie zapisanych odpowiedzi dla podobnych zadań
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterable
+
+from app.rate_limit import estimate_tokens
+
+
+class SemanticAnswerCache:
+    """
+    Cache odpowiedzi oparty o pamięć interakcji
+
+    Zadanie jest porównywane (embedding zadania, podobieństwo kosinusowe)
+    z zadaniami zapisanymi w pamięci użytkownika. Jeśli najbliższe udane
+    zadanie przekracza `threshold` i jest nie starsze niż `max_age`,
+    zwracany jest zapisany wynik zamiast wywołania providera.
+
+    Pod uwagę brane są tylko odpowiedzi providerów routera (`providers`) -
+    wyniki podsumowań, tłumaczeń czy code review z tych samych tekstów
+    nie są odpowiedziami na zadanie.
+    """
+
+    def __init__(
+        self,
+        memory=None,
+        threshold: float = 0.92,
+        max_age: float = 86400,
+        same_provider: bool = True,
+        enabled: bool = True,
+        providers: Optional[Iterable[str]] = None
+    ):
+        """
+        Inicjalizacja
+        Args:
+            memory: ShardedMemory (None = cache wyłączony)
+            threshold: Minimalne podobieństwo zadań (0-1)
+            max_age: Maksymalny wiek zapisanej odpowiedzi (s, 0 = bez limitu)
+            same_provider: Tylko odpowiedzi tego samego providera (execute i execute_auto)
+            enabled: Włącz cache
+            providers: Providery, których odpowiedzi można zwrócić (None = dowolne)
+        """
+        self.memory = memory
+        self.threshold = threshold
+        self.max_age = max_age
+        self.same_provider = same_provider
+        self.enabled = enabled
+        self.providers = frozenset(providers) if providers is not None else None
+
+        self.lookups = 0
+        self.hits = 0
+        self.cost_saved = 0.0
+        self.tokens_saved = 0
+
+    @classmethod
+    def from_env(cls, memory=None, providers: Optional[Iterable[str]] = None) -> "SemanticAnswerCache":
+        """Konfiguracja z ANSWER_CACHE_ENABLED / _THRESHOLD / _MAX_AGE / _SAME_PROVIDER"""
+        return cls(
+            memory,
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92")),
+            max_age=float(os.getenv("ANSWER_CACHE_MAX_AGE", "86400")),
+            same_provider=os.getenv("ANSWER_CACHE_SAME_PROVIDER", "true").lower() == "true",
+            enabled=os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true",
+            providers=providers
+        )
+
+    def _reusable(self, candidate: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Wynik w kształcie odpowiedzi execute lub None
+
+        Tylko udane, niepochodzące z cache odpowiedzi providerów routera.
+        Zapisy z `content` (stream, Perplexity) są zamieniane na `result`.
+        """
+        result = candidate["result"]
+        if self.providers is not None and candidate["provider"] not in self.providers:
+            return None
+        if (
+            not isinstance(result, dict)
+            or not result.get("success", True)
+            or "error" in result
+            or result.get("cached")
+        ):
+            return None
+        if "result" in result:
+            return result
+        if not isinstance(result.get("content"), str):
+            return None
+        return {
+            "provider": candidate["provider"],
+            "task": candidate["task"],
+            "result": result["content"],
+            "model": result.get("model"),
+            "success": True,
+            "timestamp": candidate["timestamp"]
+        }
+
+    async def lookup(
+        self, task: str, provider: Optional[str] = None, cost: float = 0.0, user: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Znajdź zapisaną odpowiedź dla podobnego zadania
+
+        Args:
+            task: Zadanie
+            provider: Provider, który zostałby wywołany (None = dowolny)
+            cost: Koszt wywołania providera (jednostki tieru routera)
+            user: Użytkownik - szukamy tylko w jego pamięci
+
+        Returns:
+            Zapisany wynik z "cached": True lub None
+        """
+        if not self.enabled or self.memory is None:
+            return None
+
+        self.lookups += 1
+        since = None
+        if self.max_age:
+            since = (datetime.now() - timedelta(seconds=self.max_age)).isoformat()
+
+        try:
+            candidates = await self.memory.similar_tasks(
+                task,
+                user=user,
+                k=5,
+                provider=provider if self.same_provider else None,
+                since=since,
+                min_score=self.threshold
+            )
+        except Exception as e:
+            print(f"⚠️ Błąd cache odpowiedzi: {e}")
+            return None
+
+        for candidate in candidates:
+            result = self._reusable(candidate)
+            if result is None:
+                continue
+            self.hits += 1
+            self.cost_saved += cost
+            self.tokens_saved += estimate_tokens(task + str(result["result"]))
+            return {
+                **result,
+                "cached": True,
+                "cache": {
+                    "score": candidate["score"],
+                    "task": candidate["task"],
+                    "provider": candidate["provider"],
+                    "stored_at": candidate["timestamp"]
+                }
+            }
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki cache"""
+        return {
+            "enabled": self.enabled and self.memory is not None,
+            "threshold": self.threshold,
+            "max_age": self.max_age,
+            "same_provider": self.same_provider,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "cost_saved": round(self.cost_saved, 4),
+            "tokens_saved": self.tokens_saved
+        }
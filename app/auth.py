@@ -7,10 +7,12 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import jwt
 from typing import Optional
 import os
 
+from app.request_user import SECRET_KEY, ALGORITHM, JWT_ENABLED, verify_token  # noqa: F401
+
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./users.db")
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
@@ -20,9 +22,7 @@ Base = declarative_base()
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# JWT settings
-SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-this")
-ALGORITHM = "HS256"
+# JWT settings (SECRET_KEY / ALGORITHM w app.request_user)
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 dni
 
 
@@ -70,13 +70,26 @@ class User(Base):
     chrome_session_token = Column(String, default=None)
 
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+_schema_ready = False
+
+
+def init_db():
+    """Utwórz tabele przy pierwszym użyciu (import modułu nie tworzy pliku bazy)"""
+    global _schema_ready
+    if not _schema_ready:
+        Base.metadata.create_all(bind=engine)
+        _schema_ready = True
+
+
+def open_session() -> Session:
+    """Nowa sesja bazy (ze schematem)"""
+    init_db()
+    return SessionLocal()
 
 
 def get_db():
     """Dependency dla SessionLocal"""
-    db = SessionLocal()
+    db = open_session()
     try:
         yield db
     finally:
@@ -94,7 +107,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def create_access_token(username: str, expires_delta: Optional[timedelta] = None) -> str:
-    """Create JWT token"""
+    """
+    Create JWT token
+    
+    Raises:
+        RuntimeError: SECRET_KEY nieustawiony lub domyślny (token dałoby się podrobić)
+    """
+    if not JWT_ENABLED:
+        raise RuntimeError("JWT wyłączone: ustaw SECRET_KEY")
     to_encode = {"sub": username}
     
     if expires_delta:
@@ -108,18 +128,6 @@ def create_access_token(username: str, expires_delta: Optional[timedelta] = None
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify JWT token and return username"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
-    except JWTError:
-        return None
-
-
 def create_user(db: Session, username: str, email: str, password: str) -> User:
     """Create new user"""
     user = User(
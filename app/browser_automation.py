@@ -1,50 +1,220 @@
 """
 Browser Automation - Kontrola przeglądarki za pomocą Playwright
 """
-from typing import Optional, Dict, Any
-from datetime import datetime
+import asyncio
+from typing import Optional, List, Dict, Any
+
+from app.browser_pool import BrowserPool, PooledContext, PLAYWRIGHT_AVAILABLE
+from app.browser_profiles import NavigationProfile, ProfileStats, PROFILES, profiled, resolve_profile
+from app.browser_script import BrowserStep, run_steps
+from app.page_cache import PageCache, normalize_url
+from app.singleflight import SingleFlight
 
 
 class BrowserAutomation:
-    """Obsługa automatyzacji przeglądarki"""
+    """
+    Obsługa automatyzacji przeglądarki
+    
+    Każda operacja wypożycza kontekst z puli (BrowserPool), więc wiele
+    żądań działa równolegle zamiast czekać na jedną stronę. Bez
+    `session_id` operacja dostaje czysty kontekst (click / fill mogą
+    wtedy najpierw przejść na `url`); z `session_id` kolejne operacje
+    działają na tej samej stronie.
+    """
     
-    def __init__(self):
-        """Inicjalizacja"""
-        self.browser = None
-        self.page = None
+    def __init__(self, pool: Optional[BrowserPool] = None):
+        """
+        Inicjalizacja
+        Args:
+            pool: Pula przeglądarek (None = z konfiguracji BROWSER_POOL_*)
+        """
+        self.pool = pool or BrowserPool.from_env()
+        self.profile_stats = ProfileStats()
+        self.page_cache = PageCache.from_env()
+        self._renders = SingleFlight()
         self.init_status = "initialized"
     
-    async def navigate(self, url: str) -> bool:
-        """Nawiguj na stronę"""
+    async def start(self):
+        """Rozgrzej pulę (błąd nie blokuje startu aplikacji - pula spróbuje przy pierwszym użyciu)"""
+        if not PLAYWRIGHT_AVAILABLE:
+            print("⚠️ Playwright niedostępny - automatyzacja przeglądarki wyłączona")
+            return
+        try:
+            await self.pool.start()
+        except Exception as e:
+            print(f"⚠️ Nie udało się uruchomić puli przeglądarek: {e}")
+    
+    @staticmethod
+    async def _page_info(pooled: PooledContext) -> Dict[str, Any]:
+        return {"page_url": pooled.page.url, "title": await pooled.page.title()}
+    
+    async def navigate(
+        self, url: str, session_id: Optional[str] = None, profile: Optional[NavigationProfile] = None
+    ) -> Dict[str, Any]:
+        """
+        Nawiguj na stronę
+        
+        Args:
+            profile: Profil nawigacji (blokowane zasoby, wait_until); None = BROWSER_NAV_PROFILE
+        """
         try:
-            # Placeholder dla rzeczywistej implementacji Playwright
-            return True
+            profile = profile or resolve_profile()
+            async with self.pool.lease(session_id) as pooled:
+                async with profiled(pooled.page, profile, self.profile_stats) as metrics:
+                    response = await pooled.page.goto(url, wait_until=profile.wait_until)
+                return {
+                    "success": True,
+                    "status": response.status if response is not None else None,
+                    **await self._page_info(pooled),
+                    "navigation": self.profile_stats.record(profile, metrics)
+                }
         except Exception as e:
             print(f"❌ Błąd nawigacji: {e}")
-            return False
+            return {"success": False, "error": str(e)}
     
-    async def click(self, selector: str) -> bool:
-        """Kliknij na element"""
+    async def click(self, selector: str, session_id: Optional[str] = None, url: Optional[str] = None) -> Dict[str, Any]:
+        """Kliknij na element (opcjonalnie po przejściu na `url`)"""
         try:
-            # Placeholder dla rzeczywistej implementacji
-            return True
+            async with self.pool.lease(session_id) as pooled:
+                if url:
+                    await pooled.page.goto(url)
+                await pooled.page.click(selector)
+                return {"success": True, **await self._page_info(pooled)}
         except Exception as e:
             print(f"❌ Błąd klikania: {e}")
-            return False
+            return {"success": False, "error": str(e)}
     
-    async def fill(self, selector: str, text: str) -> bool:
-        """Wpisz tekst w pole"""
+    async def fill(
+        self, selector: str, text: str, session_id: Optional[str] = None, url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Wpisz tekst w pole (opcjonalnie po przejściu na `url`)"""
         try:
-            # Placeholder
-            return True
+            async with self.pool.lease(session_id) as pooled:
+                if url:
+                    await pooled.page.goto(url)
+                await pooled.page.fill(selector, text)
+                return {"success": True, **await self._page_info(pooled)}
         except Exception as e:
             print(f"❌ Błąd wypełniania: {e}")
-            return False
+            return {"success": False, "error": str(e)}
+    
+    async def extract(
+        self,
+        url: str,
+        profile: Optional[NavigationProfile] = None,
+        include_html: bool = False,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Treść strony (tytuł, tekst, opcjonalnie HTML)
+        
+        Najpierw cache stron: świeży wpis lub wpis potwierdzony warunkowym
+        GET (304) jest zwracany bez uruchamiania przeglądarki. W przeciwnym
+        razie strona jest renderowana w czystym kontekście z puli, a wynik
+        zapisywany razem z ETag / Last-Modified dokumentu - osobno dla
+        każdej konfiguracji profilu (także z nadpisaniami). Równoczesne
+        żądania tej samej strony czekają na jeden render.
+        """
+        profile = profile or resolve_profile()
+        if use_cache:
+            cached = await self.page_cache.get(url, need_html=include_html, variant=profile.fingerprint)
+            if cached is not None:
+                return {"success": True, **cached}
+        
+        key = f"{normalize_url(url)}|{profile.fingerprint}|{int(include_html)}"
+        return await self._renders.do(key, lambda: self._render(url, profile, include_html))
+    
+    async def _render(self, url: str, profile: NavigationProfile, include_html: bool) -> Dict[str, Any]:
+        try:
+            async with self.pool.lease() as pooled:
+                page = pooled.page
+                async with profiled(page, profile, self.profile_stats) as metrics:
+                    response = await page.goto(url, wait_until=profile.wait_until)
+                content = {
+                    "url": page.url,
+                    "title": await page.title(),
+                    "text": await page.inner_text("body")
+                }
+                if include_html:
+                    content["html"] = await page.content()
+            status = response.status if response is not None else None
+            if status == 200:
+                self.page_cache.put(url, content, response.headers, variant=profile.fingerprint)
+            return {
+                "success": True,
+                **content,
+                "status": status,
+                "cache": {"status": "miss"},
+                "navigation": self.profile_stats.record(profile, metrics)
+            }
+        except Exception as e:
+            print(f"❌ Błąd ekstrakcji: {e}")
+            return {"success": False, "url": url, "error": str(e)}
+    
+    async def run_script(
+        self,
+        steps: List[BrowserStep],
+        session_id: Optional[str] = None,
+        profile: Optional[NavigationProfile] = None
+    ) -> Dict[str, Any]:
+        """
+        Wykonaj zwalidowany skrypt (parse_script) na jednej wypożyczonej stronie
+        
+        Kroki idą po kolei do pierwszego błędu; wynik zawiera czas każdego
+        kroku. Profil nawigacji obowiązuje przez cały skrypt.
+        """
+        try:
+            profile = profile or resolve_profile()
+            async with self.pool.lease(session_id) as pooled:
+                async with profiled(pooled.page, profile, self.profile_stats) as metrics:
+                    result = await run_steps(pooled.page, steps, wait_until=profile.wait_until)
+                return {
+                    **result,
+                    **await self._page_info(pooled),
+                    "navigation": self.profile_stats.record(profile, metrics)
+                }
+        except Exception as e:
+            print(f"❌ Błąd skryptu przeglądarki: {e}")
+            return {"success": False, "steps": [], "failed_step": None, "error": str(e)}
+    
+    async def run_scripts(self, scripts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Wykonaj niezależne skrypty równolegle (każdy na własnej stronie z puli)
+        
+        Args:
+            scripts: Lista {"steps": [BrowserStep], "session_id", "profile": opcjonalnie}
+        """
+        return await asyncio.gather(*(
+            self.run_script(script["steps"], session_id=script.get("session_id"), profile=script.get("profile"))
+            for script in scripts
+        ))
+    
+    async def close_session(self, session_id: str) -> bool:
+        """Zamknij sesję przeglądarki"""
+        return await self.pool.close_session(session_id)
+    
+    def page_cache_stats(self) -> Dict[str, Any]:
+        """Statystyki cache stron"""
+        return self.page_cache.stats()
+    
+    async def invalidate_pages(self, url: Optional[str] = None) -> int:
+        """Usuń stronę z cache (None = cały cache); zwraca liczbę usuniętych wpisów"""
+        return self.page_cache.invalidate(url)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki puli przeglądarek"""
+        return self.pool.stats()
+    
+    def profiles(self) -> Dict[str, Any]:
+        """Dostępne profile nawigacji i ich statystyki (czas ładowania, bajty, oszczędności)"""
+        return {
+            "profiles": {name: profile.to_dict() for name, profile in PROFILES.items()},
+            "stats": self.profile_stats.stats()
+        }
     
     async def cleanup(self):
         """Wyczyść zasoby"""
         try:
-            if self.browser:
-                await self.browser.close()
+            await self.pool.close()
         except Exception as e:
             print(f"⚠️ Błąd czyszczenia: {e}")
@@ -0,0 +1,625 @@
+"""
+Browser Fleet - Wieloprocesowa flota workerów przeglądarki (procesy na wielu rdzeniach)
+"""
+import os
+import time
+import zlib
+import signal
+import asyncio
+import itertools
+import threading
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import Optional, List, Dict, Any, Tuple, Union
+
+from app.browser_automation import BrowserAutomation
+from app.browser_pool import PLAYWRIGHT_AVAILABLE
+from app.browser_profiles import NavigationProfile, PROFILES
+from app.browser_script import BrowserStep
+from app.page_cache import normalize_url
+
+
+# Liczniki puli sumowane między workerami
+_POOL_COUNTERS = (
+    "capacity", "idle", "leased", "sessions", "leases", "waits",
+    "launched", "created", "recycled", "discarded", "health_failures"
+)
+_CACHE_COUNTERS = (
+    "entries", "max_entries", "bytes", "max_bytes", "hits", "revalidated", "changed",
+    "misses", "evictions", "expirations", "revalidation_errors", "uncacheable"
+)
+
+# Komunikat rodzica: (_CANCEL, job_id) - przerwij zadanie, na które nikt już nie czeka
+_CANCEL = "cancel"
+
+
+# ==================== PROCES WORKERA ====================
+
+def _worker_main(index: int, conn: Connection):
+    """Punkt wejścia procesu workera (start metodą spawn)"""
+    # Ctrl+C trafia do całej grupy procesów - workery zamyka rodzic
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve(index, conn))
+
+
+async def _serve(index: int, conn: Connection):
+    """
+    Pętla workera: zadania z potoku wykonywane współbieżnie na własnej
+    puli przeglądarek (BROWSER_POOL_* obowiązuje per worker)
+    """
+    loop = asyncio.get_running_loop()
+    automation = BrowserAutomation()
+    await automation.start()
+    conn.send((None, True, os.getpid()))
+    tasks: Dict[int, asyncio.Task] = {}
+
+    def reply(message: Tuple[Any, bool, Any]):
+        try:
+            conn.send(message)
+        except OSError:
+            pass  # rodzic zniknął
+        except Exception as e:
+            # Wynik nie daje się zserializować
+            conn.send((message[0], False, f"{type(e).__name__}: {e}"))
+
+    async def handle(job_id: int, method: str, args: tuple, kwargs: dict):
+        try:
+            if method == "snapshot":
+                result = {
+                    "pool": automation.stats(),
+                    "profiles": automation.profile_stats.stats(),
+                    "page_cache": automation.page_cache_stats()
+                }
+            else:
+                result = await getattr(automation, method)(*args, **kwargs)
+            reply((job_id, True, result))
+        except Exception as e:
+            reply((job_id, False, f"{type(e).__name__}: {e}"))
+
+    try:
+        while True:
+            try:
+                job = await loop.run_in_executor(None, conn.recv)
+            except (EOFError, OSError):
+                break
+            if job is None:
+                break
+            if job[0] == _CANCEL:
+                # Anulowanie zwalnia kontekst puli (lease w finally); odpowiedzi już nie wysyłamy
+                task = tasks.get(job[1])
+                if task is not None:
+                    task.cancel()
+                continue
+            job_id = job[0]
+            task = asyncio.create_task(handle(*job))
+            tasks[job_id] = task
+            task.add_done_callback(lambda _, job_id=job_id: tasks.pop(job_id, None))
+        if tasks:
+            await asyncio.wait(list(tasks.values()), timeout=10)
+    finally:
+        await automation.cleanup()
+
+
+# ==================== AGREGACJA METRYK ====================
+
+def _merge_pool(snapshots: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+    pools = [(index, snapshot["pool"]) for index, snapshot in snapshots]
+    merged: Dict[str, Any] = {key: sum(pool.get(key, 0) for _, pool in pools) for key in _POOL_COUNTERS}
+    waits = merged["waits"]
+    merged["available"] = PLAYWRIGHT_AVAILABLE
+    merged["started"] = bool(pools) and all(pool["started"] for _, pool in pools)
+    merged["avg_wait_ms"] = round(
+        sum(pool["avg_wait_ms"] * pool["waits"] for _, pool in pools) / waits, 2
+    ) if waits else 0.0
+    merged["browsers"] = [{"worker": index, **browser} for index, pool in pools for browser in pool["browsers"]]
+    return merged
+
+
+def _merge_profiles(snapshots: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Średnie per profil ważone liczbą nawigacji workerów"""
+    totals: Dict[str, Dict[str, float]] = {}
+    for _, snapshot in snapshots:
+        for name, entry in snapshot["profiles"].items():
+            n = entry["navigations"]
+            total = totals.setdefault(name, {
+                "navigations": 0, "load_ms": 0.0, "bytes": 0, "requests": 0.0, "blocked": 0, "bytes_saved_est": 0
+            })
+            total["navigations"] += n
+            total["load_ms"] += entry["avg_load_ms"] * n
+            total["bytes"] += entry["avg_bytes"] * n
+            total["requests"] += entry["avg_requests"] * n
+            total["blocked"] += entry["blocked"]
+            total["bytes_saved_est"] += entry["bytes_saved_est"]
+    return {
+        name: {
+            "navigations": total["navigations"],
+            "avg_load_ms": round(total["load_ms"] / total["navigations"], 2),
+            "avg_bytes": int(total["bytes"] / total["navigations"]),
+            "avg_requests": round(total["requests"] / total["navigations"], 1),
+            "blocked": total["blocked"],
+            "bytes_saved_est": total["bytes_saved_est"]
+        }
+        for name, total in totals.items() if total["navigations"]
+    }
+
+
+def _merge_cache(snapshots: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+    caches = [snapshot["page_cache"] for _, snapshot in snapshots]
+    merged: Dict[str, Any] = {key: sum(cache.get(key, 0) for cache in caches) for key in _CACHE_COUNTERS}
+    lookups = merged["hits"] + merged["misses"]
+    merged["hit_rate"] = round(merged["hits"] / lookups, 4) if lookups else 0.0
+    if caches:
+        merged.update(enabled=caches[0]["enabled"], ttl=caches[0]["ttl"], max_age=caches[0]["max_age"])
+    return merged
+
+
+# ==================== FLOTA ====================
+
+class _Worker:
+    """Proces workera i jego zadania w locie"""
+
+    __slots__ = (
+        "index", "process", "conn", "generation", "pid", "up", "ready", "pending",
+        "started", "jobs", "failures", "crashes", "restarts", "backoff", "snapshot",
+        "missed", "hangs", "cancelled"
+    )
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn: Optional[Connection] = None
+        self.generation = 0
+        self.pid: Optional[int] = None
+        self.up = False
+        self.ready = False
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.started = 0.0
+        self.jobs = 0
+        self.failures = 0
+        self.crashes = 0
+        self.restarts = 0
+        self.backoff = 0.0
+        self.snapshot: Optional[Dict[str, Any]] = None
+        # Kolejne migawki bez odpowiedzi (zawieszony proces nie daje EOF)
+        self.missed = 0
+        self.hangs = 0
+        self.cancelled = 0
+
+
+class BrowserFleet:
+    """
+    Flota procesów przeglądarki z interfejsem BrowserAutomation
+
+    Jeden proces Pythona z Playwright zatyka jeden rdzeń (DOM, zdarzenia,
+    serializacja protokołu). Flota uruchamia `workers` procesów (spawn),
+    każdy z własną pulą przeglądarek i pętlą asyncio; zadania idą przez
+    potok IPC i są wykonywane współbieżnie w workerze.
+
+    - routing: operacje z `session_id` są przyklejone do workera, który
+      obsłużył sesję pierwszy (stan strony żyje tylko tam); `extract` idzie
+      do workera wybranego hashem URL (jego cache stron i koalescencja
+      renderów), pozostałe - do workera z najmniejszą liczbą zadań w locie
+    - awaria: wyjście procesu (EOF potoku) kończy błędem jego
+      zadania w locie, zrywa przyklejone sesje i uruchamia workera ponownie
+      (z narastającym opóźnieniem przy awariach tuż po starcie); worker,
+      który `hung_after` razy z rzędu nie odda migawki metryk, jest
+      zabijany i przechodzi tę samą ścieżkę
+    - timeout lub anulowanie zadania po stronie rodzica wysyła do workera
+      anulowanie - zadanie nie trzyma dalej kontekstu puli
+    - metryki: migawki puli, profili i cache pobierane z workerów co
+      `stats_interval` s i agregowane (sumy, średnie ważone)
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        job_timeout: float = 120,
+        stats_interval: float = 5,
+        session_ttl: float = 600,
+        max_backoff: float = 30,
+        hung_after: int = 3
+    ):
+        """
+        Inicjalizacja
+        Args:
+            workers: Liczba procesów workerów
+            job_timeout: Maksymalny czas zadania (s)
+            stats_interval: Co ile sekund odświeżać metryki workerów
+            session_ttl: Po jakim czasie bezczynności zapomnieć przyklejenie sesji (s)
+            max_backoff: Maksymalne opóźnienie restartu po awarii (s)
+            hung_after: Po ilu kolejnych nieudanych migawkach worker jest uznany za zawieszony (0 = nigdy)
+        """
+        self.size = workers
+        self.job_timeout = job_timeout
+        self.stats_interval = stats_interval
+        self.session_ttl = session_ttl
+        self.max_backoff = max_backoff
+        self.hung_after = hung_after
+        self._workers = [_Worker(i) for i in range(workers)]
+        self._sessions: Dict[str, Tuple[int, float]] = {}
+        self._ids = itertools.count(1)
+        self._mp = multiprocessing.get_context("spawn")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._closing = False
+        self.sessions_lost = 0
+        self.init_status = "initialized"
+
+    @classmethod
+    def from_env(cls) -> "BrowserFleet":
+        """
+        Konfiguracja z BROWSER_WORKERS ("auto" = liczba rdzeni, 0 = bez floty)
+        i BROWSER_WORKER_*
+        """
+        workers = os.getenv("BROWSER_WORKERS", "0").strip().lower()
+        return cls(
+            workers=(os.cpu_count() or 1) if workers == "auto" else int(workers or 0),
+            job_timeout=float(os.getenv("BROWSER_WORKER_JOB_TIMEOUT", "120")),
+            stats_interval=float(os.getenv("BROWSER_WORKER_STATS_INTERVAL", "5")),
+            session_ttl=float(os.getenv("BROWSER_SESSION_TTL", "600")),
+            max_backoff=float(os.getenv("BROWSER_WORKER_MAX_BACKOFF", "30")),
+            hung_after=int(os.getenv("BROWSER_WORKER_HUNG_AFTER", "3"))
+        )
+
+    # ==================== CYKL ŻYCIA ====================
+
+    async def start(self):
+        """Uruchom procesy workerów (gotowość zgłaszają asynchronicznie)"""
+        if not PLAYWRIGHT_AVAILABLE:
+            print("⚠️ Playwright niedostępny - flota przeglądarek wyłączona")
+            return
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            self._spawn(worker)
+        self._monitor = asyncio.create_task(self._monitor_loop())
+        print(f"🌐 Flota przeglądarek: {self.size} procesów workerów")
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._mp.Pipe()
+        process = self._mp.Process(
+            target=_worker_main, args=(worker.index, child_conn),
+            name=f"browser-worker-{worker.index}", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker.process = process
+        worker.conn = parent_conn
+        worker.generation += 1
+        worker.up = True
+        worker.ready = False
+        worker.missed = 0
+        worker.started = time.monotonic()
+        threading.Thread(
+            target=self._read_loop, args=(worker, worker.generation, parent_conn, process),
+            name=f"browser-worker-{worker.index}-reader", daemon=True
+        ).start()
+
+    def _read_loop(self, worker: _Worker, generation: int, conn: Connection, process):
+        """Wątek czytający odpowiedzi jednego procesu; EOF = proces zakończony"""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._on_message, worker, generation, message)
+        process.join()
+        self._loop.call_soon_threadsafe(self._on_exit, worker, generation)
+
+    def _on_message(self, worker: _Worker, generation: int, message: Tuple[Any, bool, Any]):
+        if generation != worker.generation:
+            return
+        job_id, ok, payload = message
+        if job_id is None:
+            worker.ready = True
+            worker.pid = payload
+            asyncio.ensure_future(self._refresh(worker))
+            return
+        future = worker.pending.pop(job_id, None)
+        if future is None or future.done():
+            return
+        worker.jobs += 1
+        if ok:
+            future.set_result(payload)
+        else:
+            worker.failures += 1
+            future.set_exception(RuntimeError(payload))
+
+    def _on_exit(self, worker: _Worker, generation: int):
+        if generation != worker.generation or self._closing:
+            return
+        worker.up = False
+        worker.ready = False
+        worker.crashes += 1
+        exitcode = worker.process.exitcode
+        error = RuntimeError(f"Worker przeglądarki {worker.index} zakończył działanie (kod {exitcode})")
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        worker.pending.clear()
+        try:
+            worker.conn.close()
+        except OSError:
+            pass
+        lost = [sid for sid, (index, _) in self._sessions.items() if index == worker.index]
+        for sid in lost:
+            del self._sessions[sid]
+        self.sessions_lost += len(lost)
+
+        # Awaria tuż po starcie (np. brak Chromium) - narastające opóźnienie zamiast pętli restartów
+        if time.monotonic() - worker.started < 30:
+            worker.backoff = min(max(worker.backoff * 2, 1.0), self.max_backoff)
+        else:
+            worker.backoff = 0.0
+        print(f"❌ Worker przeglądarki {worker.index} padł (kod {exitcode}), restart za {worker.backoff:.0f}s")
+        asyncio.ensure_future(self._restart(worker, worker.generation, worker.backoff))
+
+    async def _restart(self, worker: _Worker, generation: int, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        if self._closing or generation != worker.generation:
+            return
+        self._spawn(worker)
+        worker.restarts += 1
+
+    async def _monitor_loop(self):
+        """Odświeżanie metryk workerów i zapominanie nieaktywnych sesji"""
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            now = time.monotonic()
+            for sid in [sid for sid, (_, used) in self._sessions.items() if now - used > self.session_ttl]:
+                del self._sessions[sid]
+            await asyncio.gather(*(self._refresh(worker) for worker in self._workers if worker.ready))
+
+    async def _refresh(self, worker: _Worker):
+        generation = worker.generation
+        try:
+            worker.snapshot = await self._call(worker, "snapshot", timeout=self.stats_interval)
+            worker.missed = 0
+        except asyncio.TimeoutError:
+            if generation != worker.generation or not worker.up:
+                return
+            worker.missed += 1
+            if self.hung_after and worker.missed >= self.hung_after:
+                # Brak EOF - zabicie procesu uruchamia zwykłą ścieżkę awarii (_on_exit, restart)
+                print(f"⚠️ Worker przeglądarki {worker.index} nie odpowiada ({worker.missed} migawek) - restart")
+                worker.hangs += 1
+                worker.missed = 0
+                worker.process.kill()
+        except Exception:
+            pass
+
+    async def cleanup(self):
+        """Zamknij workery (każdy zamyka swoją pulę) i odrzuć zadania w locie"""
+        self._closing = True
+        if self._monitor:
+            self._monitor.cancel()
+            self._monitor = None
+        for worker in self._workers:
+            if worker.up:
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            await asyncio.to_thread(worker.process.join, 15)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            for future in worker.pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("Flota przeglądarek zamknięta"))
+            worker.pending.clear()
+            worker.up = False
+            worker.conn.close()
+
+    # ==================== ROUTING ====================
+
+    def _least_loaded(self) -> _Worker:
+        up = [worker for worker in self._workers if worker.up]
+        if not up:
+            raise RuntimeError("Brak działających workerów przeglądarki")
+        return min(up, key=lambda worker: len(worker.pending))
+
+    def _route(self, session_id: Optional[str] = None, key: Optional[str] = None) -> _Worker:
+        """Worker dla operacji: sesja przyklejona > hash klucza > najmniej obciążony"""
+        now = time.monotonic()
+        if session_id:
+            sticky = self._sessions.get(session_id)
+            if sticky is not None and self._workers[sticky[0]].up:
+                worker = self._workers[sticky[0]]
+            else:
+                worker = self._least_loaded()
+            self._sessions[session_id] = (worker.index, now)
+            return worker
+        if key is not None and self._workers:
+            worker = self._workers[zlib.crc32(key.encode()) % self.size]
+            if worker.up:
+                return worker
+        return self._least_loaded()
+
+    async def _call(self, worker: _Worker, method: str, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Wyślij zadanie do workera i poczekaj na wynik
+
+        Raises:
+            RuntimeError: Worker niedostępny, padł lub zadanie zgłosiło błąd
+            asyncio.TimeoutError: Przekroczony czas zadania
+        """
+        if self._closing or not worker.up:
+            raise RuntimeError(f"Worker przeglądarki {worker.index} niedostępny")
+        job_id = next(self._ids)
+        future = self._loop.create_future()
+        worker.pending[job_id] = future
+        try:
+            worker.conn.send((job_id, method, args, kwargs))
+        except Exception as e:
+            worker.pending.pop(job_id, None)
+            raise RuntimeError(f"Nie udało się wysłać zadania do workera {worker.index}: {e}")
+        try:
+            return await asyncio.wait_for(future, timeout or self.job_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._cancel(worker, job_id)
+            raise
+        finally:
+            # Spóźniona odpowiedź po timeoucie jest ignorowana
+            worker.pending.pop(job_id, None)
+
+    def _cancel(self, worker: _Worker, job_id: int):
+        """Przerwij zadanie w workerze (timeout / anulowanie po stronie rodzica)"""
+        if self._closing or not worker.up:
+            return
+        try:
+            worker.conn.send((_CANCEL, job_id))
+            worker.cancelled += 1
+        except (OSError, ValueError):
+            pass  # worker właśnie padł - jego zadania i tak przepadają
+
+    async def _dispatch(self, worker_fn, method: str, *args, **kwargs) -> Dict[str, Any]:
+        """Zadanie zwracające słownik wyniku; błędy floty jako {"success": False, "error"}"""
+        try:
+            worker = worker_fn()
+            result = await self._call(worker, method, *args, **kwargs)
+            return {**result, "worker": worker.index}
+        except asyncio.TimeoutError:
+            return {"success": False, "error": f"Przekroczony czas zadania ({self.job_timeout:.0f}s)"}
+        except Exception as e:
+            print(f"❌ Błąd floty przeglądarek ({method}): {e}")
+            return {"success": False, "error": str(e)}
+
+    # ==================== OPERACJE (interfejs BrowserAutomation) ====================
+
+    async def navigate(
+        self, url: str, session_id: Optional[str] = None, profile: Optional[NavigationProfile] = None
+    ) -> Dict[str, Any]:
+        """Nawiguj na stronę (w workerze sesji lub najmniej obciążonym)"""
+        return await self._dispatch(
+            lambda: self._route(session_id), "navigate", url, session_id=session_id, profile=profile
+        )
+
+    async def click(self, selector: str, session_id: Optional[str] = None, url: Optional[str] = None) -> Dict[str, Any]:
+        """Kliknij na element"""
+        return await self._dispatch(
+            lambda: self._route(session_id), "click", selector, session_id=session_id, url=url
+        )
+
+    async def fill(
+        self, selector: str, text: str, session_id: Optional[str] = None, url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Wpisz tekst w pole"""
+        return await self._dispatch(
+            lambda: self._route(session_id), "fill", selector, text, session_id=session_id, url=url
+        )
+
+    async def extract(
+        self,
+        url: str,
+        profile: Optional[NavigationProfile] = None,
+        include_html: bool = False,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Treść strony - zawsze w tym samym workerze dla danego URL (jego cache stron)"""
+        return await self._dispatch(
+            lambda: self._route(key=normalize_url(url)), "extract", url,
+            profile=profile, include_html=include_html, use_cache=use_cache
+        )
+
+    async def run_script(
+        self,
+        steps: List[BrowserStep],
+        session_id: Optional[str] = None,
+        profile: Optional[NavigationProfile] = None
+    ) -> Dict[str, Any]:
+        """Wykonaj zwalidowany skrypt w jednym workerze"""
+        result = await self._dispatch(
+            lambda: self._route(session_id), "run_script", steps, session_id=session_id, profile=profile
+        )
+        if not result.get("success") and "steps" not in result:
+            result.update(steps=[], failed_step=None)
+        return result
+
+    async def run_scripts(self, scripts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Niezależne skrypty rozdzielone między workery (każdy skrypt osobno)"""
+        return await asyncio.gather(*(
+            self.run_script(script["steps"], session_id=script.get("session_id"), profile=script.get("profile"))
+            for script in scripts
+        ))
+
+    async def close_session(self, session_id: str) -> bool:
+        """Zamknij sesję w workerze, do którego jest przyklejona"""
+        sticky = self._sessions.pop(session_id, None)
+        if sticky is None:
+            return False
+        try:
+            return await self._call(self._workers[sticky[0]], "close_session", session_id)
+        except Exception:
+            return False
+
+    async def invalidate_pages(self, url: Optional[str] = None) -> int:
+        """Usuń stronę z cache wszystkich workerów (None = wyczyść cache)"""
+        results = await asyncio.gather(*(
+            self._call(worker, "invalidate_pages", url) for worker in self._workers if worker.up
+        ), return_exceptions=True)
+        return sum(result for result in results if isinstance(result, int))
+
+    # ==================== METRYKI ====================
+
+    def _snapshots(self) -> List[Tuple[int, Dict[str, Any]]]:
+        return [(worker.index, worker.snapshot) for worker in self._workers if worker.snapshot]
+
+    def stats(self) -> Dict[str, Any]:
+        """Zagregowane statystyki pul workerów + stan floty"""
+        now = time.monotonic()
+        return {
+            **_merge_pool(self._snapshots()),
+            "fleet": {
+                "workers": self.size,
+                "up": sum(worker.up for worker in self._workers),
+                "ready": sum(worker.ready for worker in self._workers),
+                "in_flight": sum(len(worker.pending) for worker in self._workers),
+                "jobs": sum(worker.jobs for worker in self._workers),
+                "failures": sum(worker.failures for worker in self._workers),
+                "crashes": sum(worker.crashes for worker in self._workers),
+                "restarts": sum(worker.restarts for worker in self._workers),
+                "hangs": sum(worker.hangs for worker in self._workers),
+                "cancelled": sum(worker.cancelled for worker in self._workers),
+                "sticky_sessions": len(self._sessions),
+                "sessions_lost": self.sessions_lost,
+                "stats_interval": self.stats_interval,
+                "per_worker": [
+                    {
+                        "worker": worker.index,
+                        "pid": worker.pid,
+                        "up": worker.up,
+                        "ready": worker.ready,
+                        "in_flight": len(worker.pending),
+                        "jobs": worker.jobs,
+                        "failures": worker.failures,
+                        "crashes": worker.crashes,
+                        "restarts": worker.restarts,
+                        "hangs": worker.hangs,
+                        "uptime": round(now - worker.started, 1) if worker.up else 0.0
+                    }
+                    for worker in self._workers
+                ]
+            }
+        }
+
+    def profiles(self) -> Dict[str, Any]:
+        """Profile nawigacji i statystyki zagregowane z workerów"""
+        return {
+            "profiles": {name: profile.to_dict() for name, profile in PROFILES.items()},
+            "stats": _merge_profiles(self._snapshots())
+        }
+
+    def page_cache_stats(self) -> Dict[str, Any]:
+        """Statystyki cache stron zsumowane z workerów"""
+        return _merge_cache(self._snapshots())
+
+
+def create_browser_automation() -> Union[BrowserAutomation, BrowserFleet]:
+    """Flota workerów przy BROWSER_WORKERS > 0, inaczej BrowserAutomation w tym procesie"""
+    fleet = BrowserFleet.from_env()
+    return fleet if fleet.size > 0 else BrowserAutomation()
@@ -0,0 +1,405 @@
+"""
+Browser Pool - Pula ciepłych przeglądarek i izolowanych kontekstów Playwright
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Deque, AsyncIterator
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    async_playwright = None
+    PLAYWRIGHT_AVAILABLE = False
+
+
+class _Browser:
+    """Uruchomiona instancja Chromium i jej liczniki"""
+
+    __slots__ = ("browser", "contexts", "leases", "draining", "started")
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.contexts = 0
+        self.leases = 0
+        self.draining = False
+        self.started = time.monotonic()
+
+    @property
+    def connected(self) -> bool:
+        return self.browser.is_connected()
+
+
+class PooledContext:
+    """Kontekst przeglądarki (osobne cookies / storage) z jedną stroną"""
+
+    __slots__ = ("owner", "context", "page", "uses", "created", "last_used", "session_id", "lock")
+
+    def __init__(self, owner: _Browser, context, page):
+        self.owner = owner
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.session_id: Optional[str] = None
+        self.lock = asyncio.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.owner.connected and not self.page.is_closed()
+
+
+class BrowserPool:
+    """
+    Pula przeglądarek z kontekstami wypożyczanymi na czas operacji
+
+    - `browsers` instancji Chromium uruchamianych raz (start jest drogi),
+      każda z co najwyżej `contexts_per_browser` kontekstami
+    - `lease()` wypożycza ciepły kontekst (ze stroną) i oddaje go po
+      wyjściu z bloku; gdy wszystkie są zajęte, czeka do `lease_timeout`
+    - oddany kontekst jest zamykany (razem z cookies, localStorage /
+      sessionStorage, IndexedDB, service workerami i uprawnieniami), a pula
+      w tle tworzy na jego miejsce nowy ciepły kontekst; przeglądarka po
+      `browser_max_uses` wypożyczeniach jest wygaszana i restartowana
+    - `session_id` przypina kontekst do sesji: kolejne operacje sesji
+      widzą tę samą stronę i cookies (wygasa po `session_ttl` bezczynności)
+    - health check w tle usuwa zerwane przeglądarki i martwe strony
+      oraz uzupełnia `warm` gotowych kontekstów
+    """
+
+    def __init__(
+        self,
+        browsers: int = 2,
+        contexts_per_browser: int = 4,
+        browser_max_uses: int = 1000,
+        warm: int = 2,
+        headless: bool = True,
+        timeout: float = 30000,
+        lease_timeout: float = 30.0,
+        health_interval: float = 30.0,
+        session_ttl: float = 600.0
+    ):
+        """
+        Inicjalizacja
+        Args:
+            browsers: Liczba instancji Chromium
+            contexts_per_browser: Maksymalna liczba kontekstów na instancję
+            browser_max_uses: Wypożyczenia przeglądarki przed restartem
+            warm: Liczba gotowych (bezczynnych) kontekstów utrzymywanych w puli
+            headless: Tryb bez okna
+            timeout: Domyślny timeout operacji na stronie (ms)
+            lease_timeout: Maksymalne oczekiwanie na wolny kontekst (s)
+            health_interval: Odstęp health checków (s)
+            session_ttl: Czas bezczynności, po którym sesja jest zamykana (s)
+        """
+        self.browsers = max(1, browsers)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.browser_max_uses = browser_max_uses
+        self.warm = min(warm, self.capacity)
+        self.headless = headless
+        self.timeout = timeout
+        self.lease_timeout = lease_timeout
+        self.health_interval = health_interval
+        self.session_ttl = session_ttl
+
+        self._playwright = None
+        self._browsers: List[_Browser] = []
+        self._idle: Deque[PooledContext] = deque()
+        self._sessions: Dict[str, PooledContext] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._top_up_task: Optional[asyncio.Task] = None
+        self._started = False
+
+        self.leased = 0
+        self.leases = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.launched = 0
+        self.created = 0
+        self.recycled = 0
+        self.discarded = 0
+        self.health_failures = 0
+
+    @classmethod
+    def from_env(cls) -> "BrowserPool":
+        """Konfiguracja z BROWSER_POOL_* / HEADLESS_BROWSER / BROWSER_TIMEOUT"""
+        return cls(
+            browsers=int(os.getenv("BROWSER_POOL_BROWSERS", "2")),
+            contexts_per_browser=int(os.getenv("BROWSER_POOL_CONTEXTS", "4")),
+            browser_max_uses=int(os.getenv("BROWSER_POOL_BROWSER_MAX_USES", "1000")),
+            warm=int(os.getenv("BROWSER_POOL_WARM", "2")),
+            headless=os.getenv("HEADLESS_BROWSER", "true").lower() == "true",
+            timeout=float(os.getenv("BROWSER_TIMEOUT", "30000")),
+            lease_timeout=float(os.getenv("BROWSER_POOL_LEASE_TIMEOUT", "30")),
+            health_interval=float(os.getenv("BROWSER_POOL_HEALTH_INTERVAL", "30")),
+            session_ttl=float(os.getenv("BROWSER_SESSION_TTL", "600"))
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.browsers * self.contexts_per_browser
+
+    async def start(self):
+        """Uruchom Playwright, przeglądarki i ciepłe konteksty (idempotentne)"""
+        if self._started:
+            return
+        if not PLAYWRIGHT_AVAILABLE:
+            raise RuntimeError("Playwright nie jest zainstalowany (pip install playwright)")
+        if self._launch_lock is None:
+            self._slots = asyncio.Semaphore(self.capacity)
+            self._launch_lock = asyncio.Lock()
+        async with self._launch_lock:
+            if self._started:
+                return
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            missing = self.browsers - len(self._browsers)
+            await asyncio.gather(*(self._launch() for _ in range(missing)))
+            self._started = True
+        await self._top_up()
+        if self.health_interval:
+            self._health_task = asyncio.create_task(self._health_loop())
+        print(f"🌐 Pula przeglądarek: {len(self._browsers)} x Chromium, {len(self._idle)} ciepłych kontekstów")
+
+    async def _launch(self) -> _Browser:
+        browser = _Browser(await self._playwright.chromium.launch(headless=self.headless))
+        self._browsers.append(browser)
+        self.launched += 1
+        return browser
+
+    async def _new_context(self) -> PooledContext:
+        """Nowy kontekst na najmniej obciążonej przeglądarce (w razie potrzeby nowej)"""
+        async with self._launch_lock:
+            candidates = [
+                b for b in self._browsers
+                if b.connected and not b.draining and b.contexts < self.contexts_per_browser
+            ]
+            owner = min(candidates, key=lambda b: b.contexts) if candidates else await self._launch()
+            owner.contexts += 1
+        try:
+            context = await owner.browser.new_context()
+            context.set_default_timeout(self.timeout)
+            page = await context.new_page()
+        except Exception:
+            owner.contexts -= 1
+            raise
+        self.created += 1
+        return PooledContext(owner, context, page)
+
+    async def _discard(self, pooled: PooledContext):
+        """Zamknij kontekst; wygaszana przeglądarka bez kontekstów jest zamykana"""
+        self.discarded += 1
+        owner = pooled.owner
+        owner.contexts -= 1
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+        if owner.contexts <= 0 and (owner.draining or not owner.connected):
+            await self._close_browser(owner)
+
+    async def _close_browser(self, owner: _Browser):
+        if owner in self._browsers:
+            self._browsers.remove(owner)
+        try:
+            await owner.browser.close()
+        except Exception:
+            pass
+
+    async def _take(self) -> PooledContext:
+        """Ciepły kontekst z puli (ostatnio oddany) lub nowy"""
+        while self._idle:
+            pooled = self._idle.pop()
+            if pooled.alive and not pooled.owner.draining:
+                return pooled
+            await self._discard(pooled)
+        return await self._new_context()
+
+    async def _acquire(self, session_id: Optional[str]) -> PooledContext:
+        await self.start()
+        pooled = self._sessions.get(session_id) if session_id else None
+        if pooled is not None:
+            await pooled.lock.acquire()
+            if self._sessions.get(session_id) is not pooled:
+                # Sesja zamknięta w trakcie oczekiwania
+                pooled.lock.release()
+                return await self._acquire(session_id)
+            if not pooled.alive:
+                await self._discard(pooled)
+                fresh = await self._new_context()
+                fresh.session_id = session_id
+                await fresh.lock.acquire()
+                self._sessions[session_id] = pooled = fresh
+        else:
+            if self._slots.locked():
+                self.waits += 1
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), self.lease_timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Brak wolnego kontekstu przeglądarki w {self.lease_timeout}s")
+                self.wait_time += time.perf_counter() - started
+            else:
+                await self._slots.acquire()
+            try:
+                pooled = await self._take()
+                await pooled.lock.acquire()
+            except BaseException:
+                # Także CancelledError - inaczej miejsce w puli przepada na zawsze
+                self._slots.release()
+                raise
+            if session_id:
+                pooled.session_id = session_id
+                self._sessions[session_id] = pooled
+
+        pooled.uses += 1
+        pooled.owner.leases += 1
+        if self.browser_max_uses and pooled.owner.leases >= self.browser_max_uses:
+            pooled.owner.draining = True
+        self.leased += 1
+        self.leases += 1
+        return pooled
+
+    async def _release(self, pooled: PooledContext):
+        self.leased -= 1
+        pooled.last_used = time.monotonic()
+        if pooled.session_id is not None:
+            # Kontekst sesji zostaje przypięty (i zajmuje miejsce w puli) do close_session
+            pooled.lock.release()
+            return
+        try:
+            # Stan strony (storage, IndexedDB, uprawnienia) ginie razem z kontekstem -
+            # następne wypożyczenie nie widzi nic z poprzedniego
+            self.recycled += 1
+            await self._discard(pooled)
+        finally:
+            pooled.lock.release()
+            self._slots.release()
+        self._schedule_top_up()
+
+    @asynccontextmanager
+    async def lease(self, session_id: Optional[str] = None) -> AsyncIterator[PooledContext]:
+        """
+        Wypożycz kontekst na czas bloku `async with`
+
+        Args:
+            session_id: Przypnij kontekst do sesji (ta sama strona i cookies w kolejnych wywołaniach)
+        """
+        pooled = await self._acquire(session_id)
+        try:
+            yield pooled
+        finally:
+            await self._release(pooled)
+
+    async def close_session(self, session_id: str) -> bool:
+        """Zamknij sesję i zwolnij jej kontekst"""
+        pooled = self._sessions.get(session_id)
+        if pooled is None:
+            return False
+        async with pooled.lock:
+            if self._sessions.get(session_id) is not pooled:
+                return False
+            del self._sessions[session_id]
+            await self._discard(pooled)
+        self._slots.release()
+        return True
+
+    def _schedule_top_up(self):
+        """Uzupełnij ciepłe konteksty w tle (jedno uzupełnianie naraz)"""
+        if self._started and (self._top_up_task is None or self._top_up_task.done()):
+            self._top_up_task = asyncio.create_task(self._top_up())
+
+    async def _top_up(self):
+        """Uzupełnij pulę do `warm` gotowych kontekstów (bez przekraczania pojemności)"""
+        in_use = self.leased + len(self._sessions) + len(self._idle)
+        missing = min(self.warm - len(self._idle), self.capacity - in_use)
+        if missing <= 0:
+            return
+        created = await asyncio.gather(*(self._new_context() for _ in range(missing)), return_exceptions=True)
+        self._idle.extendleft(pooled for pooled in created if isinstance(pooled, PooledContext))
+
+    async def check_health(self):
+        """Usuń zerwane przeglądarki, martwe konteksty i wygasłe sesje; uzupełnij pulę"""
+        for owner in [b for b in self._browsers if not b.connected]:
+            self.health_failures += 1
+            print("⚠️ Przeglądarka z puli rozłączona - zostanie uruchomiona nowa")
+            await self._close_browser(owner)
+
+        for pooled in list(self._idle):
+            healthy = pooled.alive
+            if healthy:
+                try:
+                    await asyncio.wait_for(pooled.page.evaluate("1"), 5)
+                except Exception:
+                    healthy = False
+            if not healthy and pooled in self._idle:
+                self._idle.remove(pooled)
+                self.health_failures += 1
+                await self._discard(pooled)
+
+        now = time.monotonic()
+        for session_id, pooled in list(self._sessions.items()):
+            if not pooled.lock.locked() and now - pooled.last_used > self.session_ttl:
+                await self.close_session(session_id)
+
+        await self._top_up()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                print(f"⚠️ Błąd health checku puli przeglądarek: {e}")
+
+    async def close(self):
+        """Zamknij wszystkie konteksty, przeglądarki i Playwright"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._top_up_task is not None:
+            self._top_up_task.cancel()
+            self._top_up_task = None
+        for owner in list(self._browsers):
+            await self._close_browser(owner)
+        self._idle.clear()
+        self._sessions.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self._started = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki puli"""
+        return {
+            "available": PLAYWRIGHT_AVAILABLE,
+            "started": self._started,
+            "capacity": self.capacity,
+            "browsers": [
+                {
+                    "connected": b.connected,
+                    "contexts": b.contexts,
+                    "leases": b.leases,
+                    "draining": b.draining,
+                    "uptime": round(time.monotonic() - b.started, 1)
+                }
+                for b in self._browsers
+            ],
+            "idle": len(self._idle),
+            "leased": self.leased,
+            "sessions": len(self._sessions),
+            "leases": self.leases,
+            "waits": self.waits,
+            "avg_wait_ms": round(self.wait_time / self.waits * 1000, 2) if self.waits else 0.0,
+            "launched": self.launched,
+            "created": self.created,
+            "recycled": self.recycled,
+            "discarded": self.discarded,
+            "health_failures": self.health_failures
+        }
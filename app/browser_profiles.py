@@ -0,0 +1,279 @@
+"""
+Browser Profiles - Profile nawigacji: blokowanie zasobów i szybszy warunek załadowania
+"""
+import os
+import re
+import time
+import hashlib
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Iterable, AsyncIterator, Tuple
+
+
+# Typy zasobów Playwright (request.resource_type), które profil może blokować
+RESOURCE_TYPES = (
+    "document", "stylesheet", "image", "media", "font", "script", "texttrack",
+    "xhr", "fetch", "eventsource", "websocket", "manifest", "other"
+)
+WAIT_CONDITIONS = ("commit", "domcontentloaded", "load", "networkidle")
+
+# Fragmenty URL popularnych trackerów i reklam (rozszerzane przez BROWSER_BLOCK_PATTERNS)
+DEFAULT_TRACKERS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "connect.facebook.net", "hotjar.com",
+    "segment.io", "cdn.segment.com", "scorecardresearch.com", "adservice.google"
+)
+
+# Szacowany rozmiar zablokowanego zasobu (B), dopóki nie zmierzymy średniej
+_SIZE_PRIORS = {
+    "image": 40_000, "media": 500_000, "font": 30_000, "stylesheet": 20_000,
+    "script": 30_000, "xhr": 5_000, "fetch": 5_000, "other": 5_000
+}
+
+
+class NavigationProfile:
+    """
+    Profil nawigacji
+
+    Zablokowane żądania (typ zasobu lub fragment URL) są przerywane
+    w przechwytywaniu (`page.route`), zanim trafią do sieci.
+    `wait_until` decyduje, kiedy `goto` się kończy - `domcontentloaded`
+    nie czeka na obrazki, fonty ani skrypty asynchroniczne.
+    """
+
+    __slots__ = ("name", "block_types", "block_patterns", "wait_until", "fingerprint", "_pattern")
+
+    def __init__(
+        self,
+        name: str,
+        block_types: Iterable[str] = (),
+        block_patterns: Iterable[str] = (),
+        wait_until: str = "load"
+    ):
+        """
+        Inicjalizacja
+        Args:
+            name: Nazwa profilu (klucz statystyk)
+            block_types: Blokowane typy zasobów
+            block_patterns: Blokowane fragmenty URL
+            wait_until: Warunek zakończenia nawigacji
+
+        Raises:
+            ValueError: Nieznany typ zasobu lub warunek
+        """
+        unknown = set(block_types) - set(RESOURCE_TYPES)
+        if unknown:
+            raise ValueError(f"Nieznane typy zasobów: {', '.join(sorted(unknown))}")
+        if wait_until not in WAIT_CONDITIONS:
+            raise ValueError(f"wait_until musi być jednym z: {', '.join(WAIT_CONDITIONS)}")
+        self.name = name
+        self.block_types = frozenset(block_types)
+        self.block_patterns = tuple(p for p in block_patterns if p)
+        self.wait_until = wait_until
+        # Skrót konfiguracji (bez nazwy) - ten sam render dla tego samego skrótu (klucz cache stron)
+        config = repr((sorted(self.block_types), self.block_patterns, self.wait_until))
+        self.fingerprint = hashlib.sha1(config.encode("utf-8")).hexdigest()[:12]
+        self._pattern = re.compile("|".join(map(re.escape, self.block_patterns))) if self.block_patterns else None
+
+    @property
+    def blocks(self) -> bool:
+        return bool(self.block_types or self._pattern)
+
+    def blocked(self, resource_type: str, url: str) -> bool:
+        """Czy żądanie ma zostać zablokowane"""
+        if resource_type in self.block_types:
+            return True
+        return self._pattern is not None and self._pattern.search(url) is not None
+
+    def with_overrides(self, overrides: Optional[Dict[str, Any]]) -> "NavigationProfile":
+        """
+        Kopia profilu z nadpisaniami z żądania
+
+        Args:
+            overrides: {"block_types": [...], "block_patterns": [...], "wait_until": ...}
+                (listy są dodawane do listy profilu; statystyki idą pod nazwą "<profil>+custom")
+        """
+        if not overrides:
+            return self
+        if not isinstance(overrides, dict):
+            raise ValueError("block musi być obiektem")
+        types = overrides.get("block_types") or []
+        patterns = overrides.get("block_patterns") or []
+        if not isinstance(types, list) or not isinstance(patterns, list):
+            raise ValueError("block_types i block_patterns muszą być listami")
+        if not all(isinstance(item, str) for item in types + patterns):
+            raise ValueError("block_types i block_patterns muszą być listami tekstów")
+        return NavigationProfile(
+            f"{self.name}+custom",
+            block_types=self.block_types | set(types),
+            block_patterns=self.block_patterns + tuple(patterns),
+            wait_until=overrides.get("wait_until", self.wait_until)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "block_types": sorted(self.block_types),
+            "block_patterns": list(self.block_patterns),
+            "wait_until": self.wait_until
+        }
+
+
+_extra_patterns = tuple(p.strip() for p in os.getenv("BROWSER_BLOCK_PATTERNS", "").split(",") if p.strip())
+
+PROFILES: Dict[str, NavigationProfile] = {
+    # Pełne ładowanie strony - zachowanie jak dotąd
+    "full": NavigationProfile("full"),
+    # Ekstrakcja treści: bez obrazków, mediów, fontów i trackerów
+    "lean": NavigationProfile(
+        "lean",
+        block_types=("image", "media", "font"),
+        block_patterns=DEFAULT_TRACKERS + _extra_patterns,
+        wait_until="domcontentloaded"
+    ),
+    # Sam tekst HTML: dodatkowo bez stylów
+    "text": NavigationProfile(
+        "text",
+        block_types=("image", "media", "font", "stylesheet", "texttrack", "manifest"),
+        block_patterns=DEFAULT_TRACKERS + _extra_patterns,
+        wait_until="domcontentloaded"
+    ),
+}
+
+DEFAULT_PROFILE = os.getenv("BROWSER_NAV_PROFILE", "full")
+
+
+def resolve_profile(name: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None) -> NavigationProfile:
+    """
+    Profil o nazwie `name` (None = BROWSER_NAV_PROFILE) z nadpisaniami
+
+    Raises:
+        ValueError: Nieznany profil lub nieprawidłowe nadpisania
+    """
+    name = name or DEFAULT_PROFILE
+    profile = PROFILES.get(name)
+    if profile is None:
+        raise ValueError(f"Nieznany profil nawigacji: {name} (dostępne: {', '.join(PROFILES)})")
+    return profile.with_overrides(overrides)
+
+
+class NavigationMetrics:
+    """Pomiary jednej operacji na stronie z profilem"""
+
+    __slots__ = ("requests", "bytes", "blocked", "blocked_types", "load_ms", "_sizes")
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = 0
+        self.blocked_types: Dict[str, int] = {}
+        self.load_ms = 0.0
+        self._sizes: List[asyncio.Task] = []
+
+
+class ProfileStats:
+    """
+    Statystyki profili: czas ładowania, pobrane bajty, zablokowane żądania
+
+    Oszczędność bajtów jest szacowana: zablokowany zasób liczy się
+    średnim rozmiarem zasobu tego typu zmierzonym w niezablokowanych
+    ładowaniach (na starcie - wartości domyślne).
+    """
+
+    def __init__(self):
+        self._type_bytes: Dict[str, Tuple[int, int]] = {}
+        self._profiles: Dict[str, Dict[str, float]] = {}
+
+    def estimate(self, resource_type: str) -> int:
+        """Szacowany rozmiar zasobu danego typu (B)"""
+        total, count = self._type_bytes.get(resource_type, (0, 0))
+        if count:
+            return int(total / count)
+        return _SIZE_PRIORS.get(resource_type, _SIZE_PRIORS["other"])
+
+    def observe(self, resource_type: str, size: int):
+        total, count = self._type_bytes.get(resource_type, (0, 0))
+        self._type_bytes[resource_type] = (total + size, count + 1)
+
+    def record(self, profile: NavigationProfile, metrics: NavigationMetrics) -> Dict[str, Any]:
+        """Zapisz pomiary operacji; zwraca podsumowanie do odpowiedzi API"""
+        saved = sum(self.estimate(t) * n for t, n in metrics.blocked_types.items())
+        entry = self._profiles.setdefault(profile.name, {
+            "navigations": 0, "load_ms": 0.0, "bytes": 0, "requests": 0, "blocked": 0, "bytes_saved": 0
+        })
+        entry["navigations"] += 1
+        entry["load_ms"] += metrics.load_ms
+        entry["bytes"] += metrics.bytes
+        entry["requests"] += metrics.requests
+        entry["blocked"] += metrics.blocked
+        entry["bytes_saved"] += saved
+        return {
+            "profile": profile.name,
+            "load_ms": round(metrics.load_ms, 2),
+            "requests": metrics.requests,
+            "bytes": metrics.bytes,
+            "blocked": metrics.blocked,
+            "bytes_saved_est": saved
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Średnie per profil"""
+        result = {}
+        for name, entry in self._profiles.items():
+            n = entry["navigations"]
+            result[name] = {
+                "navigations": n,
+                "avg_load_ms": round(entry["load_ms"] / n, 2),
+                "avg_bytes": int(entry["bytes"] / n),
+                "avg_requests": round(entry["requests"] / n, 1),
+                "blocked": entry["blocked"],
+                "bytes_saved_est": entry["bytes_saved"]
+            }
+        return result
+
+
+@asynccontextmanager
+async def profiled(page, profile: NavigationProfile, stats: ProfileStats) -> AsyncIterator[NavigationMetrics]:
+    """
+    Zastosuj profil do strony na czas bloku i zmierz ruch
+
+    Przechwytywanie jest zdejmowane po wyjściu z bloku, bo konteksty
+    z puli są używane ponownie z innymi profilami.
+    """
+    metrics = NavigationMetrics()
+
+    async def handle(route):
+        request = route.request
+        if profile.blocked(request.resource_type, request.url):
+            metrics.blocked += 1
+            metrics.blocked_types[request.resource_type] = metrics.blocked_types.get(request.resource_type, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    async def measure(request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        size = sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        metrics.bytes += size
+        stats.observe(request.resource_type, size)
+
+    def on_finished(request):
+        metrics.requests += 1
+        metrics._sizes.append(asyncio.ensure_future(measure(request)))
+
+    if profile.blocks:
+        await page.route("**/*", handle)
+    page.on("requestfinished", on_finished)
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.load_ms = (time.perf_counter() - started) * 1000
+        page.remove_listener("requestfinished", on_finished)
+        if profile.blocks:
+            await page.unroute("**/*", handle)
+        if metrics._sizes:
+            await asyncio.wait(metrics._sizes, timeout=2)
@@ -0,0 +1,180 @@
+"""
+Browser Script - Skrypty wielu kroków przeglądarki wykonywane na jednej stronie
+"""
+import os
+import time
+from typing import Optional, List, Dict, Any
+
+
+ACTIONS = ("navigate", "click", "fill", "wait", "extract")
+LOAD_STATES = ("load", "domcontentloaded", "networkidle")
+MAX_STEPS = int(os.getenv("BROWSER_SCRIPT_MAX_STEPS", "50"))
+MAX_WAIT_MS = 30000
+
+
+class BrowserStep:
+    """Zwalidowany krok skryptu"""
+
+    __slots__ = ("action", "url", "selector", "text", "ms", "state", "attribute", "all", "timeout")
+
+    def __init__(
+        self,
+        action: str,
+        url: Optional[str] = None,
+        selector: Optional[str] = None,
+        text: Optional[str] = None,
+        ms: Optional[float] = None,
+        state: Optional[str] = None,
+        attribute: Optional[str] = None,
+        all: bool = False,
+        timeout: Optional[float] = None
+    ):
+        self.action = action
+        self.url = url
+        self.selector = selector
+        self.text = text
+        self.ms = ms
+        self.state = state
+        self.attribute = attribute
+        self.all = all
+        self.timeout = timeout
+
+    @classmethod
+    def parse(cls, raw: Any, index: int) -> "BrowserStep":
+        """
+        Krok ze słownika żądania
+
+        Raises:
+            ValueError: Nieprawidłowy krok (z numerem kroku w komunikacie)
+        """
+        def fail(message: str):
+            raise ValueError(f"Krok {index}: {message}")
+
+        if not isinstance(raw, dict):
+            fail("oczekiwano obiektu")
+        action = raw.get("action")
+        if action not in ACTIONS:
+            fail(f"nieznana akcja {action!r} (dozwolone: {', '.join(ACTIONS)})")
+
+        url, selector, text = raw.get("url"), raw.get("selector"), raw.get("text")
+        ms, state, timeout = raw.get("ms"), raw.get("state"), raw.get("timeout")
+        if url is not None and not (isinstance(url, str) and url.startswith(("http://", "https://", "about:"))):
+            fail("url musi zaczynać się od http://, https:// lub about:")
+        if selector is not None and not (isinstance(selector, str) and selector.strip()):
+            fail("selector musi być niepustym tekstem")
+        if timeout is not None and not (isinstance(timeout, (int, float)) and timeout > 0):
+            fail("timeout musi być liczbą dodatnią (ms)")
+
+        if action == "navigate" and not url:
+            fail("navigate wymaga url")
+        if action in ("click", "fill") and not selector:
+            fail(f"{action} wymaga selector")
+        if action == "fill" and not isinstance(text, str):
+            fail("fill wymaga text")
+        if action == "wait":
+            if not (selector or ms is not None or state):
+                fail("wait wymaga selector, ms lub state")
+            if ms is not None and not (isinstance(ms, (int, float)) and 0 <= ms <= MAX_WAIT_MS):
+                fail(f"ms musi być z zakresu 0-{MAX_WAIT_MS}")
+            if state is not None and state not in LOAD_STATES:
+                fail(f"state musi być jednym z: {', '.join(LOAD_STATES)}")
+
+        return cls(
+            action, url=url, selector=selector, text=text, ms=ms, state=state,
+            attribute=raw.get("attribute"), all=bool(raw.get("all", False)), timeout=timeout
+        )
+
+    async def run(self, page, wait_until: str = "load") -> Dict[str, Any]:
+        """Wykonaj krok na stronie; zwraca dane kroku (status, wartość)"""
+        if self.action == "navigate":
+            response = await page.goto(self.url, timeout=self.timeout, wait_until=wait_until)
+            return {"status": response.status if response is not None else None, "page_url": page.url}
+        if self.action == "click":
+            await page.click(self.selector, timeout=self.timeout)
+            return {}
+        if self.action == "fill":
+            await page.fill(self.selector, self.text, timeout=self.timeout)
+            return {}
+        if self.action == "wait":
+            if self.selector:
+                await page.wait_for_selector(self.selector, timeout=self.timeout)
+            if self.state:
+                await page.wait_for_load_state(self.state, timeout=self.timeout)
+            if self.ms:
+                await page.wait_for_timeout(self.ms)
+            return {}
+        return {"value": await self._extract(page)}
+
+    async def _extract(self, page) -> Any:
+        if not self.selector:
+            return {"url": page.url, "title": await page.title()}
+        locator = page.locator(self.selector)
+        if self.all:
+            if self.attribute:
+                return await locator.evaluate_all(
+                    "(nodes, name) => nodes.map(node => node.getAttribute(name))", self.attribute
+                )
+            return await locator.all_inner_texts()
+        first = locator.first
+        if self.attribute:
+            return await first.get_attribute(self.attribute, timeout=self.timeout)
+        return await first.inner_text(timeout=self.timeout)
+
+
+def parse_script(steps: Any) -> List[BrowserStep]:
+    """
+    Zwaliduj cały skrypt przed uruchomieniem (jeden raz, nie per krok)
+
+    Raises:
+        ValueError: Pusty / zbyt długi skrypt lub nieprawidłowy krok
+    """
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("Skrypt wymaga niepustej listy steps")
+    if len(steps) > MAX_STEPS:
+        raise ValueError(f"Skrypt może mieć najwyżej {MAX_STEPS} kroków")
+    return [BrowserStep.parse(raw, i) for i, raw in enumerate(steps)]
+
+
+async def run_steps(page, steps: List[BrowserStep], wait_until: str = "load") -> Dict[str, Any]:
+    """
+    Wykonaj kroki po kolei na jednej stronie, do pierwszego błędu
+
+    Args:
+        wait_until: Warunek zakończenia kroków navigate (z profilu nawigacji)
+
+    Returns:
+        {"success", "steps": [{"action", "ms", "success", ...}], "failed_step", "error", "total_ms"}
+    """
+    results = []
+    started = time.perf_counter()
+    for i, step in enumerate(steps):
+        step_started = time.perf_counter()
+        try:
+            output = await step.run(page, wait_until)
+        except Exception as e:
+            results.append({
+                "action": step.action,
+                "ms": round((time.perf_counter() - step_started) * 1000, 2),
+                "success": False,
+                "error": str(e)
+            })
+            return {
+                "success": False,
+                "steps": results,
+                "failed_step": i,
+                "error": str(e),
+                "total_ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+        results.append({
+            "action": step.action,
+            "ms": round((time.perf_counter() - step_started) * 1000, 2),
+            "success": True,
+            **output
+        })
+    return {
+        "success": True,
+        "steps": results,
+        "failed_step": None,
+        "error": None,
+        "total_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -0,0 +1,119 @@
+"""
+Hedging - Zapytania zabezpieczające (hedged requests) dla redukcji ogona opóźnień
+"""
+import os
+import asyncio
+from typing import Optional, Dict, Any, Awaitable, Callable
+
+from app.provider_stats import ProviderStats
+
+
+class HedgePolicy:
+    """
+    Polityka hedgingu: opóźnienie zapytania zapasowego i budżet
+
+    Zapytanie zapasowe startuje, gdy główny provider nie odpowie w czasie
+    równym wybranemu percentylowi jego opóźnień. Budżet ogranicza odsetek
+    zapytań, które mogą zostać zhedgowane; `burst` zapytań zapasowych jest
+    dozwolonych ponad budżet, więc hedging działa też tuż po starcie i przy
+    małym ruchu.
+    """
+
+    def __init__(
+        self,
+        percentile: Optional[float] = None,
+        default_delay: Optional[float] = None,
+        min_delay: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        burst: Optional[int] = None
+    ):
+        """
+        Inicjalizacja
+        Args:
+            percentile: Percentyl opóźnienia głównego providera (HEDGE_PERCENTILE)
+            default_delay: Opóźnienie (s) gdy brak próbek (HEDGE_DEFAULT_DELAY)
+            min_delay: Dolne ograniczenie opóźnienia (s) (HEDGE_MIN_DELAY)
+            max_rate: Maksymalny odsetek zhedgowanych zapytań (HEDGE_MAX_RATE)
+            burst: Zapytania zapasowe dozwolone niezależnie od odsetka (HEDGE_BURST)
+        """
+        self.percentile = percentile if percentile is not None else float(os.getenv("HEDGE_PERCENTILE", "95"))
+        self.default_delay = default_delay if default_delay is not None else float(os.getenv("HEDGE_DEFAULT_DELAY", "2.0"))
+        self.min_delay = min_delay if min_delay is not None else float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+        self.max_rate = max_rate if max_rate is not None else float(os.getenv("HEDGE_MAX_RATE", "0.2"))
+        self.burst = burst if burst is not None else int(os.getenv("HEDGE_BURST", "1"))
+
+        self.requests = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self.budget_denied = 0
+        self.extra_cost = 0.0
+
+    def delay_for(self, stats: Optional[ProviderStats]) -> float:
+        """Opóźnienie startu zapytania zapasowego"""
+        delay = stats.percentile(self.percentile) if stats is not None else None
+        if delay is None:
+            delay = self.default_delay
+        return max(self.min_delay, delay)
+
+    def allow_hedge(self) -> bool:
+        """Czy budżet pozwala na kolejne zapytanie zapasowe"""
+        if self.hedged >= max(self.burst, self.max_rate * self.requests):
+            self.budget_denied += 1
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Liczniki hedgingu"""
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "backup_wins": self.backup_wins,
+            "budget_denied": self.budget_denied,
+            "extra_cost": round(self.extra_cost, 4),
+            "percentile": self.percentile,
+            "max_rate": self.max_rate,
+            "burst": self.burst
+        }
+
+
+async def hedged_call(
+    primary: Callable[[], Awaitable[Dict[str, Any]]],
+    backup: Optional[Callable[[], Awaitable[Dict[str, Any]]]],
+    delay: float,
+    policy: HedgePolicy,
+    backup_cost: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Wykonaj zapytanie z opcjonalnym zapytaniem zapasowym
+
+    Wygrywa pierwsza udana odpowiedź (success=True), przegrany jest
+    anulowany. Gdy obie zawiodą, zwracana jest ostatnia odpowiedź.
+    """
+    policy.requests += 1
+    primary_task = asyncio.ensure_future(primary())
+    pending = {primary_task}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done or backup is None or not policy.allow_hedge():
+            return await primary_task
+
+        policy.hedged += 1
+        policy.extra_cost += backup_cost
+        backup_task = asyncio.ensure_future(backup())
+        pending.add(backup_task)
+
+        result: Dict[str, Any] = {}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result.get("success"):
+                    if task is backup_task:
+                        policy.backup_wins += 1
+                    return {**result, "hedged": True}
+        return {**result, "hedged": True}
+    finally:
+        for task in pending:
+            if not task.done():
+                task.cancel()
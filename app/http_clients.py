@@ -0,0 +1,196 @@
+"""
+HTTP Clients - Współdzielony rejestr klientów httpx z pulą połączeń
+"""
+import os
+import time
+import asyncio
+import hashlib
+from typing import Optional, Dict, Any, Tuple
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Bazowe adresy API providerów (klucze jak w MultiLLM.PROVIDERS)
+PROVIDER_BASE_URLS = {
+    "perplexity": "https://api.perplexity.ai",
+    "gpt": "https://api.openai.com/v1",
+    "claude": "https://api.anthropic.com/v1",
+    "gemini": "https://generativelanguage.googleapis.com/v1beta",
+    "deepseek": "https://api.deepseek.com",
+    "qwen": "https://dashscope.aliyuncs.com/compatible-mode/v1",
+    "kimi": "https://api.moonshot.cn/v1",
+    "grok": "https://api.x.ai/v1",
+}
+
+# Providery obsługujące HTTP/2 (negocjacja ALPN i tak wraca do HTTP/1.1)
+HTTP2_PROVIDERS = {"perplexity", "gpt", "claude", "gemini", "grok"}
+
+
+def auth_headers(provider: str, credential: str) -> Dict[str, str]:
+    """Nagłówki autoryzacji w formacie danego providera (pusty credential = bez autoryzacji)"""
+    if not credential:
+        return {}
+    if provider == "claude":
+        return {"x-api-key": credential, "anthropic-version": "2023-06-01"}
+    if provider == "gemini":
+        return {"x-goog-api-key": credential}
+    return {"Authorization": f"Bearer {credential}"}
+
+
+class _PooledClient:
+    """Klient z czasem ostatniego użycia"""
+
+    __slots__ = ("client", "last_used", "created_at")
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ClientRegistry:
+    """
+    Rejestr klientów httpx kluczowany (provider, credential)
+
+    Każdy klucz API dostaje jeden długo żyjący klient z pulą keep-alive,
+    więc kolejne wywołania nie płacą za nowy handshake TLS. Nieużywane
+    klienty są zamykane po `idle_ttl` sekundach.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        idle_ttl: Optional[float] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None
+    ):
+        """
+        Inicjalizacja (domyślne wartości z HTTP_POOL_* / HTTP_*_TIMEOUT)
+        Args:
+            max_connections: Maks. połączeń na klienta
+            max_keepalive: Maks. połączeń keep-alive na klienta
+            keepalive_expiry: Czas życia bezczynnego połączenia (s)
+            idle_ttl: Po ilu sekundach bez użycia zamknąć klienta
+            timeout: Timeout odczytu/zapisu (s)
+            connect_timeout: Timeout nawiązania połączenia (s)
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=max_keepalive or int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=keepalive_expiry or float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30"))
+        )
+        self.timeout = httpx.Timeout(
+            timeout or float(os.getenv("HTTP_TIMEOUT", "60")),
+            connect=connect_timeout or float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+        )
+        self.idle_ttl = idle_ttl or float(os.getenv("HTTP_POOL_IDLE_TTL", "600"))
+        self._clients: Dict[Tuple[str, str], _PooledClient] = {}
+        self._janitor: Optional[asyncio.Task] = None
+        self.created = 0
+        self.evicted = 0
+
+    @staticmethod
+    def _key(provider: str, credential: str) -> Tuple[str, str]:
+        """Klucz rejestru - credential tylko jako skrót, nigdy jawnie"""
+        return provider, hashlib.sha256(credential.encode("utf-8")).hexdigest()[:16]
+
+    def get(
+        self,
+        provider: str,
+        credential: str,
+        base_url: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> httpx.AsyncClient:
+        """Pobierz (lub utwórz) klienta dla pary (provider, credential)"""
+        key = self._key(provider, credential)
+        pooled = self._clients.get(key)
+        if pooled is None or pooled.client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url or PROVIDER_BASE_URLS.get(provider, ""),
+                headers={**auth_headers(provider, credential), **(headers or {})},
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=HTTP2_AVAILABLE and provider in HTTP2_PROVIDERS
+            )
+            pooled = _PooledClient(client)
+            self._clients[key] = pooled
+            self.created += 1
+        pooled.last_used = time.monotonic()
+        return pooled.client
+
+    async def evict_idle(self) -> int:
+        """Zamknij klienty nieużywane dłużej niż idle_ttl"""
+        cutoff = time.monotonic() - self.idle_ttl
+        stale = [key for key, pooled in self._clients.items() if pooled.last_used < cutoff]
+        for key in stale:
+            pooled = self._clients.pop(key)
+            await pooled.client.aclose()
+        self.evicted += len(stale)
+        return len(stale)
+
+    def start(self):
+        """Uruchom okresowe czyszczenie bezczynnych klientów"""
+        if self._janitor is None:
+            self._janitor = asyncio.create_task(self._janitor_loop())
+
+    async def _janitor_loop(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_ttl / 4))
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                print(f"⚠️ Błąd czyszczenia klientów HTTP: {e}")
+
+    async def aclose(self):
+        """Zamknij wszystkie klienty (shutdown)"""
+        if self._janitor is not None:
+            self._janitor.cancel()
+            self._janitor = None
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for pooled in clients:
+            await pooled.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki rejestru"""
+        per_provider: Dict[str, int] = {}
+        for provider, _ in self._clients:
+            per_provider[provider] = per_provider.get(provider, 0) + 1
+        return {
+            "clients": len(self._clients),
+            "per_provider": per_provider,
+            "created": self.created,
+            "evicted": self.evicted,
+            "http2": HTTP2_AVAILABLE,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "idle_ttl": self.idle_ttl
+        }
+
+
+# Globalna instancja
+_client_registry: Optional[ClientRegistry] = None
+
+
+def get_client_registry() -> ClientRegistry:
+    """Pobierz lub utwórz globalny rejestr klientów"""
+    global _client_registry
+    if _client_registry is None:
+        _client_registry = ClientRegistry()
+    return _client_registry
+
+
+async def close_client_registry():
+    """Zamknij globalny rejestr"""
+    global _client_registry
+    if _client_registry:
+        await _client_registry.aclose()
+        _client_registry = None
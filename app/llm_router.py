@@ -2,9 +2,20 @@
 LLM Router - Zarządzanie wieloma providerami LLM
 """
 import os
-from typing import Optional, List, Dict, Any
+import time
+from functools import partial
+from typing import Optional, List, Dict, Any, AsyncIterator
 from datetime import datetime
 
+import httpx
+
+from app.provider_stats import AdaptiveRouter
+from app.answer_cache import SemanticAnswerCache
+from app.hedging import HedgePolicy, hedged_call
+from app.resilience import CircuitOpenError, RetryPolicy, RETRYABLE_STATUSES, get_breaker, breakers_snapshot
+from app.provider_api import call_provider, stream_provider, supports_stream, provider_endpoint
+from app.rate_limit import RateLimitExceeded, get_rate_limiter, estimate_tokens
+
 
 class MultiLLM:
     """Router dla wielu LLM providerów"""
@@ -31,6 +42,13 @@ class MultiLLM:
     def __init__(self):
         """Inicjalizacja routera"""
         self.providers = {}
+        self.router = AdaptiveRouter(
+            tiers={key: config["tier"] for key, config in self.PROVIDERS.items()}
+        )
+        self.hedge_policy = HedgePolicy()
+        self.retry = RetryPolicy()
+        # Pamięć podpinana w lifespan (answer_cache.memory = memory_manager)
+        self.answer_cache = SemanticAnswerCache.from_env(providers=self.PROVIDERS)
         self.load_providers()
     
     def load_providers(self):
@@ -61,43 +79,232 @@ class MultiLLM:
         """Pobierz listę providerów"""
         return self.get_available_models()
     
-    def check_provider_availability(self, provider: str) -> bool:
-        """Sprawdzaj dostępność providera"""
+    def check_provider_availability(self, provider: str, api_key: Optional[str] = None) -> bool:
+        """Sprawdzaj dostępność providera (klucz użytkownika lub z env)"""
         if provider not in self.PROVIDERS:
             return False
+        if api_key:
+            return True
         
         config = self.PROVIDERS[provider]
         api_key = os.getenv(config["env"])
         return api_key is not None and len(api_key) > 0
     
-    async def execute(self, provider: str, task: str, **kwargs) -> Dict[str, Any]:
-        """Wykonaj zadanie na wybranym providerze"""
-        if not self.check_provider_availability(provider):
+    async def execute(
+        self, provider: str, task: str, hedge: bool = False, use_cache: bool = True, **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Wykonaj zadanie na wybranym providerze (z pomiarem do routera)
+        
+        Args:
+            provider: Główny provider
+            task: Zadanie
+            hedge: Wyślij zapytanie zapasowe do drugiego providera,
+                gdy główny nie odpowie w czasie swojego percentyla opóźnień
+            use_cache: Zwróć zapisaną odpowiedź dla podobnego zadania (answer cache)
+            user: (kwarg) Użytkownik dla limitu zapytań per użytkownik
+            api_key: (kwarg) Klucz użytkownika zamiast klucza z env
+        """
+        api_key = kwargs.pop("api_key", None)
+        if not self.check_provider_availability(provider, api_key):
             return {
                 "error": f"Provider '{provider}' niedostępny lub brak klucza API",
                 "provider": provider,
                 "success": False
             }
+        if api_key:
+            # Klucz dotyczy tylko tego providera (nie zapasowego przy hedgingu)
+            kwargs["api_keys"] = {**(kwargs.get("api_keys") or {}), provider: api_key}
+        
+        if use_cache:
+            cached = await self.answer_cache.lookup(
+                task, provider, self._tier_cost(provider), user=kwargs.get("user")
+            )
+            if cached is not None:
+                return cached
+        
+        if hedge:
+            backups = [
+                p for p in self.router.rank(self.get_candidates(kwargs.get("api_keys"))) if p != provider
+            ]
+            return await self._execute_hedged(provider, backups[0] if backups else None, task, **kwargs)
+        
+        return await self._execute_measured(provider, task, **kwargs)
+    
+    async def _execute_measured(
+        self,
+        provider: str,
+        task: str,
+        user: Optional[str] = None,
+        api_key: Optional[str] = None,
+        api_keys: Optional[Dict[str, str]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Wywołaj providera przez limiter i circuit breaker, zapisz opóźnienie/wynik w routerze
+        
+        Klucz: `api_key`, potem `api_keys[provider]` (klucze użytkownika), potem env.
+        """
+        api_key = api_key or (api_keys or {}).get(provider)
+        try:
+            await get_rate_limiter().acquire(provider, user, estimate_tokens(task))
+        except RateLimitExceeded as e:
+            return {
+                "error": str(e),
+                "provider": provider,
+                "success": False,
+                "rate_limited": True
+            }
+        
+        breaker = get_breaker(provider)
+        try:
+            breaker.before_call()
+        except CircuitOpenError as e:
+            return {
+                "error": str(e),
+                "provider": provider,
+                "success": False,
+                "circuit_open": True
+            }
         
+        started = time.perf_counter()
+        try:
+            result = await self._call_provider(provider, task, api_key=api_key, **kwargs)
+        except BaseException:
+            # Anulowane wywołanie (przegrany hedge) nie zajmuje slotu próbnego breakera
+            breaker.release()
+            raise
+        ok = bool(result.get("success"))
+        if not ok and not result.get("retryable"):
+            # Odrzucony klucz, błędne zapytanie (4xx) lub błąd lokalny nie świadczą o awarii providera
+            breaker.release()
+            return result
+        self.router.record(provider, time.perf_counter() - started, ok)
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        return result
+    
+    async def _call_provider(
+        self, provider: str, task: str, api_key: Optional[str] = None, **kwargs
+    ) -> Dict[str, Any]:
+        """Wywołaj API providera klientem z rejestru (provider, klucz)"""
+        key_env = self.PROVIDERS[provider]["env"]
         try:
-            # Placeholder dla rzeczywistych implementacji
+            reply = await call_provider(
+                provider,
+                key_env,
+                task,
+                api_key or os.getenv(key_env, ""),
+                self.retry,
+                max_tokens=kwargs.get("max_tokens")
+            )
             return {
                 "provider": provider,
                 "task": task,
-                "result": f"✅ Zadanie '{task}' zostało przesłane do {self.PROVIDERS[provider]['name']}",
+                "result": reply["text"],
+                "model": reply["model"],
+                "usage": reply["usage"],
                 "success": True,
                 "timestamp": datetime.now().isoformat()
             }
-        except Exception as e:
+        except httpx.HTTPStatusError as e:
             return {
                 "error": str(e),
                 "provider": provider,
-                "success": False
+                "success": False,
+                "auth_error": e.response.status_code in (401, 403),
+                "retryable": self._provider_fault(e)
+            }
+        except (httpx.HTTPError, ValueError, KeyError, IndexError, TypeError) as e:
+            return {
+                "error": str(e),
+                "provider": provider,
+                "success": False,
+                "retryable": self._provider_fault(e)
             }
+
+    @staticmethod
+    def _provider_fault(error: Exception) -> bool:
+        """
+        Czy błąd świadczy o awarii providera (liczony w breakerze i routerze)
+
+        Tak jak w RetryPolicy: błędy połączenia i statusy ponawiane
+        (408/429/5xx). Pozostałe 4xx oraz błędy parsowania/konfiguracji
+        wynikają z zapytania lub po naszej stronie.
+        """
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUSES
+        return isinstance(error, httpx.HTTPError)
+    
+    def check_stream(self, provider: str, api_key: Optional[str] = None):
+        """
+        Sprawdź, czy zadanie może być streamowane z providera (przed otwarciem SSE)
+
+        Raises:
+            ValueError: Provider niedostępny, bez adresu API lub bez streamingu
+        """
+        if not self.check_provider_availability(provider, api_key):
+            raise ValueError(f"Provider '{provider}' niedostępny lub brak klucza API")
+        if not supports_stream(provider):
+            raise ValueError(f"Provider '{provider}' nie obsługuje streamingu")
+        provider_endpoint(provider, self.PROVIDERS[provider]["env"])
+
+    async def execute_stream(
+        self,
+        provider: str,
+        task: str,
+        user: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Wykonaj zadanie i zwracaj fragmenty odpowiedzi providera w miarę nadejścia
+
+        Limiter, breaker i router jak w `_execute_measured`; zerwany przez
+        klienta stream nie jest wynikiem (zwalnia slot próbny breakera).
+
+        Raises:
+            RateLimitExceeded: Zbyt długie oczekiwanie na limit
+            CircuitOpenError: Breaker providera otwarty
+            httpx.HTTPError: Błąd połączenia lub status != 2xx
+            ValueError: Provider bez adresu API lub streamingu
+        """
+        key_env = self.PROVIDERS[provider]["env"]
+        await get_rate_limiter().acquire(provider, user, estimate_tokens(task))
+        breaker = get_breaker(provider)
+        breaker.before_call()
+        started = time.perf_counter()
+        ok = None
+        try:
+            async for delta in stream_provider(
+                provider, key_env, task, api_key or os.getenv(key_env, ""), max_tokens
+            ):
+                yield delta
+            ok = True
+        except (httpx.HTTPError, ValueError, KeyError, IndexError, TypeError) as e:
+            ok = False if self._provider_fault(e) else None
+            raise
+        finally:
+            if ok is None:
+                breaker.release()
+            else:
+                self.router.record(provider, time.perf_counter() - started, ok)
+                if ok:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
     
-    async def execute_auto(self, task: str, **kwargs) -> Dict[str, Any]:
-        """Automatycznie wybierz providera i wykonaj zadanie"""
-        available = [p for p in self.PROVIDERS if self.check_provider_availability(p)]
+    async def execute_auto(
+        self, task: str, hedge: bool = False, use_cache: bool = True, **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Automatycznie wybierz providera i wykonaj zadanie (hedge i use_cache jak w execute)
+        
+        Kwarg `api_keys` ({provider: klucz}) dokłada providery z kluczami użytkownika.
+        """
+        available = self.get_candidates(kwargs.get("api_keys"))
         
         if not available:
             return {
@@ -105,6 +312,58 @@ class MultiLLM:
                 "success": False
             }
         
-        # Wybierz pierwszego dostępnego (można ulepszyć logikę)
-        provider = available[0]
-        return await self.execute(provider, task, **kwargs)
+        # Najlepszy wynik wg opóźnienia, błędów i kosztu tieru
+        ranked = self.router.rank(available)
+        if use_cache:
+            # Provider przekazywany zawsze - lookup pomija go, gdy same_provider=False
+            cached = await self.answer_cache.lookup(
+                task, ranked[0], self._tier_cost(ranked[0]), user=kwargs.get("user")
+            )
+            if cached is not None:
+                return cached
+        if hedge:
+            backup = ranked[1] if len(ranked) > 1 else None
+            return await self._execute_hedged(ranked[0], backup, task, **kwargs)
+        return await self._execute_measured(ranked[0], task, **kwargs)
+    
+    async def _execute_hedged(
+        self, provider: str, backup: Optional[str], task: str, **kwargs
+    ) -> Dict[str, Any]:
+        """Wykonaj zadanie z zapytaniem zapasowym do `backup`"""
+        delay = self.hedge_policy.delay_for(self.router.stats.get(provider))
+        backup_call = None
+        backup_cost = 0.0
+        if backup is not None:
+            backup_call = partial(self._execute_measured, backup, task, **kwargs)
+            backup_cost = self._tier_cost(backup)
+        
+        return await hedged_call(
+            partial(self._execute_measured, provider, task, **kwargs),
+            backup_call,
+            delay,
+            self.hedge_policy,
+            backup_cost
+        )
+    
+    def _tier_cost(self, provider: str) -> float:
+        """Względny koszt wywołania providera (wg tieru)"""
+        return self.router.TIER_COST.get(self.PROVIDERS[provider]["tier"], 0.5)
+    
+    def get_candidates(self, api_keys: Optional[Dict[str, str]] = None) -> List[str]:
+        """Providery, które mogą obsłużyć zadanie (z kluczem i zamkniętym breakerem)"""
+        api_keys = api_keys or {}
+        return [
+            p for p in self.PROVIDERS
+            if self.check_provider_availability(p, api_keys.get(p)) and get_breaker(p).is_available()
+        ]
+    
+    def get_scoreboard(self) -> Dict[str, Any]:
+        """Ranking providerów routera z aktualnymi statystykami"""
+        return {
+            "weights": self.router.weights,
+            "candidates": self.router.scoreboard(self.get_candidates()),
+            "hedging": self.hedge_policy.stats(),
+            "answer_cache": self.answer_cache.stats(),
+            "circuit_breakers": breakers_snapshot(),
+            "tracked": {p: s.snapshot() for p, s in self.router.stats.items()}
+        }
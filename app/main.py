@@ -1,21 +1,40 @@
 """
 AI Browser Agent - Główna aplikacja FastAPI
 """
-from fastapi import FastAPI, WebSocket, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, WebSocket, HTTPException, Request, Depends
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from datetime import datetime
 import os
 import json
+import time
+import asyncio
 from pathlib import Path
+from typing import Any, Dict, Optional
 
 # Import modułów aplikacji
 from app.llm_router import MultiLLM
-from app.browser_automation import BrowserAutomation
-from app.memory_manager import MemoryManager
+from app.browser_fleet import create_browser_automation
+from app.browser_script import parse_script
+from app.browser_profiles import resolve_profile
+from app.memory_shards import ShardedMemory
+from app.memory_export import EXPORT_FORMATS, make_compressor, ndjson_stream
 from app.perplexity_api import get_perplexity_client, close_perplexity_client
+from app.streaming import sse_response
+from app.http_clients import get_client_registry, close_client_registry
+from app.response_cache import close_response_cache
+from app.rate_limit import get_rate_limiter
+from app.request_user import get_request_user, get_admin_user
+
+try:
+    from app.routes_extension import router as extension_router
+    EXTENSION_AVAILABLE = True
+except ImportError as e:
+    extension_router = None
+    EXTENSION_AVAILABLE = False
+    print(f"⚠️ Logowanie extension niedostępne (brak zależności auth): {e}")
 
 # Inicjalizacja menedżerów
 multi_llm = None
@@ -34,8 +53,11 @@ async def lifespan(app: FastAPI):
     # Inicjalizacja komponentów
     try:
         multi_llm = MultiLLM()
-        browser_auto = BrowserAutomation()
-        memory_manager = MemoryManager()
+        browser_auto = create_browser_automation()
+        memory_manager = ShardedMemory.from_env(persist_dir=os.getenv("MEMORY_DIR", "memory") or None)
+        multi_llm.answer_cache.memory = memory_manager
+        get_client_registry().start()
+        await browser_auto.start()
         perplexity_client = await get_perplexity_client()
         print("✅ Wszystkie komponenty zainicjalizowane")
     except Exception as e:
@@ -48,8 +70,12 @@ async def lifespan(app: FastAPI):
     print("🧹 Zamykanie aplikacji...")
     if browser_auto:
         await browser_auto.cleanup()
+    if memory_manager:
+        await memory_manager.close()
     if perplexity_client:
         await close_perplexity_client()
+    await close_client_registry()
+    close_response_cache()
     print("✅ Aplikacja zamknięta")
 
 
@@ -70,6 +96,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Logowanie Chrome extension (sesje dla get_request_user)
+if extension_router is not None:
+    app.include_router(extension_router)
+
 # Montowanie frontend'u
 try:
     app.mount("/static", StaticFiles(directory="web"), name="static")
@@ -193,13 +223,185 @@ async def get_providers():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/http-clients/stats")
+async def get_http_clients_stats():
+    """Statystyki puli klientów HTTP (provider, klucz API)"""
+    return {
+        **get_client_registry().stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/rate-limits")
+async def get_rate_limits():
+    """Metryki limitera (głębokość kolejki, czasy oczekiwania per bucket)"""
+    return {
+        **get_rate_limiter().metrics(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/answer-cache/stats")
+async def get_answer_cache_stats():
+    """Statystyki cache odpowiedzi (trafienia, zaoszczędzony koszt i tokeny)"""
+    if multi_llm is None:
+        raise HTTPException(status_code=503, detail="LLM Router nie zainicjalizowany")
+    
+    return {
+        **multi_llm.answer_cache.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/router/scoreboard")
+async def get_router_scoreboard():
+    """Ranking providerów routera (EWMA, p95, błędy, koszt)"""
+    if multi_llm is None:
+        raise HTTPException(status_code=503, detail="LLM Router nie zainicjalizowany")
+    
+    return {
+        **multi_llm.get_scoreboard(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 # ============================================================================
 # AGENT EXECUTION ENDPOINTS
 # ============================================================================
 
+@app.post("/api/agent/auto/execute")
+async def execute_agent_auto(request_data: dict, user: Optional[str] = Depends(get_request_user)):
+    """Wykonaj zadanie - wybór providera automatycznie (router adaptacyjny)"""
+    try:
+        if multi_llm is None:
+            raise HTTPException(status_code=503, detail="LLM Router nie zainicjalizowany")
+        
+        task = request_data.get("task")
+        if not task:
+            raise HTTPException(status_code=400, detail="Brak zadania (task)")
+        
+        # Automatycznie wybierz najlepszego providera
+        result = await multi_llm.execute_auto(
+            task,
+            hedge=bool(request_data.get("hedge")),
+            use_cache=not request_data.get("no_cache", False),
+            user=user
+        )
+        
+        return {
+            "provider": result.get("provider"),
+            "task": task,
+            "result": result,
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _run_agent_task(
+    provider: str, task: str, user: Optional[str] = None, **kwargs
+) -> Dict[str, Any]:
+    """Wykonaj pojedyncze zadanie (perplexity / auto / provider z routera)"""
+    if provider == "perplexity" and perplexity_client:
+        started = time.perf_counter()
+        api_response = await perplexity_client.query(task, user=user)
+        multi_llm.router.record(
+            provider, time.perf_counter() - started, "error" not in api_response
+        )
+        if "error" in api_response:
+            return {"provider": provider, "error": api_response["error"], "success": False}
+        content = api_response.get("choices", [{}])[0].get("message", {}).get("content", "")
+        return {"provider": provider, "result": content, "model": "sonar", "success": True}
+    if provider == "auto":
+        return await multi_llm.execute_auto(task, user=user, **kwargs)
+    return await multi_llm.execute(provider, task, user=user, **kwargs)
+
+
+@app.post("/api/agent/batch")
+async def execute_agent_batch(request_data: dict, user: Optional[str] = Depends(get_request_user)):
+    """
+    Wykonaj listę zadań z ograniczoną współbieżnością
+    
+    Body: {"tasks": ["...", {"task": "...", "provider": "gpt", "id": "..."}],
+           "provider": "auto", "concurrency": 8}
+    Wyniki wracają jako NDJSON w kolejności ukończenia. Błąd jednego
+    zadania nie przerywa pozostałych. Udane interakcje trafiają do pamięci
+    jednym zapisem wsadowym po zakończeniu batcha.
+    """
+    if multi_llm is None:
+        raise HTTPException(status_code=503, detail="LLM Router nie zainicjalizowany")
+    
+    items = request_data.get("tasks")
+    if not items or not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Brak listy zadań (tasks)")
+    
+    max_tasks = int(os.getenv("AGENT_BATCH_MAX_TASKS", "1000"))
+    if len(items) > max_tasks:
+        raise HTTPException(status_code=413, detail=f"Za dużo zadań (max {max_tasks})")
+    
+    default_provider = request_data.get("provider", "auto")
+    max_concurrency = int(os.getenv("AGENT_BATCH_MAX_CONCURRENCY", "32"))
+    concurrency = request_data.get("concurrency", 8)
+    if isinstance(concurrency, bool) or not isinstance(concurrency, int):
+        raise HTTPException(status_code=400, detail="concurrency musi być liczbą całkowitą")
+    concurrency = max(1, min(concurrency, max_concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run_item(index: int, item: Any) -> Dict[str, Any]:
+        if isinstance(item, str):
+            item = {"task": item}
+        record = {"index": index, "id": None, "provider": default_provider, "task": None}
+        try:
+            record["id"] = item.get("id")
+            record["provider"] = item.get("provider", default_provider)
+            record["task"] = item.get("task")
+            if not record["task"]:
+                raise ValueError("Brak zadania (task)")
+            
+            async with semaphore:
+                result = await _run_agent_task(record["provider"], record["task"], user=user)
+            
+            record["provider"] = result.get("provider", record["provider"])
+            record["success"] = bool(result.get("success"))
+            if record["success"]:
+                record["result"] = result
+            else:
+                record["error"] = result.get("error", "Nieznany błąd")
+        except Exception as e:
+            record["success"] = False
+            record["error"] = str(e)
+        return record
+    
+    async def stream_results():
+        tasks = [asyncio.ensure_future(run_item(i, item)) for i, item in enumerate(items)]
+        completed = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                record = await next_done
+                if record["success"] and not record["result"].get("cached"):
+                    completed.append({
+                        "provider": record["provider"],
+                        "task": record["task"],
+                        "result": record["result"]
+                    })
+                yield json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            if memory_manager and completed:
+                await memory_manager.store_interactions(completed, user=user)
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 @app.post("/api/agent/{provider}/execute")
-async def execute_agent(provider: str, request_data: dict):
-    """Wykonaj zadanie za pomocą wybranego providera"""
+async def execute_agent(
+    provider: str,
+    request_data: dict,
+    request: Request,
+    user: Optional[str] = Depends(get_request_user)
+):
+    """Wykonaj zadanie za pomocą wybranego providera (stream=true -> SSE)"""
     try:
         if multi_llm is None:
             raise HTTPException(status_code=503, detail="LLM Router nie zainicjalizowany")
@@ -208,17 +410,47 @@ async def execute_agent(provider: str, request_data: dict):
         if not task:
             raise HTTPException(status_code=400, detail="Brak zadania (task)")
         
+        if request_data.get("stream"):
+            if provider == "perplexity" and perplexity_client:
+                chunks = perplexity_client.query_stream(task, user=user)
+                model = "sonar"
+            else:
+                try:
+                    multi_llm.check_stream(provider)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                chunks = multi_llm.execute_stream(provider, task, user=user)
+                model = provider
+            
+            async def on_complete(content: str):
+                if memory_manager:
+                    await memory_manager.store_interaction(
+                        provider=provider,
+                        task=task,
+                        result={"content": content, "model": model, "streamed": True},
+                        user=user
+                    )
+            
+            return sse_response(chunks, request, on_complete)
+        
         # Specjalne obsługiwanie Perplexity
         if provider == "perplexity" and perplexity_client:
             try:
-                api_response = await perplexity_client.query(task)
+                started = time.perf_counter()
+                api_response = await perplexity_client.query(
+                    task, use_cache=not request_data.get("no_cache", False), user=user
+                )
+                multi_llm.router.record(
+                    provider, time.perf_counter() - started, "error" not in api_response
+                )
                 result = api_response.get("choices", [{}])[0].get("message", {}).get("content", "")
                 
                 if memory_manager:
                     await memory_manager.store_interaction(
                         provider=provider,
                         task=task,
-                        result={"content": result, "model": "sonar"}
+                        result={"content": result, "model": "sonar"},
+                        user=user
                     )
                 
                 return {
@@ -231,14 +463,21 @@ async def execute_agent(provider: str, request_data: dict):
                 raise HTTPException(status_code=500, detail=f"Perplexity error: {str(e)}")
         
         # Standardowe providery
-        result = await multi_llm.execute(provider, task)
+        result = await multi_llm.execute(
+            provider,
+            task,
+            hedge=bool(request_data.get("hedge")),
+            use_cache=not request_data.get("no_cache", False),
+            user=user
+        )
         
-        # Zapisz do pamięci
-        if memory_manager:
+        # Zapisz do pamięci (odpowiedzi z cache już w niej są)
+        if memory_manager and not result.get("cached"):
             await memory_manager.store_interaction(
                 provider=provider,
                 task=task,
-                result=result
+                result=result,
+                user=user
             )
         
         return {
@@ -247,29 +486,8 @@ async def execute_agent(provider: str, request_data: dict):
             "result": result,
             "timestamp": datetime.now().isoformat()
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.post("/api/agent/auto/execute")
-async def execute_agent_auto(request_data: dict):
-    """Wykonaj zadanie - wybór providera automatycznie"""
-    try:
-        if multi_llm is None:
-            raise HTTPException(status_code=503, detail="LLM Router nie zainicjalizowany")
-        
-        task = request_data.get("task")
-        if not task:
-            raise HTTPException(status_code=400, detail="Brak zadania (task)")
-        
-        # Automatycznie wybierz najlepszego providera
-        result = await multi_llm.execute_auto(task)
-        
-        return {
-            "task": task,
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -278,6 +496,19 @@ async def execute_agent_auto(request_data: dict):
 # PERPLEXITY SPECIFIC ENDPOINTS
 # ============================================================================
 
+def _store_streamed(provider: str, task: str, user: Optional[str] = None):
+    """Callback zapisujący pełny wynik streamu do pamięci użytkownika"""
+    async def on_complete(content: str):
+        if memory_manager:
+            await memory_manager.store_interaction(
+                provider=provider,
+                task=task,
+                result={"content": content, "model": "sonar", "streamed": True},
+                user=user
+            )
+    return on_complete
+
+
 @app.post("/api/perplexity/search")
 async def perplexity_search(request_data: dict):
     """Wyszukaj online (Perplexity Deep Research)"""
@@ -301,8 +532,10 @@ async def perplexity_search(request_data: dict):
 
 
 @app.post("/api/perplexity/summarize")
-async def perplexity_summarize(request_data: dict):
-    """Podsumuj tekst"""
+async def perplexity_summarize(
+    request_data: dict, request: Request, user: Optional[str] = Depends(get_request_user)
+):
+    """Podsumuj tekst (stream=true -> SSE)"""
     try:
         if perplexity_client is None:
             raise HTTPException(status_code=503, detail="Perplexity nie zainicjalizowany")
@@ -312,7 +545,13 @@ async def perplexity_summarize(request_data: dict):
             raise HTTPException(status_code=400, detail="Brak tekstu")
         
         max_length = request_data.get("max_length", 300)
-        summary = await perplexity_client.summarize(text, max_length)
+        if request_data.get("stream"):
+            chunks = await perplexity_client.summarize(text, max_length, stream=True, user=user)
+            return sse_response(chunks, request, _store_streamed("perplexity-summarize", text, user))
+        
+        summary = await perplexity_client.summarize(
+            text, max_length, use_cache=not request_data.get("no_cache", False), user=user
+        )
         
         return {
             "original_length": len(text),
@@ -325,7 +564,7 @@ async def perplexity_summarize(request_data: dict):
 
 
 @app.post("/api/perplexity/generate-comment")
-async def perplexity_generate_comment(request_data: dict):
+async def perplexity_generate_comment(request_data: dict, user: Optional[str] = Depends(get_request_user)):
     """Generuj komentarz GitHub/Social"""
     try:
         if perplexity_client is None:
@@ -337,7 +576,9 @@ async def perplexity_generate_comment(request_data: dict):
         if not context:
             raise HTTPException(status_code=400, detail="Brak context")
         
-        comment = await perplexity_client.generate_comment(context, comment_type)
+        comment = await perplexity_client.generate_comment(
+            context, comment_type, use_cache=not request_data.get("no_cache", False), user=user
+        )
         
         return {
             "type": comment_type,
@@ -350,8 +591,10 @@ async def perplexity_generate_comment(request_data: dict):
 
 
 @app.post("/api/perplexity/code-review")
-async def perplexity_code_review(request_data: dict):
-    """Przegląd kodu AI"""
+async def perplexity_code_review(
+    request_data: dict, request: Request, user: Optional[str] = Depends(get_request_user)
+):
+    """Przegląd kodu AI (stream=true -> SSE)"""
     try:
         if perplexity_client is None:
             raise HTTPException(status_code=503, detail="Perplexity nie zainicjalizowany")
@@ -360,7 +603,13 @@ async def perplexity_code_review(request_data: dict):
         if not code:
             raise HTTPException(status_code=400, detail="Brak kodu")
         
-        review = await perplexity_client.code_review(code)
+        if request_data.get("stream"):
+            chunks = await perplexity_client.code_review(code, stream=True, user=user)
+            return sse_response(chunks, request, _store_streamed("perplexity-code-review", code, user))
+        
+        review = await perplexity_client.code_review(
+            code, use_cache=not request_data.get("no_cache", False), user=user
+        )
         
         return {
             "code_length": len(code),
@@ -372,8 +621,10 @@ async def perplexity_code_review(request_data: dict):
 
 
 @app.post("/api/perplexity/translate")
-async def perplexity_translate(request_data: dict):
-    """Przetłumacz tekst"""
+async def perplexity_translate(
+    request_data: dict, request: Request, user: Optional[str] = Depends(get_request_user)
+):
+    """Przetłumacz tekst (stream=true -> SSE)"""
     try:
         if perplexity_client is None:
             raise HTTPException(status_code=503, detail="Perplexity nie zainicjalizowany")
@@ -384,7 +635,13 @@ async def perplexity_translate(request_data: dict):
         if not text:
             raise HTTPException(status_code=400, detail="Brak tekstu")
         
-        translation = await perplexity_client.translate(text, target_language)
+        if request_data.get("stream"):
+            chunks = await perplexity_client.translate(text, target_language, stream=True, user=user)
+            return sse_response(chunks, request, _store_streamed("perplexity-translate", text, user))
+        
+        translation = await perplexity_client.translate(
+            text, target_language, use_cache=not request_data.get("no_cache", False), user=user
+        )
         
         return {
             "source_text": text,
@@ -396,42 +653,236 @@ async def perplexity_translate(request_data: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/perplexity/cache/stats")
+async def perplexity_cache_stats():
+    """Statystyki cache odpowiedzi i koalescencji zapytań w locie"""
+    if perplexity_client is None:
+        raise HTTPException(status_code=503, detail="Perplexity nie zainicjalizowany")
+    
+    return {
+        "cache": perplexity_client.cache.stats(),
+        "inflight": perplexity_client.inflight.stats(),
+        "retries": perplexity_client.retry.retries,
+        "circuit_breaker": perplexity_client.breaker.snapshot(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 # ============================================================================
 # BROWSER AUTOMATION ENDPOINTS
 # ============================================================================
 
+def _web_url(value: Any, required: bool = True) -> Optional[str]:
+    """URL http(s) z body; inne schematy (file://, chrome://, javascript:) -> 400"""
+    if value is None and not required:
+        return None
+    if not isinstance(value, str) or not value.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="Brak URL http(s)")
+    return value
+
+
+def _browser_session(session_id: Any, user: Optional[str]) -> Optional[str]:
+    """session_id w przestrzeni nazw użytkownika - cudza sesja o tej samej nazwie jest niewidoczna"""
+    if session_id is None:
+        return None
+    if not isinstance(session_id, str) or not session_id:
+        raise HTTPException(status_code=400, detail="session_id musi być niepustym tekstem")
+    return f"{user or 'anonymous'}/{session_id}"
+
+
 @app.post("/api/browser/navigate")
-async def browser_navigate(request_data: dict):
-    """Nawiguj na zadaną stronę"""
+async def browser_navigate(request_data: dict, user: Optional[str] = Depends(get_request_user)):
+    """
+    Nawiguj na zadaną stronę
+    
+    Body: {"url", "session_id": opcjonalnie, "profile": full / lean / text,
+    "block": {"block_types", "block_patterns", "wait_until"} - nadpisania profilu}
+    """
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    url = _web_url(request_data.get("url"))
+    session_id = _browser_session(request_data.get("session_id"), user)
     try:
-        if browser_auto is None:
-            raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
-        
-        url = request_data.get("url")
-        if not url:
-            raise HTTPException(status_code=400, detail="Brak URL")
-        
-        result = await browser_auto.navigate(url)
-        return {"url": url, "success": result, "timestamp": datetime.now().isoformat()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        profile = resolve_profile(request_data.get("profile"), request_data.get("block"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = await browser_auto.navigate(url, session_id=session_id, profile=profile)
+    return {"url": url, **result, "timestamp": datetime.now().isoformat()}
 
 
 @app.post("/api/browser/click")
-async def browser_click(request_data: dict):
-    """Kliknij na element"""
+async def browser_click(request_data: dict, user: Optional[str] = Depends(get_request_user)):
+    """Kliknij na element (w sesji session_id lub po przejściu na url)"""
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    selector = request_data.get("selector")
+    if not selector:
+        raise HTTPException(status_code=400, detail="Brak selectora")
+    
+    result = await browser_auto.click(
+        selector,
+        session_id=_browser_session(request_data.get("session_id"), user),
+        url=_web_url(request_data.get("url"), required=False)
+    )
+    return {"selector": selector, **result, "timestamp": datetime.now().isoformat()}
+
+
+@app.post("/api/browser/fill")
+async def browser_fill(request_data: dict, user: Optional[str] = Depends(get_request_user)):
+    """Wpisz tekst w pole (w sesji session_id lub po przejściu na url)"""
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    selector = request_data.get("selector")
+    if not selector:
+        raise HTTPException(status_code=400, detail="Brak selectora")
+    
+    result = await browser_auto.fill(
+        selector,
+        request_data.get("text", ""),
+        session_id=_browser_session(request_data.get("session_id"), user),
+        url=_web_url(request_data.get("url"), required=False)
+    )
+    return {"selector": selector, **result, "timestamp": datetime.now().isoformat()}
+
+
+@app.post("/api/browser/extract")
+async def browser_extract(request_data: dict):
+    """
+    Treść strony (title, text, opcjonalnie html) z cache stron lub z renderu
+    
+    Body: {"url", "profile", "block", "html": false, "cache": true}.
+    Trafienie w cache (świeże lub potwierdzone 304) pomija przeglądarkę.
+    """
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    url = _web_url(request_data.get("url"))
     try:
-        if browser_auto is None:
-            raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
-        
-        selector = request_data.get("selector")
-        if not selector:
-            raise HTTPException(status_code=400, detail="Brak selectora")
-        
-        result = await browser_auto.click(selector)
-        return {"selector": selector, "success": result, "timestamp": datetime.now().isoformat()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        profile = resolve_profile(request_data.get("profile"), request_data.get("block"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = await browser_auto.extract(
+        url,
+        profile=profile,
+        include_html=bool(request_data.get("html", False)),
+        use_cache=request_data.get("cache", True)
+    )
+    return {**result, "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/api/browser/page-cache")
+async def browser_page_cache_stats():
+    """Statystyki cache stron (trafienia, rewalidacje 304, rozmiar)"""
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    return {**browser_auto.page_cache_stats(), "timestamp": datetime.now().isoformat()}
+
+
+@app.delete("/api/browser/page-cache")
+async def browser_page_cache_invalidate(url: Optional[str] = None):
+    """Usuń stronę z cache (bez url - wyczyść cały cache)"""
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    return {"invalidated": await browser_auto.invalidate_pages(url), "timestamp": datetime.now().isoformat()}
+
+
+@app.post("/api/browser/script")
+async def browser_script(request_data: dict, user: Optional[str] = Depends(get_request_user)):
+    """
+    Wykonaj skrypt kroków navigate / click / fill / wait / extract na jednej stronie
+    
+    Body: {"steps": [{"action": "navigate", "url": ...}, ...], "session_id": opcjonalnie}.
+    Kroki są walidowane raz przed startem; wykonanie zatrzymuje się na pierwszym błędzie.
+    """
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    session_id = _browser_session(request_data.get("session_id"), user)
+    try:
+        steps = parse_script(request_data.get("steps"))
+        profile = resolve_profile(request_data.get("profile"), request_data.get("block"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = await browser_auto.run_script(steps, session_id=session_id, profile=profile)
+    return {**result, "timestamp": datetime.now().isoformat()}
+
+
+@app.post("/api/browser/scripts")
+async def browser_scripts(request_data: dict, user: Optional[str] = Depends(get_request_user)):
+    """
+    Wykonaj wiele niezależnych skryptów równolegle w puli przeglądarek
+    
+    Body: {"scripts": [{"steps": [...], "session_id": opcjonalnie}, ...]}
+    """
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    scripts = request_data.get("scripts")
+    if not isinstance(scripts, list) or not scripts:
+        raise HTTPException(status_code=400, detail="Brak listy scripts")
+    max_scripts = int(os.getenv("BROWSER_SCRIPT_MAX_BATCH", "50"))
+    if len(scripts) > max_scripts:
+        raise HTTPException(status_code=400, detail=f"Najwyżej {max_scripts} skryptów w jednym żądaniu")
+    
+    try:
+        parsed = []
+        for i, script in enumerate(scripts):
+            if not isinstance(script, dict):
+                raise ValueError("oczekiwano obiektu")
+            parsed.append({
+                "steps": parse_script(script.get("steps")),
+                "session_id": _browser_session(script.get("session_id"), user),
+                "profile": resolve_profile(script.get("profile"), script.get("block"))
+            })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Skrypt {i}: {e}")
+    
+    started = time.perf_counter()
+    results = await browser_auto.run_scripts(parsed)
+    return {
+        "results": results,
+        "count": len(results),
+        "succeeded": sum(1 for result in results if result["success"]),
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.delete("/api/browser/session/{session_id}")
+async def browser_close_session(session_id: str, user: Optional[str] = Depends(get_request_user)):
+    """Zamknij sesję przeglądarki (tylko własną) i zwolnij jej kontekst"""
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    if not await browser_auto.close_session(_browser_session(session_id, user)):
+        raise HTTPException(status_code=404, detail="Nieznana sesja")
+    return {"session_id": session_id, "closed": True}
+
+
+@app.get("/api/browser/profiles")
+async def browser_profiles():
+    """Profile nawigacji i ich statystyki: średni czas ładowania, bajty, zablokowane żądania"""
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    return {**browser_auto.profiles(), "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/api/browser/pool")
+async def browser_pool_stats():
+    """Statystyki puli przeglądarek (instancje, konteksty, wypożyczenia, recykling)"""
+    if browser_auto is None:
+        raise HTTPException(status_code=503, detail="Browser Automation nie zainicjalizowany")
+    
+    return {**browser_auto.stats(), "timestamp": datetime.now().isoformat()}
 
 
 # ============================================================================
@@ -439,17 +890,93 @@ async def browser_click(request_data: dict):
 # ============================================================================
 
 @app.get("/api/memory/search")
-async def memory_search(query: str):
-    """Przeszukaj pamięć"""
+async def memory_search(
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+    provider: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    match: str = "all",
+    mode: str = "keyword",
+    user: Optional[str] = Depends(get_request_user)
+):
+    """Przeszukaj pamięć użytkownika (BM25 lub semantycznie, filtry provider/since/until, paginacja)"""
+    if mode not in ("keyword", "semantic"):
+        raise HTTPException(status_code=400, detail="mode musi być keyword lub semantic")
+    
     try:
         if memory_manager is None:
             raise HTTPException(status_code=503, detail="Memory Manager nie zainicjalizowany")
         
-        results = await memory_manager.search(query)
+        limit = max(1, min(limit, 100))
+        offset = max(0, offset)
+        found = await memory_manager.search(
+            query,
+            user=user,
+            limit=limit,
+            offset=offset,
+            provider=provider,
+            since=since,
+            until=until,
+            match=match,
+            mode=mode
+        )
         return {
             "query": query,
-            "results": results,
-            "count": len(results),
+            "mode": mode,
+            "results": found["results"],
+            "count": len(found["results"]),
+            "total": found["total"],
+            "limit": limit,
+            "offset": offset,
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/memory/admin/search")
+async def memory_admin_search(
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+    provider: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    match: str = "all",
+    mode: str = "keyword",
+    admin: str = Depends(get_admin_user)
+):
+    """Przeszukaj pamięć wszystkich użytkowników (równolegle po shardach, scalony top-k)"""
+    if mode not in ("keyword", "semantic"):
+        raise HTTPException(status_code=400, detail="mode musi być keyword lub semantic")
+    
+    try:
+        if memory_manager is None:
+            raise HTTPException(status_code=503, detail="Memory Manager nie zainicjalizowany")
+        
+        limit = max(1, min(limit, 100))
+        offset = max(0, offset)
+        found = await memory_manager.admin_search(
+            query,
+            limit=limit,
+            offset=offset,
+            provider=provider,
+            since=since,
+            until=until,
+            match=match,
+            mode=mode
+        )
+        return {
+            "query": query,
+            "mode": mode,
+            "results": found["results"],
+            "count": len(found["results"]),
+            "total": found["total"],
+            "shards": found["shards"],
+            "limit": limit,
+            "offset": offset,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -457,22 +984,93 @@ async def memory_search(query: str):
 
 
 @app.get("/api/memory/history")
-async def memory_history(limit: int = 10):
-    """Pobierz historię interakcji"""
+async def memory_history(
+    limit: int = 10,
+    cursor: Optional[int] = None,
+    user: Optional[str] = Depends(get_request_user)
+):
+    """
+    Pobierz historię interakcji użytkownika (strona po stronie)
+    
+    Kolejna (starsza) strona: `cursor` = `next_cursor` z poprzedniej
+    odpowiedzi; `next_cursor` = null oznacza koniec historii.
+    """
     try:
         if memory_manager is None:
             raise HTTPException(status_code=503, detail="Memory Manager nie zainicjalizowany")
         
-        history = await memory_manager.get_history(limit)
+        # Jeden rekord więcej - wiadomo, czy istnieje starsza strona
+        history = await memory_manager.get_history(limit + 1, user=user, cursor=cursor)
+        more = len(history) > limit
+        if more:
+            history = history[1:]
         return {
             "history": history,
             "count": len(history),
+            "next_cursor": history[0]["id"] if more and history else None,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/memory/export")
+async def memory_export(
+    provider: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    compression: str = "none",
+    user: Optional[str] = Depends(get_request_user)
+):
+    """
+    Eksport całej pamięci użytkownika jako NDJSON (compression: none / gzip / zstd)
+    
+    Rekordy są czytane z logu partiami i od razu wysyłane, więc zużycie
+    pamięci nie zależy od rozmiaru eksportu.
+    """
+    if memory_manager is None:
+        raise HTTPException(status_code=503, detail="Memory Manager nie zainicjalizowany")
+    
+    # Walidacja przed startem strumienia - potem nie da się już zwrócić 400
+    try:
+        compressor = make_compressor(compression)
+        for value in (since, until):
+            if value:
+                datetime.fromisoformat(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    media_type, extension = EXPORT_FORMATS[compression]
+    chunks = memory_manager.export(user=user, provider=provider, since=since, until=until)
+    return StreamingResponse(
+        ndjson_stream(chunks, compression, compressor=compressor),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=memory-export.{extension}"}
+    )
+
+
+@app.get("/api/memory/stats")
+async def memory_stats(user: Optional[str] = Depends(get_request_user)):
+    """Statystyki pamięci użytkownika (interakcje, indeks, segmenty na dysku, limity)"""
+    if memory_manager is None:
+        raise HTTPException(status_code=503, detail="Memory Manager nie zainicjalizowany")
+    
+    return {**memory_manager.stats(user), "timestamp": datetime.now().isoformat()}
+
+
+@app.post("/api/memory/compact")
+async def memory_compact(admin: str = Depends(get_admin_user)):
+    """Kompakcja zamkniętych segmentów logu pamięci (wszystkie shardy)"""
+    try:
+        if memory_manager is None:
+            raise HTTPException(status_code=503, detail="Memory Manager nie zainicjalizowany")
+        
+        result = await memory_manager.compact()
+        return {**result, "timestamp": datetime.now().isoformat()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ============================================================================
 # ATLAS AI SYSTEM ENDPOINTS
 # ============================================================================
@@ -506,7 +1104,7 @@ async def get_atlas_agents():
 
 
 @app.post("/api/atlas/qualify-lead")
-async def atlas_qualify_lead(request_data: dict):
+async def atlas_qualify_lead(request_data: dict, user: Optional[str] = Depends(get_request_user)):
     """Kwalifikuj leada według ATLAS"""
     try:
         message = request_data.get("message", "")
@@ -530,7 +1128,9 @@ Zbierz:
 
 Oceń w skali 1-10 i napisz czy warto rozmawiać."""
 
-            result = await perplexity_client.query(prompt)
+            result = await perplexity_client.query(
+                prompt, use_cache=not request_data.get("no_cache", False), user=user
+            )
             analysis = result.get("choices", [{}])[0].get("message", {}).get("content", "")
             
             return {
@@ -546,7 +1146,7 @@ Oceń w skali 1-10 i napisz czy warto rozmawiać."""
 
 
 @app.post("/api/atlas/generate-response")
-async def atlas_generate_response(request_data: dict):
+async def atlas_generate_response(request_data: dict, user: Optional[str] = Depends(get_request_user)):
     """Wygeneruj odpowiedź w stylu ATLAS"""
     try:
         message = request_data.get("message", "")
@@ -570,7 +1170,9 @@ Zasady:
 - Nie obiecuj nic bez zgody szefa
 - Jeśli lead słaby - grzecznie zamknij"""
 
-            result = await perplexity_client.query(prompt)
+            result = await perplexity_client.query(
+                prompt, use_cache=not request_data.get("no_cache", False), user=user
+            )
             response = result.get("choices", [{}])[0].get("message", {}).get("content", "")
             
             return {
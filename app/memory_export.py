@@ -0,0 +1,74 @@
+"""
+Memory Export - Strumieniowy eksport pamięci do NDJSON (opcjonalnie gzip / zstd)
+"""
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+
+# kompresja -> (media type, rozszerzenie pliku)
+EXPORT_FORMATS = {
+    "none": ("application/x-ndjson", "ndjson"),
+    "gzip": ("application/gzip", "ndjson.gz"),
+    "zstd": ("application/zstd", "ndjson.zst"),
+}
+
+
+class _Identity:
+    """Kompresor bez kompresji (ten sam interfejs co zlib / zstandard)"""
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def make_compressor(compression: str):
+    """
+    Kompresor strumieniowy dla `compression`
+
+    Raises:
+        ValueError: Nieznana kompresja lub brak pakietu zstandard
+    """
+    if compression == "none":
+        return _Identity()
+    if compression == "gzip":
+        # wbits=31 - nagłówek i suma kontrolna gzip
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Kompresja zstd wymaga pakietu zstandard")
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    raise ValueError(f"Nieznana kompresja: {compression}")
+
+
+async def ndjson_stream(
+    chunks: AsyncIterator[List[Dict[str, Any]]],
+    compression: str = "none",
+    compressor: Optional[Any] = None
+) -> AsyncIterator[bytes]:
+    """
+    Zamień partie rekordów na (skompresowane) linie NDJSON
+
+    Pamięć jest stała: w danej chwili trzymana jest jedna partia
+    rekordów i bufor kompresora.
+    """
+    compressor = compressor or make_compressor(compression)
+    async for chunk in chunks:
+        data = "".join(
+            json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in chunk
+        ).encode("utf-8")
+        out = compressor.compress(data)
+        if out:
+            yield out
+    tail = compressor.flush()
+    if tail:
+        yield tail
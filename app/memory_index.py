@@ -0,0 +1,236 @@
+"""
+Memory Index - Odwrócony indeks pozycyjny dla wyszukiwania w pamięci
+"""
+import re
+import math
+import heapq
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple, Callable
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+# Klucze wyniku, które zawierają tekst odpowiedzi (reszta to metadane)
+RESULT_TEXT_KEYS = ("content", "result", "text", "summary", "analysis", "response")
+
+
+def tokenize(text: str) -> List[str]:
+    """Podziel tekst na tokeny (małe litery, znaki słowne Unicode)"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def interaction_text(task: str, result: Any) -> str:
+    """Tekst interakcji do indeksowania: zadanie + treść wyniku (bez metadanych)"""
+    parts = [task or ""]
+    stack = [result]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            stack.extend(value[k] for k in RESULT_TEXT_KEYS if k in value)
+    return "\n".join(parts)
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Rozbij zapytanie na pojedyncze termy i frazy w cudzysłowie"""
+    phrases = [tokenize(p) for p in _PHRASE_RE.findall(query)]
+    phrases = [p for p in phrases if p]
+    terms = tokenize(_PHRASE_RE.sub(" ", query))
+    return terms, phrases
+
+
+class InvertedIndex:
+    """
+    Inkrementalny odwrócony indeks z pozycjami termów
+
+    postings[term][doc_id] = krotka pozycji termu w dokumencie.
+    Pozycje pozwalają na wyszukiwanie fraz, a ich liczba to tf.
+    Ranking: BM25 liczony term-po-termie (akumulatory per dokument).
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Inicjalizacja
+        Args:
+            k1: Nasycenie tf w BM25
+            b: Normalizacja długości dokumentu w BM25
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, Tuple[int, ...]]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: int, text: str):
+        """Dodaj dokument do indeksu"""
+        self.add_tokens(doc_id, tokenize(text))
+
+    def add_tokens(self, doc_id: int, tokens: List[str]):
+        """Dodaj dokument z gotowymi tokenami (odbudowa z logu)"""
+        positions: Dict[str, List[int]] = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(position)
+        for token, token_positions in positions.items():
+            self.postings.setdefault(token, {})[doc_id] = tuple(token_positions)
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id: int, text: str):
+        """Usuń dokument (tekst potrzebny do odnalezienia jego termów)"""
+        for token in set(tokenize(text)):
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[token]
+        self.total_length -= self.doc_lengths.pop(doc_id, 0)
+
+    def clear(self):
+        """Wyczyść indeks"""
+        self.postings.clear()
+        self.doc_lengths.clear()
+        self.total_length = 0
+
+    def match_terms(self, terms: Iterable[str]) -> Set[int]:
+        """Dokumenty zawierające wszystkie termy (AND)"""
+        postings = [self.postings.get(t) for t in set(terms)]
+        if not postings or any(p is None for p in postings):
+            return set()
+        # Przecięcie od najkrótszej listy
+        postings.sort(key=len)
+        result = set(postings[0])
+        for docs in postings[1:]:
+            result.intersection_update(docs)
+            if not result:
+                break
+        return result
+
+    def match_phrase(self, phrase: List[str], candidates: Optional[Set[int]] = None) -> Set[int]:
+        """Dokumenty zawierające termy frazy na kolejnych pozycjach"""
+        docs = self.match_terms(phrase)
+        if candidates is not None:
+            docs &= candidates
+        if len(phrase) == 1:
+            return docs
+
+        matched = set()
+        for doc_id in docs:
+            starts = set(self.postings[phrase[0]][doc_id])
+            for offset, term in enumerate(phrase[1:], start=1):
+                starts &= {p - offset for p in self.postings[term][doc_id]}
+                if not starts:
+                    break
+            if starts:
+                matched.add(doc_id)
+        return matched
+
+    def candidates(self, query: str, match: str = "all") -> Tuple[Optional[Set[int]], List[str]]:
+        """
+        Dokumenty pasujące do zapytania
+
+        Args:
+            query: Termy i frazy w cudzysłowie
+            match: "all" - wszystkie termy (AND), "any" - dowolny term (OR);
+                frazy są zawsze wymagane
+
+        Returns:
+            (zbiór doc_id lub None = dowolny dokument z termem, termy do rankingu)
+        """
+        terms, phrases = parse_query(query)
+        all_terms = terms + [t for p in phrases for t in p]
+        if not all_terms:
+            return set(), []
+
+        docs: Optional[Set[int]] = None
+        if match == "all":
+            docs = self.match_terms(all_terms)
+        for phrase in phrases:
+            if docs is not None and not docs:
+                break
+            docs = self.match_phrase(phrase, docs)
+        return docs, all_terms
+
+    def bm25(self, terms: Iterable[str], docs: Optional[Set[int]] = None) -> Dict[int, float]:
+        """
+        Wyniki BM25 dla termów (opcjonalnie tylko dla `docs`)
+
+        Liczone wsadowo term-po-termie: dla każdego termu jeden przebieg
+        po krótszej z list (postings termu / kandydaci).
+        """
+        n_docs = len(self.doc_lengths)
+        if not n_docs:
+            return {}
+        avg_length = self.total_length / n_docs or 1.0
+        k1, b = self.k1, self.b
+        scores: Dict[int, float] = defaultdict(float)
+
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+            if docs is not None and len(docs) < df:
+                pairs = ((d, postings[d]) for d in docs if d in postings)
+            elif docs is not None:
+                pairs = ((d, p) for d, p in postings.items() if d in docs)
+            else:
+                pairs = postings.items()
+
+            for doc_id, positions in pairs:
+                tf = len(positions)
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        offset: int = 0,
+        match: str = "all",
+        predicate: Optional[Callable[[int], bool]] = None
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Ranking BM25 z ograniczonym kopcem top-k
+
+        Args:
+            query: Zapytanie
+            k: Liczba wyników
+            offset: Pominięte najlepsze wyniki (paginacja)
+            match: "all" / "any" (patrz candidates)
+            predicate: Filtr doc_id (np. provider, zakres czasu)
+
+        Returns:
+            ([(doc_id, score)], liczba wszystkich pasujących dokumentów)
+        """
+        docs, terms = self.candidates(query, match)
+        if docs is not None and not docs:
+            return [], 0
+
+        scores = self.bm25(terms, docs)
+        items = scores.items()
+        if predicate is not None:
+            items = [(d, s) for d, s in items if predicate(d)]
+        else:
+            items = list(items)
+
+        # Przy remisie nowsze dokumenty (wyższe doc_id) pierwsze
+        top = heapq.nlargest(offset + k, items, key=lambda item: (item[1], item[0]))
+        return top[offset:], len(items)
+
+    def stats(self) -> Dict[str, Any]:
+        """Rozmiar indeksu"""
+        return {
+            "documents": len(self.doc_lengths),
+            "terms": len(self.postings),
+            "postings": sum(len(d) for d in self.postings.values()),
+            "avg_doc_length": round(self.total_length / len(self.doc_lengths), 2) if self.doc_lengths else 0.0
+        }
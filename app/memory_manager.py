@@ -1,64 +1,727 @@
 """
 Memory Manager - Zarządzanie pamięcią i ChromaDB
 """
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+import os
+import json
+import time
+import asyncio
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Callable, AsyncIterator, Deque
+from datetime import datetime, timedelta
+
+from app.memory_index import InvertedIndex, interaction_text, tokenize
+from app.memory_records import InteractionRecord, InteractionRing, is_record_frame
+from app.memory_retention import RetentionPolicy, rollup_key, is_rollup, merge_rollup
+from app.memory_store import SegmentLog
+from app.memory_vectors import HashingEmbedder, VectorIndex
+from app.write_behind import WriteBehindQueue
+
+
+def _time_bound(value: Optional[str], end: bool = False) -> Optional[float]:
+    """
+    Granica zakresu czasu (ISO 8601) jako timestamp
+    
+    Sama data jako `until` (end=True) obejmuje cały dzień - do 23:59:59.999999.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) <= len("YYYY-MM-DD"):
+        parsed += timedelta(days=1, microseconds=-1)
+    return parsed.timestamp()
 
 
 class MemoryManager:
     """Menedżer pamięci dla interakcji"""
     
-    def __init__(self):
-        """Inicjalizacja"""
-        self.interactions = []
+    def __init__(
+        self,
+        persist_dir: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        embedder: Optional[HashingEmbedder] = None,
+        embed_pool: Optional[ThreadPoolExecutor] = None
+    ):
+        """
+        Inicjalizacja
+        Args:
+            persist_dir: Katalog trwałej pamięci (None = tylko RAM)
+            max_bytes: Budżet pamięci rekordów (None = MEMORY_MAX_BYTES)
+            max_records: Limit liczby rekordów (None = MEMORY_MAX_RECORDS)
+            embedder: Współdzielony embedder (None = własny)
+            embed_pool: Współdzielona pula wątków embeddingów (None = własna)
+        """
+        if max_bytes is None:
+            max_bytes = int(os.getenv("MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+        if max_records is None:
+            max_records = int(os.getenv("MEMORY_MAX_RECORDS", "0"))
+        
+        # Najstarsze rekordy ponad budżet są usuwane z RAM (przy persist_dir zostają na dysku)
+        self.records = InteractionRing(max_bytes=max_bytes, max_records=max_records)
+        self.index = InvertedIndex()
+        self.store: Optional[SegmentLog] = None
+        self.writer: Optional[WriteBehindQueue] = None
+        self._next_id = 0
+        
+        # Wyszukiwanie semantyczne: embeddingi liczone leniwie, partiami w puli wątków
+        self.embedder = embedder or HashingEmbedder(dim=int(os.getenv("MEMORY_EMBED_DIM", "512")))
+        self.vectors = VectorIndex.from_env(self.embedder.dim)
+        self.task_vectors = VectorIndex.from_env(self.embedder.dim)
+        self.embed_batch_size = int(os.getenv("MEMORY_EMBED_BATCH", "2048"))
+        self.semantic_min_score = float(os.getenv("MEMORY_SEMANTIC_MIN_SCORE", "0.1"))
+        self._owns_pool = embed_pool is None
+        self._embed_pool = embed_pool or ThreadPoolExecutor(
+            max_workers=int(os.getenv("MEMORY_EMBED_WORKERS", "2")),
+            thread_name_prefix="memory-embed"
+        )
+        self._embed_lock = asyncio.Lock()
+        # Kompakcja logu (endpoint, RetentionWorker), czyszczenie i zamknięcie - jedno naraz
+        self._compact_lock = asyncio.Lock()
+        self._closed = False
+        # Id ostatniego rekordu z embeddingiem (per pole)
+        self._embedded = {"content": -1, "task": -1}
+        # Rekordy bez embeddingu treści (statystyki bez przechodzenia bufora)
+        self._unembedded = 0
+        self._generation = 0
+        
+        # Retencja: id per provider (od najstarszego, usunięte pomijane leniwie),
+        # rollupy po kluczu, zmiany czekające na kompakcję logu
+        self._provider_ids: Dict[str, Deque[int]] = {}
+        self._provider_counts: Counter = Counter()
+        self._rollups: Dict[str, int] = {}
+        self._rollup_cursor = -1
+        self._dropped: set = set()
+        self._replaced: Dict[int, bytes] = {}
+        
+        if persist_dir:
+            self.store = SegmentLog.from_env(str(Path(persist_dir) / "segments"))
+            self.writer = WriteBehindQueue.from_env(self._persist, name="memory")
+            self._load()
         self.init_status = "initialized"
     
+    def _load(self):
+        """
+        Odbuduj pamięć i indeks z segmentów na dysku
+        
+        Ramki binarne niosą spakowany wynik i tokeny indeksu - rekord
+        powstaje z wycinków bufora, wynik jest rozpakowywany dopiero przy
+        odczycie. Ramki JSON (starszy format logu) idą pełną ścieżką.
+        
+        Rollup dopisany przy retencji wygrywa z rekordem o tym samym id,
+        a scalone w nim rekordy są pomijane - niezależnie od kolejności
+        w logu. Do kompakcji zostają zapamiętane jako zmiany retencji.
+        """
+        seen = set()
+        superseded = set()
+        for payload in self.store.read_payloads():
+            if is_record_frame(payload):
+                record, tokens, rollup, supersedes = InteractionRecord.decode(payload)
+            else:
+                (record, tokens, rollup), supersedes = self._prepare(json.loads(payload)), ()
+            if supersedes:
+                superseded.update(supersedes)
+                # Tylko id, które są jeszcze w logu (po kompakcji już ich nie ma)
+                self._dropped.update(i for i in supersedes if i in seen)
+                for old in self.records.remove(supersedes):
+                    self._unindex(old)
+            if record.id in superseded:
+                self._dropped.add(record.id)
+                continue
+            if record.id in seen:
+                if rollup:
+                    self._replaced[record.id] = payload
+                    old = self.records.replace(record)
+                    if old is not None:
+                        self.index.remove(old.id, old.text())
+                        self.index.add_tokens(record.id, tokens)
+                        self._rollups[rollup_key(record.provider, record.task)] = record.id
+                continue
+            seen.add(record.id)
+            self._add(record, tokens, rollup)
+            self._next_id = max(self._next_id, record.id + 1)
+        if self.records:
+            print(f"💾 Wczytano {len(self.records)} interakcji z {self.store.directory}")
+    
+    def _new_interaction(self, provider: str, task: str, result: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+        """Utwórz rekord interakcji z kolejnym id"""
+        interaction = {
+            "id": self._next_id,
+            "timestamp": timestamp,
+            "provider": provider,
+            "task": task,
+            "result": result
+        }
+        self._next_id += 1
+        return interaction
+    
+    async def _persist(self, batch: List[bytes]):
+        """Zapisz partię ramek na dysk (w wątku, poza pętlą zdarzeń)"""
+        await asyncio.to_thread(self.store.append_payloads, batch)
+    
+    @staticmethod
+    def _prepare(interaction: Dict[str, Any]) -> tuple:
+        """Rekord, tokeny indeksu i znacznik rollupu ze słownika interakcji"""
+        result = interaction["result"]
+        return (
+            InteractionRecord.from_dict(interaction),
+            tokenize(interaction_text(interaction["task"], result)),
+            is_rollup(result)
+        )
+    
+    def _append(self, interaction: Dict[str, Any]) -> Optional[bytes]:
+        """Dodaj interakcję do bufora i indeksu; zwraca ramkę do logu (None bez magazynu)"""
+        record, tokens, rollup = self._prepare(interaction)
+        self._add(record, tokens, rollup)
+        return record.encode(tokens, rollup) if self.store is not None else None
+    
+    def _add(self, record: InteractionRecord, tokens: List[str], rollup: bool):
+        """Dodaj rekord do bufora i indeksu (doc_id = id rekordu)"""
+        evicted = self.records.append(record)
+        self._unembedded += 1
+        self.index.add_tokens(record.id, tokens)
+        self._provider_ids.setdefault(record.provider, deque()).append(record.id)
+        self._provider_counts[record.provider] += 1
+        if rollup:
+            self._rollups[rollup_key(record.provider, record.task)] = record.id
+        for old in evicted:
+            self._unindex(old)
+    
+    def _unindex(self, record: InteractionRecord):
+        """Usuń rekord z indeksów (tekstowego i wektorowych)"""
+        if record.id > self._embedded["content"]:
+            self._unembedded -= 1
+        self.index.remove(record.id, record.text())
+        self.vectors.remove(record.id)
+        self.task_vectors.remove(record.id)
+        self._provider_counts[record.provider] -= 1
+        ids = self._provider_ids.get(record.provider)
+        while ids and self.records.get(ids[0]) is None:
+            ids.popleft()
+    
+    def _reindex(self, old: InteractionRecord, new: InteractionRecord, tokens: Optional[List[str]] = None):
+        """Zaktualizuj indeksy po podmianie rekordu (to samo id)"""
+        self.index.remove(old.id, old.text())
+        self.index.add_tokens(new.id, tokens if tokens is not None else tokenize(new.text()))
+        for field in ("content", "task"):
+            if new.id <= self._embedded[field]:
+                vectors, text = self._vector_field(field)
+                vectors.remove(new.id)
+                vectors.add([new.id], self.embedder.embed_batch([text(new)]))
+    
     async def store_interaction(
         self,
         provider: str,
         task: str,
         result: Dict[str, Any]
     ) -> bool:
-        """Zapisz interakcję do pamięci"""
+        """
+        Zapisz interakcję do pamięci
+        
+        Interakcja jest od razu widoczna w wyszukiwaniu; zapis na dysk
+        odbywa się w tle (write-behind), czekamy tylko przy pełnej kolejce.
+        """
         try:
-            interaction = {
-                "timestamp": datetime.now().isoformat(),
-                "provider": provider,
-                "task": task,
-                "result": result
-            }
-            self.interactions.append(interaction)
+            interaction = self._new_interaction(provider, task, result, datetime.now().isoformat())
+            frame = self._append(interaction)
+            if self.writer is not None:
+                await self.writer.put(frame)
             return True
         except Exception as e:
             print(f"❌ Błąd zapisu: {e}")
             return False
     
-    async def search(self, query: str) -> List[Dict[str, Any]]:
-        """Przeszukaj pamięć"""
+    async def store_interactions(self, interactions: List[Dict[str, Any]]) -> int:
+        """
+        Zapisz wiele interakcji jednym zapisem
+        
+        Args:
+            interactions: Lista słowników z kluczami provider, task, result
+        
+        Returns:
+            Liczba zapisanych interakcji
+        """
+        try:
+            timestamp = datetime.now().isoformat()
+            batch = [
+                self._new_interaction(item["provider"], item["task"], item["result"], timestamp)
+                for item in interactions
+            ]
+            frames = [self._append(interaction) for interaction in batch]
+            if self.writer is not None:
+                for frame in frames:
+                    await self.writer.put(frame)
+            return len(batch)
+        except Exception as e:
+            print(f"❌ Błąd zapisu wsadowego: {e}")
+            return 0
+    
+    async def search(
+        self,
+        query: str,
+        limit: int = 10,
+        offset: int = 0,
+        provider: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        match: str = "all",
+        mode: str = "keyword",
+        round_scores: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Przeszukaj pamięć
+        
+        Args:
+            query: Termy; fragmenty w cudzysłowie to frazy
+            limit: Liczba wyników
+            offset: Przesunięcie (paginacja)
+            provider: Tylko interakcje danego providera
+            since: Od daty (ISO 8601, włącznie)
+            until: Do daty (ISO 8601, włącznie)
+            match: "all" - wszystkie termy, "any" - dowolny term
+            mode: "keyword" - BM25, "semantic" - podobieństwo embeddingów
+            round_scores: Zaokrąglij score do 4 miejsc (False - surowy, np. do scalania shardów)
+        
+        Returns:
+            {"results": [...interakcje ze "score"], "total": liczba pasujących}
+        """
         try:
-            # Placeholder dla ChromaDB
+            predicate = self._filter(provider, since, until)
+            if mode == "semantic":
+                ranked, total = await self._semantic_search(query, limit, offset, predicate)
+            else:
+                ranked, total = self.index.search(
+                    query, k=limit, offset=offset, match=match, predicate=predicate
+                )
             results = [
-                i for i in self.interactions
-                if query.lower() in str(i).lower()
+                {**self.records.get(doc_id).to_dict(), "score": round(score, 4) if round_scores else float(score)}
+                for doc_id, score in ranked
             ]
-            return results
+            return {"results": results, "total": total}
         except Exception as e:
             print(f"❌ Błąd wyszukiwania: {e}")
-            return []
+            return {"results": [], "total": 0}
+    
+    def _filter(
+        self,
+        provider: Optional[str],
+        since: Optional[str],
+        until: Optional[str]
+    ) -> Optional[Callable[[int], bool]]:
+        """Filtr doc_id po providerze i zakresie czasu (None = bez filtra)"""
+        if not (provider or since or until):
+            return None
+        since_ts = _time_bound(since)
+        until_ts = _time_bound(until, end=True)
+        
+        def predicate(doc_id: int) -> bool:
+            record = self.records.get(doc_id)
+            if record is None:
+                return False
+            if provider and record.provider != provider:
+                return False
+            if since_ts is not None and record.ts < since_ts:
+                return False
+            if until_ts is not None and record.ts > until_ts:
+                return False
+            return True
+        return predicate
+    
+    def _vector_field(self, field: str):
+        """(indeks wektorowy, tekst interakcji) dla pola: content lub task"""
+        if field == "task":
+            return self.task_vectors, lambda record: record.task
+        return self.vectors, lambda record: record.text()
+    
+    async def sync_vectors(self, field: str = "content"):
+        """
+        Policz embeddingi interakcji, których nie ma jeszcze w indeksie wektorowym
+        
+        Args:
+            field: "content" (zadanie + wynik) lub "task" (samo zadanie)
+        """
+        vectors, text = self._vector_field(field)
+        async with self._embed_lock:
+            pending = list(self.records.after(self._embedded[field]))
+            if not pending:
+                return
+            generation = self._generation
+            evicted = (self.records.evicted, self.records.removed)
+            batches = [
+                pending[i:i + self.embed_batch_size]
+                for i in range(0, len(pending), self.embed_batch_size)
+            ]
+            if len(pending) <= 64:
+                # Kilka nowych interakcji - szybciej bez przełączania wątków
+                matrices = [self.embedder.embed_batch([text(record) for record in pending])]
+            else:
+                loop = asyncio.get_running_loop()
+                matrices = await asyncio.gather(*(
+                    loop.run_in_executor(
+                        self._embed_pool,
+                        self.embedder.embed_batch,
+                        [text(record) for record in batch]
+                    )
+                    for batch in batches
+                ))
+            if generation != self._generation:
+                return
+            embedded = 0
+            for batch, matrix in zip(batches, matrices):
+                if (self.records.evicted, self.records.removed) != evicted:
+                    # W trakcie liczenia część rekordów wypadła z bufora (już odjęta w _unindex)
+                    alive = [i for i, record in enumerate(batch) if self.records.get(record.id) is not None]
+                    batch, matrix = [batch[i] for i in alive], matrix[alive]
+                vectors.add([record.id for record in batch], matrix)
+                embedded += len(batch)
+            self._embedded[field] = pending[-1].id
+            if field == "content":
+                self._unembedded -= embedded
+        if vectors.needs_training():
+            # k-means poza pętlą zdarzeń; wyszukiwanie nie czeka na blokadę embeddingów
+            await vectors.train_in(self._embed_pool)
+    
+    async def _semantic_search(
+        self,
+        query: str,
+        limit: int,
+        offset: int,
+        predicate: Optional[Callable[[int], bool]]
+    ):
+        await self.sync_vectors()
+        query_vector = self.embedder.embed(query)
+        return self.vectors.search(
+            query_vector, k=limit, offset=offset, min_score=self.semantic_min_score, predicate=predicate
+        )
     
-    async def get_history(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Pobierz historię interakcji"""
+    async def similar_tasks(
+        self,
+        task: str,
+        k: int = 1,
+        provider: Optional[str] = None,
+        since: Optional[str] = None,
+        min_score: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Interakcje o zadaniu najbardziej podobnym do `task`
+        
+        Returns:
+            Lista interakcji z kluczem "score" (podobieństwo kosinusowe zadań)
+        """
+        await self.sync_vectors("task")
+        ranked, _ = self.task_vectors.search(
+            self.embedder.embed(task),
+            k=k,
+            min_score=min_score,
+            predicate=self._filter(provider, since, None)
+        )
+        return [{**self.records.get(doc_id).to_dict(), "score": round(score, 4)} for doc_id, score in ranked]
+    
+    async def get_history(self, limit: int = 10, cursor: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Pobierz historię interakcji (ostatnie `limit`, O(limit))
+        
+        Args:
+            limit: Liczba interakcji
+            cursor: Tylko interakcje starsze niż id `cursor` (poprzednia strona)
+        """
         try:
-            return self.interactions[-limit:]
+            return [record.to_dict() for record in self.records.latest(limit, before=cursor)]
         except Exception as e:
             print(f"❌ Błąd pobierania historii: {e}")
             return []
     
+    async def export(
+        self,
+        provider: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Wszystkie interakcje partiami (od najstarszej), ze stałym zużyciem pamięci
+        
+        Przy trwałym magazynie czytany jest log na dysku (także rekordy
+        usunięte z RAM przez budżet), w wątku, partia po partii, a po nim
+        interakcje z bufora, których zapis na dysk się nie udał.
+        Bez magazynu - bufor w pamięci.
+        """
+        since_ts = _time_bound(since)
+        until_ts = _time_bound(until, end=True)
+        
+        def keep(interaction: Dict[str, Any]) -> bool:
+            if provider and interaction["provider"] != provider:
+                return False
+            if since_ts is None and until_ts is None:
+                return True
+            ts = datetime.fromisoformat(interaction["timestamp"]).timestamp()
+            return (since_ts is None or ts >= since_ts) and (until_ts is None or ts <= until_ts)
+        
+        last_id = -1
+        if self.store is not None:
+            await self.flush()
+            iterator = self.store.read_all()
+            try:
+                while True:
+                    batch = await asyncio.to_thread(lambda: list(islice(iterator, chunk_size)))
+                    if not batch:
+                        break
+                    chunk = []
+                    for interaction in batch:
+                        # Id rosną w kolejności logu - duplikaty (np. po przerwanej kompakcji) pomijamy
+                        if interaction.get("id", -1) <= last_id:
+                            continue
+                        last_id = interaction["id"]
+                        if keep(interaction):
+                            chunk.append(interaction)
+                    if chunk:
+                        yield chunk
+            finally:
+                iterator.close()
+        
+        # Bez dysku - cały bufor; z dyskiem - interakcje, których zapis się nie udał
+        while True:
+            batch = list(islice(self.records.after(last_id), chunk_size))
+            if not batch:
+                break
+            last_id = batch[-1].id
+            chunk = [interaction for interaction in (record.to_dict() for record in batch) if keep(interaction)]
+            if chunk:
+                yield chunk
+            await asyncio.sleep(0)
+    
+    def apply_retention(self, policy: RetentionPolicy, budget: int = 256, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Jeden krok retencji - przetwarza co najwyżej `budget` rekordów
+        
+        Krok jest synchroniczny i krótki; dłuższą pracę wykonuje się
+        kolejnymi krokami (RetentionWorker oddaje pętlę między nimi).
+        Usunięte i scalone interakcje znikają z RAM i indeksów od razu,
+        z logu na dysku - przy `compact_store`. Rollupy są dopisywane do
+        logu od razu (z id scalonych rekordów), więc restart przed
+        kompakcją ich nie cofa.
+        
+        Returns:
+            {"expired", "trimmed", "rolled_up", "done"} - done = brak dalszej pracy
+        """
+        now = time.time() if now is None else now
+        drop: Dict[int, InteractionRecord] = {}
+        expired = 0
+        
+        # TTL i limit na użytkownika - najstarsze rekordy są na początku bufora
+        cutoff = now - policy.ttl if policy.ttl else None
+        excess = len(self.records) - policy.max_records if policy.max_records else 0
+        for record in islice(self.records, budget):
+            if cutoff is not None and record.ts < cutoff:
+                expired += 1
+            elif len(drop) >= excess:
+                break
+            drop[record.id] = record
+        
+        # Limit na providera - najstarsze id providera z kolejki
+        work = len(drop)
+        if policy.max_per_provider:
+            dropped_by_provider = Counter(record.provider for record in drop.values())
+            for provider, ids in self._provider_ids.items():
+                over = self._provider_counts[provider] - dropped_by_provider[provider] - policy.max_per_provider
+                while over > 0 and ids and work < budget:
+                    record_id = ids.popleft()
+                    work += 1
+                    record = self.records.get(record_id)
+                    if record is None or record_id in drop:
+                        continue
+                    drop[record_id] = record
+                    over -= 1
+        
+        for record in self.records.remove(list(drop)):
+            self._forget(record)
+        
+        # Rollupy - okno starych rekordów za kursorem
+        rolled_up = 0
+        if policy.rollup_after and work < budget:
+            cutoff = now - policy.rollup_after
+            window = []
+            for record in islice(self.records.after(self._rollup_cursor), budget - work):
+                if record.ts >= cutoff:
+                    break
+                window.append(record)
+            work += len(window)
+            if window:
+                self._rollup_cursor = window[-1].id
+                rolled_up = self._rollup(window)
+        
+        return {
+            "expired": expired,
+            "trimmed": len(drop) - expired,
+            "rolled_up": rolled_up,
+            "done": work < budget
+        }
+    
+    def _forget(self, record: InteractionRecord):
+        """Rekord usunięty przez retencję - z indeksów, a przy kompakcji z dysku"""
+        self._unindex(record)
+        self._replaced.pop(record.id, None)
+        if self.store is not None:
+            self._dropped.add(record.id)
+    
+    def _rollup(self, window: List[InteractionRecord]) -> int:
+        """Scal rekordy okna o tym samym kluczu (wraz z istniejącym rollupem); zwraca liczbę scalonych"""
+        groups: Dict[str, List[InteractionRecord]] = {}
+        for record in window:
+            groups.setdefault(rollup_key(record.provider, record.task), []).append(record)
+        
+        merged = 0
+        frames = []
+        for key, members in groups.items():
+            existing = self.records.get(self._rollups.get(key, -1))
+            if existing is not None and existing.id < members[0].id:
+                members.insert(0, existing)
+            if len(members) < 2:
+                continue
+            # Rollup przejmuje id i czas najnowszego rekordu - kolejność bufora bez zmian
+            newest = members[-1]
+            rollup = InteractionRecord(newest.id, newest.ts, newest.provider, newest.task, merge_rollup(members))
+            tokens = tokenize(rollup.text())
+            superseded = [member.id for member in members[:-1]]
+            for record in self.records.remove(superseded):
+                self._forget(record)
+            self._reindex(self.records.replace(rollup), rollup, tokens)
+            self._rollups[key] = rollup.id
+            if self.store is not None:
+                frame = rollup.encode(tokens, rollup=True, supersedes=superseded)
+                self._replaced[rollup.id] = frame
+                frames.append(frame)
+            merged += len(members) - 1
+        if frames:
+            # Log pozostaje źródłem prawdy - restart przed kompakcją nie cofa rollupów
+            try:
+                self.store.append_payloads(frames)
+            except OSError as e:
+                print(f"⚠️ Błąd zapisu rollupów ({len(frames)}), zostaną zapisane przy kompakcji: {e}")
+        return merged
+    
     async def clear(self) -> bool:
-        """Wyczyść pamięć"""
+        """Wyczyść pamięć (po zakończeniu trwającej kompakcji)"""
         try:
-            self.interactions.clear()
-            return True
+            async with self._compact_lock:
+                if self.writer is not None:
+                    await self.writer.flush()
+                    self.writer.discard()
+                self.records.clear()
+                self.index.clear()
+                self.vectors.clear()
+                self.task_vectors.clear()
+                self._embedded = {"content": -1, "task": -1}
+                self._unembedded = 0
+                self._generation += 1
+                self._provider_ids.clear()
+                self._provider_counts.clear()
+                self._rollups.clear()
+                self._rollup_cursor = -1
+                self._dropped.clear()
+                self._replaced.clear()
+                if self.store is not None:
+                    self.store.truncate()
+                return True
         except Exception as e:
             print(f"❌ Błąd czyszczenia: {e}")
             return False
+    
+    async def compact(self, policy: Optional[RetentionPolicy] = None) -> Dict[str, Any]:
+        """Pełna retencja (krokami) i kompakcja logu"""
+        summary = {"expired": 0, "trimmed": 0, "rolled_up": 0}
+        if policy is not None and policy.active:
+            while True:
+                result = self.apply_retention(policy)
+                for key in summary:
+                    summary[key] += result[key]
+                if result["done"]:
+                    break
+                await asyncio.sleep(0)
+        return {**await self.compact_store(policy), **summary}
+    
+    async def compact_store(self, policy: Optional[RetentionPolicy] = None) -> Dict[str, Any]:
+        """
+        Kompakcja segmentów (w wątku, poza pętlą zdarzeń)
+        
+        Przy aktywnej retencji obejmuje też aktywny segment: usunięte
+        interakcje są pomijane, rollupy zapisywane zamiast oryginałów,
+        a reguły polityki stosowane również do rekordów tylko na dysku.
+        """
+        if self.store is None:
+            return {"segments": 0, "kept": 0, "dropped": 0}
+        async with self._compact_lock:
+            if self._closed:
+                return {"segments": 0, "kept": 0, "dropped": 0}
+            await self.flush()
+            dropped, replaced = set(self._dropped), dict(self._replaced)
+            retention = bool(dropped or replaced or (policy is not None and policy.active))
+            
+            def run() -> Dict[str, int]:
+                if policy is not None:
+                    keep = policy.disk_filter(self.store.read_all(), dropped)
+                else:
+                    keep = (lambda record: record.get("id") not in dropped) if dropped else None
+                return self.store.compact(keep=keep, rewrite=replaced, seal=retention)
+            
+            result = await asyncio.to_thread(run)
+            self._dropped -= dropped
+            for record_id, interaction in replaced.items():
+                if self._replaced.get(record_id) is interaction:
+                    del self._replaced[record_id]
+            return result
+    
+    @property
+    def compacting(self) -> bool:
+        """Czy trwa kompakcja logu"""
+        return self._compact_lock.locked()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki pamięci"""
+        return {
+            "interactions": len(self.records),
+            "memory": self.records.stats(),
+            "index": self.index.stats(),
+            "vectors": {
+                **self.vectors.stats(),
+                "pending": self._unembedded
+            },
+            "retention": {
+                "rollups": len(self._rollups),
+                "pending_drops": len(self._dropped),
+                "pending_rewrites": len(self._replaced)
+            },
+            "store": self.store.stats() if self.store is not None else None,
+            "writer": self.writer.stats() if self.writer is not None else None
+        }
+    
+    async def flush(self) -> int:
+        """
+        Poczekaj na zapis wszystkich interakcji z kolejki
+        
+        Returns:
+            Liczba interakcji, których nie udało się zapisać na dysk
+        """
+        if self.writer is not None:
+            return await self.writer.flush()
+        return 0
+    
+    async def close(self) -> int:
+        """
+        Zapisz zaległe interakcje i zamknij trwały magazyn (po trwającej kompakcji)
+        
+        Returns:
+            Liczba interakcji, których nie udało się zapisać na dysk (utraconych)
+        """
+        unwritten = 0
+        if self.writer is not None:
+            unwritten = await self.writer.close()
+        if self.store is not None:
+            async with self._compact_lock:
+                self._closed = True
+                self.store.close()
+        if self._owns_pool:
+            self._embed_pool.shutdown(wait=False)
+        return unwritten
@@ -0,0 +1,297 @@
+"""
+Memory Records - Kompaktowe rekordy interakcji i bufor z budżetem pamięci
+"""
+import sys
+import json
+import zlib
+import struct
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Sequence, Tuple
+
+from app.memory_index import interaction_text
+
+
+# Wyniki większe niż próg są kompresowane (zlib, poziom 1 - szybki)
+PACK_THRESHOLD = 512
+
+# Binarna ramka rekordu w logu: format, flagi, id, ts, długości providera, zadania,
+# tokenów indeksu i spakowanego wyniku, liczba zastąpionych id, potem same pola
+# i id (rollup zastępuje scalone rekordy). Odbudowa przy starcie tnie pola
+# z bufora - bez JSON, kompresji i tokenizacji wyniku. Stare ramki JSON
+# zaczynają się od "{", więc oba formaty współistnieją w jednym logu.
+RECORD_FORMAT = 1
+_RECORD = struct.Struct("<BBqdIIIII")
+_FLAG_PACKED = 1
+_FLAG_ROLLUP = 2
+
+
+class InteractionRecord:
+    """
+    Interakcja w pamięci
+
+    Zamiast zagnieżdżonego słownika: __slots__, znacznik czasu jako float
+    (epoch), nazwa providera internowana (jedna kopia na providera),
+    wynik jako JSON w bajtach (skompresowany powyżej PACK_THRESHOLD).
+    Słownik w formacie API powstaje dopiero w `to_dict`.
+    """
+
+    __slots__ = ("id", "ts", "provider", "task", "_result", "_packed")
+
+    def __init__(self, record_id: int, ts: float, provider: str, task: str, result: Any):
+        self.id = record_id
+        self.ts = ts
+        self.provider = sys.intern(provider or "")
+        self.task = task or ""
+        blob = json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        self._packed = len(blob) > PACK_THRESHOLD
+        self._result = zlib.compress(blob, 1) if self._packed else blob
+
+    @classmethod
+    def from_packed(
+        cls, record_id: int, ts: float, provider: str, task: str, blob: bytes, packed: bool
+    ) -> "InteractionRecord":
+        """Rekord z już spakowanym wynikiem (bez serializacji i kompresji)"""
+        record = cls.__new__(cls)
+        record.id = record_id
+        record.ts = ts
+        record.provider = sys.intern(provider)
+        record.task = task
+        record._result = blob
+        record._packed = packed
+        return record
+
+    @classmethod
+    def from_dict(cls, interaction: Dict[str, Any]) -> "InteractionRecord":
+        """Rekord ze słownika interakcji (format API / logu na dysku)"""
+        return cls(
+            interaction["id"],
+            datetime.fromisoformat(interaction["timestamp"]).timestamp(),
+            interaction["provider"],
+            interaction["task"],
+            interaction["result"]
+        )
+
+    @property
+    def result(self) -> Any:
+        blob = zlib.decompress(self._result) if self._packed else self._result
+        return json.loads(blob)
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.ts).isoformat()
+
+    def text(self) -> str:
+        """Tekst do indeksowania (zadanie + treść wyniku)"""
+        return interaction_text(self.task, self.result)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Interakcja w formacie API"""
+        return {
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "provider": self.provider,
+            "task": self.task,
+            "result": self.result
+        }
+
+    def nbytes(self) -> int:
+        """Przybliżony rozmiar rekordu w pamięci (bez internowanego providera)"""
+        return sys.getsizeof(self) + sys.getsizeof(self.task) + sys.getsizeof(self._result) + 32
+
+    def encode(self, tokens: List[str], rollup: bool = False, supersedes: Sequence[int] = ()) -> bytes:
+        """
+        Binarna ramka rekordu do logu (tokeny indeksu i spakowany wynik w postaci gotowej)
+
+        Args:
+            tokens: Tokeny indeksu odwróconego
+            rollup: Rekord jest rollupem (zastępuje wcześniejszą wersję o tym samym id)
+            supersedes: Id rekordów scalonych w rollup (przy odczycie są pomijane)
+        """
+        provider = self.provider.encode("utf-8")
+        task = self.task.encode("utf-8")
+        joined = " ".join(tokens).encode("utf-8")
+        flags = (_FLAG_PACKED if self._packed else 0) | (_FLAG_ROLLUP if rollup else 0)
+        header = _RECORD.pack(
+            RECORD_FORMAT, flags, self.id, self.ts,
+            len(provider), len(task), len(joined), len(self._result), len(supersedes)
+        )
+        ids = struct.pack(f"<{len(supersedes)}q", *supersedes)
+        return b"".join((header, provider, task, joined, self._result, ids))
+
+    @classmethod
+    def decode(cls, payload: bytes) -> Tuple["InteractionRecord", List[str], bool, Tuple[int, ...]]:
+        """
+        Rekord z binarnej ramki
+
+        Returns:
+            (rekord, tokeny indeksu, czy rollup, zastąpione id) - wynik zostaje spakowany
+        """
+        (
+            _, flags, record_id, ts, provider_len, task_len, tokens_len, result_len, superseded
+        ) = _RECORD.unpack_from(payload)
+        view = memoryview(payload)
+        offset = _RECORD.size
+        provider = str(view[offset:offset + provider_len], "utf-8")
+        offset += provider_len
+        task = str(view[offset:offset + task_len], "utf-8")
+        offset += task_len
+        joined = str(view[offset:offset + tokens_len], "utf-8")
+        offset += tokens_len
+        blob = bytes(view[offset:offset + result_len])
+        offset += result_len
+        supersedes = struct.unpack_from(f"<{superseded}q", payload, offset) if superseded else ()
+        record = cls.from_packed(record_id, ts, provider, task, blob, bool(flags & _FLAG_PACKED))
+        return record, joined.split(" ") if joined else [], bool(flags & _FLAG_ROLLUP), supersedes
+
+
+def is_record_frame(payload: bytes) -> bool:
+    """Czy payload z logu to binarna ramka rekordu (a nie JSON)"""
+    return payload[:1] == bytes((RECORD_FORMAT,))
+
+
+def payload_dict(payload: bytes) -> Dict[str, Any]:
+    """Rekord z logu jako słownik interakcji (ramka binarna lub JSON)"""
+    if is_record_frame(payload):
+        return InteractionRecord.decode(payload)[0].to_dict()
+    return json.loads(payload)
+
+
+class InteractionRing:
+    """
+    Bufor rekordów od najstarszego do najnowszego z budżetem pamięci
+
+    Nowe rekordy trafiają na koniec, po przekroczeniu `max_bytes` lub
+    `max_records` usuwane są najstarsze (zwracane z `append`, żeby
+    wywołujący mógł usunąć je z indeksów). Id rekordów rosną, więc
+    wyszukanie po id to bisekcja. Usunięte z początku miejsca są
+    zwalniane hurtowo, gdy stanowią ponad połowę listy.
+    """
+
+    def __init__(self, max_bytes: int = 0, max_records: int = 0):
+        """
+        Inicjalizacja
+        Args:
+            max_bytes: Budżet pamięci rekordów (0 = bez limitu)
+            max_records: Maksymalna liczba rekordów (0 = bez limitu)
+        """
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self._items: List[Optional[InteractionRecord]] = []
+        self._head = 0
+        self.bytes = 0
+        self.evicted = 0
+        self.removed = 0
+
+    def __len__(self) -> int:
+        return len(self._items) - self._head
+
+    def __iter__(self) -> Iterator[InteractionRecord]:
+        """Rekordy od najstarszego"""
+        for i in range(self._head, len(self._items)):
+            yield self._items[i]
+
+    def _over_budget(self) -> bool:
+        return bool(
+            (self.max_bytes and self.bytes > self.max_bytes)
+            or (self.max_records and len(self) > self.max_records)
+        )
+
+    def append(self, record: InteractionRecord) -> List[InteractionRecord]:
+        """Dodaj rekord; zwraca rekordy usunięte z powodu budżetu"""
+        self._items.append(record)
+        self.bytes += record.nbytes()
+
+        evicted = []
+        while len(self) > 1 and self._over_budget():
+            oldest = self._items[self._head]
+            self._items[self._head] = None
+            self._head += 1
+            self.bytes -= oldest.nbytes()
+            evicted.append(oldest)
+        if evicted:
+            self.evicted += len(evicted)
+            if self._head > 1024 and self._head * 2 > len(self._items):
+                del self._items[:self._head]
+                self._head = 0
+        return evicted
+
+    def _position(self, record_id: int) -> int:
+        return bisect_left(self._items, record_id, lo=self._head, key=lambda r: r.id)
+
+    def get(self, record_id: int) -> Optional[InteractionRecord]:
+        """Rekord o danym id (None = usunięty lub nieznany)"""
+        i = self._position(record_id)
+        if i < len(self._items) and self._items[i].id == record_id:
+            return self._items[i]
+        return None
+
+    def remove(self, record_ids: Iterable[int]) -> List[InteractionRecord]:
+        """
+        Usuń rekordy o podanych id (retencja); zwraca usunięte
+
+        Przepisywany jest tylko fragment listy między pierwszym
+        a ostatnim usuwanym rekordem.
+        """
+        positions = []
+        for record_id in record_ids:
+            i = self._position(record_id)
+            if i < len(self._items) and self._items[i].id == record_id:
+                positions.append(i)
+        if not positions:
+            return []
+        drop = set(positions)
+        lo, hi = min(drop), max(drop) + 1
+        removed = [self._items[i] for i in sorted(drop)]
+        self._items[lo:hi] = [self._items[i] for i in range(lo, hi) if i not in drop]
+        self.bytes -= sum(record.nbytes() for record in removed)
+        self.removed += len(removed)
+        return removed
+
+    def replace(self, record: InteractionRecord) -> Optional[InteractionRecord]:
+        """Podmień rekord o tym samym id; zwraca poprzednią wersję (None = brak rekordu)"""
+        i = self._position(record.id)
+        if i >= len(self._items) or self._items[i].id != record.id:
+            return None
+        old = self._items[i]
+        self._items[i] = record
+        self.bytes += record.nbytes() - old.nbytes()
+        return old
+
+    def after(self, record_id: int) -> Iterator[InteractionRecord]:
+        """Rekordy o id większym niż `record_id` (od najstarszego)"""
+        start = bisect_right(self._items, record_id, lo=self._head, key=lambda r: r.id)
+        for i in range(start, len(self._items)):
+            yield self._items[i]
+
+    def latest(self, limit: int, before: Optional[int] = None) -> List[InteractionRecord]:
+        """
+        Ostatnie `limit` rekordów (od najstarszego) - O(limit)
+
+        Args:
+            limit: Liczba rekordów
+            before: Tylko rekordy o id mniejszym niż `before` (kursor stronicowania)
+        """
+        if limit <= 0:
+            return []
+        end = len(self._items) if before is None else self._position(before)
+        return self._items[max(self._head, end - limit):end]
+
+    def clear(self):
+        """Usuń wszystkie rekordy"""
+        self._items.clear()
+        self._head = 0
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Zużycie pamięci"""
+        count = len(self)
+        return {
+            "records": count,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "max_records": self.max_records,
+            "avg_record_bytes": round(self.bytes / count, 1) if count else 0.0,
+            "evicted": self.evicted,
+            "removed": self.removed
+        }
@@ -0,0 +1,310 @@
+"""
+Memory Retention - Polityka retencji pamięci, rollupy i kompakcja w tle
+"""
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from app.memory_index import tokenize
+
+
+def rollup_key(provider: str, task: str) -> str:
+    """Klucz grupowania rollupów: provider + znormalizowane termy zadania"""
+    return f"{provider}\x00{' '.join(tokenize(task))}"
+
+
+def is_rollup(result: Any) -> bool:
+    """Czy wynik interakcji jest rollupem"""
+    return isinstance(result, dict) and isinstance(result.get("rollup"), dict)
+
+
+def _successful(result: Any) -> bool:
+    return isinstance(result, dict) and result.get("success", True) and "error" not in result
+
+
+def merge_rollup(members: List[Any]) -> Dict[str, Any]:
+    """
+    Wynik rollupu dla grupy rekordów (od najstarszego)
+
+    Wynikiem jest najnowszy udany wynik z grupy (więc rollup dalej
+    działa np. w cache odpowiedzi) uzupełniony o klucz "rollup":
+    liczba scalonych interakcji, liczba błędów, pierwsze i ostatnie
+    wystąpienie oraz do 5 wariantów treści zadania. Rekordy będące
+    już rollupami wnoszą swoje liczniki.
+    """
+    count = failures = 0
+    first_seen = None
+    tasks: List[str] = []
+    best = None
+    for member in members:
+        result = member.result
+        if is_rollup(result):
+            prior = result["rollup"]
+            count += prior.get("count", 1)
+            failures += prior.get("failures", 0)
+            seen = prior.get("first_seen", member.timestamp)
+            for task in prior.get("tasks", []):
+                if task not in tasks and len(tasks) < 5:
+                    tasks.append(task)
+        else:
+            count += 1
+            failures += 0 if _successful(result) else 1
+            seen = member.timestamp
+        first_seen = seen if first_seen is None else min(first_seen, seen)
+        if member.task not in tasks and len(tasks) < 5:
+            tasks.append(member.task)
+        if _successful(result):
+            best = result
+
+    if best is None:
+        best = members[-1].result
+    merged = {k: v for k, v in best.items() if k != "rollup"} if isinstance(best, dict) else {"result": best}
+    merged["rollup"] = {
+        "count": count,
+        "failures": failures,
+        "first_seen": first_seen,
+        "last_seen": members[-1].timestamp,
+        "tasks": tasks
+    }
+    return merged
+
+
+class RetentionPolicy:
+    """
+    Reguły retencji pamięci jednego użytkownika (shardu)
+
+    - ttl: interakcje starsze niż ttl sekund są usuwane
+    - max_per_provider: najwyżej tyle najnowszych interakcji na providera
+    - max_records: najwyżej tyle najnowszych interakcji na użytkownika
+    - rollup_after: interakcje starsze niż rollup_after sekund o tym
+      samym providerze i (znormalizowanym) zadaniu są scalane w jeden
+      rekord-rollup
+
+    0 wyłącza daną regułę. W odróżnieniu od budżetu pamięci
+    (MEMORY_MAX_BYTES), który tylko zwalnia RAM, retencja usuwa
+    interakcje także z logu na dysku (przy kompakcji).
+    """
+
+    def __init__(
+        self,
+        ttl: float = 0,
+        max_per_provider: int = 0,
+        max_records: int = 0,
+        rollup_after: float = 0
+    ):
+        """
+        Inicjalizacja
+        Args:
+            ttl: Maksymalny wiek interakcji (s)
+            max_per_provider: Limit interakcji na providera
+            max_records: Limit interakcji na użytkownika
+            rollup_after: Wiek, po którym podobne interakcje są scalane (s)
+        """
+        self.ttl = ttl
+        self.max_per_provider = max_per_provider
+        self.max_records = max_records
+        self.rollup_after = rollup_after
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        """Konfiguracja z MEMORY_RETENTION_TTL / _MAX_PER_PROVIDER / _MAX_PER_USER i MEMORY_ROLLUP_AFTER"""
+        return cls(
+            ttl=float(os.getenv("MEMORY_RETENTION_TTL", "0")),
+            max_per_provider=int(os.getenv("MEMORY_RETENTION_MAX_PER_PROVIDER", "0")),
+            max_records=int(os.getenv("MEMORY_RETENTION_MAX_PER_USER", "0")),
+            rollup_after=float(os.getenv("MEMORY_ROLLUP_AFTER", "0"))
+        )
+
+    @property
+    def active(self) -> bool:
+        return bool(self.ttl or self.max_per_provider or self.max_records or self.rollup_after)
+
+    def disk_filter(
+        self,
+        records: Iterable[Dict[str, Any]],
+        dropped: Set[int],
+        now: Optional[float] = None
+    ) -> Callable[[Dict[str, Any]], bool]:
+        """
+        Filtr `keep` dla kompakcji logu
+
+        Pierwsze przejście po `records` (cały log) liczy interakcje na
+        providera; filtr odrzuca wtedy najstarsze ponad limity - tak
+        samo jak retencja w pamięci, ale również dla rekordów, które
+        są już tylko na dysku.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.ttl if self.ttl else None
+
+        def alive(record: Dict[str, Any]) -> bool:
+            if record.get("id") in dropped:
+                return False
+            if cutoff is not None:
+                return datetime.fromisoformat(record["timestamp"]).timestamp() >= cutoff
+            return True
+
+        remaining: Dict[str, int] = {}
+        if self.max_per_provider or self.max_records:
+            seen = set()
+            for record in records:
+                record_id = record.get("id")
+                if record_id in seen or not alive(record):
+                    continue
+                seen.add(record_id)
+                remaining[record["provider"]] = remaining.get(record["provider"], 0) + 1
+        survivors = sum(
+            min(count, self.max_per_provider) if self.max_per_provider else count
+            for count in remaining.values()
+        )
+
+        def keep(record: Dict[str, Any]) -> bool:
+            nonlocal survivors
+            if not alive(record):
+                return False
+            if not remaining:
+                return True
+            provider = record["provider"]
+            remaining[provider] = remaining.get(provider, 1) - 1
+            # Co najmniej max_per_provider nowszych interakcji providera - ta jest nadmiarowa
+            if self.max_per_provider and remaining[provider] >= self.max_per_provider:
+                return False
+            survivors -= 1
+            return not (self.max_records and survivors >= self.max_records)
+
+        return keep
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ttl": self.ttl,
+            "max_per_provider": self.max_per_provider,
+            "max_per_user": self.max_records,
+            "rollup_after": self.rollup_after
+        }
+
+
+class RetentionWorker:
+    """
+    Retencja i kompakcja w tle
+
+    Co `interval` sekund każdy otwarty shard dostaje kroki retencji
+    po co najwyżej `step` rekordów, przeplatane oddaniem pętli zdarzeń
+    (`store_interaction` nie czeka na retencję, nie ma długich pauz).
+    Co `compact_interval` sekund log na dysku jest przepisywany
+    w wątku - usunięte interakcje znikają, rollupy zastępują oryginały.
+    """
+
+    def __init__(
+        self,
+        shards: Callable[[], Iterable[Any]],
+        policy: RetentionPolicy,
+        interval: float = 30.0,
+        step: int = 256,
+        compact_interval: float = 3600.0
+    ):
+        """
+        Inicjalizacja
+        Args:
+            shards: Funkcja zwracająca aktualne MemoryManagery
+            policy: Polityka retencji
+            interval: Odstęp między przebiegami retencji (s)
+            step: Maksymalna liczba rekordów w jednym kroku
+            compact_interval: Odstęp między kompakcjami logu (s, 0 = tylko ręcznie)
+        """
+        self.shards = shards
+        self.policy = policy
+        self.interval = interval
+        self.step = max(1, step)
+        self.compact_interval = compact_interval
+
+        self._task: Optional[asyncio.Task] = None
+        self._last_compaction = time.monotonic()
+
+        self.runs = 0
+        self.steps = 0
+        self.expired = 0
+        self.trimmed = 0
+        self.rolled_up = 0
+        self.compactions = 0
+        self.max_step_ms = 0.0
+
+    @classmethod
+    def from_env(cls, shards: Callable[[], Iterable[Any]], policy: Optional[RetentionPolicy] = None) -> "RetentionWorker":
+        """Konfiguracja z MEMORY_RETENTION_INTERVAL / MEMORY_RETENTION_STEP / MEMORY_COMPACT_INTERVAL"""
+        return cls(
+            shards,
+            policy or RetentionPolicy.from_env(),
+            interval=float(os.getenv("MEMORY_RETENTION_INTERVAL", "30")),
+            step=int(os.getenv("MEMORY_RETENTION_STEP", "256")),
+            compact_interval=float(os.getenv("MEMORY_COMPACT_INTERVAL", "3600"))
+        )
+
+    def start(self):
+        """Uruchom task w tle (wymaga działającej pętli zdarzeń; bez aktywnej polityki nic nie robi)"""
+        if not self.policy.active:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"⚠️ Błąd retencji pamięci: {e}")
+
+    async def run_once(self, compact: Optional[bool] = None):
+        """
+        Jeden przebieg retencji po wszystkich shardach
+
+        Args:
+            compact: Wymuś (True) lub pomiń (False) kompakcję logu; None = wg compact_interval
+        """
+        if compact is None:
+            compact = bool(self.compact_interval) and time.monotonic() - self._last_compaction >= self.compact_interval
+        for shard in list(self.shards()):
+            while True:
+                started = time.perf_counter()
+                result = shard.apply_retention(self.policy, self.step)
+                self.max_step_ms = max(self.max_step_ms, (time.perf_counter() - started) * 1000)
+                self.steps += 1
+                self.expired += result["expired"]
+                self.trimmed += result["trimmed"]
+                self.rolled_up += result["rolled_up"]
+                await asyncio.sleep(0)
+                if result["done"]:
+                    break
+            if compact and not shard.compacting:
+                # Trwająca kompakcja (np. z endpointu) obejmie ten shard - nie czekamy
+                await shard.compact_store(self.policy)
+        if compact:
+            self._last_compaction = time.monotonic()
+            self.compactions += 1
+        self.runs += 1
+
+    async def close(self):
+        """Zatrzymaj task w tle"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki retencji"""
+        return {
+            "policy": self.policy.to_dict(),
+            "active": self.policy.active,
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "steps": self.steps,
+            "expired": self.expired,
+            "trimmed": self.trimmed,
+            "rolled_up": self.rolled_up,
+            "compactions": self.compactions,
+            "max_step_ms": round(self.max_step_ms, 2)
+        }
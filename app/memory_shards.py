@@ -0,0 +1,328 @@
+"""
+Memory Shards - Pamięć podzielona per użytkownik (izolacja tenantów)
+"""
+import os
+import re
+import time
+import heapq
+import asyncio
+import hashlib
+from collections import Counter
+from itertools import islice
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Dict, Any, AsyncIterator, Set
+
+from app.memory_manager import MemoryManager
+from app.memory_retention import RetentionPolicy, RetentionWorker
+from app.memory_vectors import HashingEmbedder
+
+
+# Shard zapytań bez użytkownika (brak sesji extension / JWT)
+ANONYMOUS = "anonymous"
+_OWNER_FILE = ".user"
+# Ile zamkniętych shardów admin_search otwiera jednocześnie
+ADMIN_OPEN_CONCURRENCY = 4
+
+
+class ShardedMemory:
+    """
+    Osobny MemoryManager (rekordy, indeksy, budżet, log na dysku) dla
+    każdego użytkownika
+
+    Zapytania użytkownika widzą tylko jego shard. Shardy są tworzone
+    leniwie przy pierwszym użyciu; embedder i pula wątków są wspólne.
+    Wyszukiwanie administracyjne odpytuje wszystkie shardy równolegle
+    i scala wyniki top-k po score.
+
+    Shardy użytkowników nieużywane od `idle_ttl` sekund (lub najdawniej
+    używane ponad `max_open`) są zamykane w tle - wracają z dysku przy
+    następnym zapytaniu. Shard w trakcie operacji nie jest zamykany.
+
+    Na dysku: shard anonimowy w `persist_dir` (zgodnie z wcześniejszym
+    układem), użytkownicy w `persist_dir/users/<nazwa>-<hash>`.
+    """
+
+    def __init__(
+        self,
+        persist_dir: Optional[str] = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_records: int = 0,
+        anonymous_max_bytes: Optional[int] = None,
+        retention: Optional[RetentionPolicy] = None,
+        idle_ttl: float = 600.0,
+        max_open: int = 64
+    ):
+        """
+        Inicjalizacja
+        Args:
+            persist_dir: Katalog trwałej pamięci (None = tylko RAM)
+            max_bytes: Limit pamięci rekordów na użytkownika
+            max_records: Limit liczby rekordów na użytkownika (0 = bez limitu)
+            anonymous_max_bytes: Limit dla shardu anonimowego (None = MEMORY_MAX_BYTES)
+            retention: Polityka retencji (None = z MEMORY_RETENTION_* / MEMORY_ROLLUP_AFTER)
+            idle_ttl: Po tylu sekundach bez użycia shard użytkownika jest zamykany (0 = bez limitu)
+            max_open: Maksymalna liczba otwartych shardów (najdawniej używane zamykane)
+        """
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.anonymous_max_bytes = anonymous_max_bytes
+        self.idle_ttl = idle_ttl
+        self.max_open = max(1, max_open)
+
+        self.embedder = HashingEmbedder(dim=int(os.getenv("MEMORY_EMBED_DIM", "512")))
+        self.embed_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("MEMORY_EMBED_WORKERS", "2")),
+            thread_name_prefix="memory-embed"
+        )
+        self.shards: Dict[str, MemoryManager] = {}
+        # Ostatnie użycie i trwające operacje per użytkownik (shard z operacją nie jest zamykany)
+        self._last_used: Dict[str, float] = {}
+        self._leases: Counter = Counter()
+        self._evictor: Optional[asyncio.Task] = None
+        self.evictions = 0
+        # Retencja w tle - startuje przy pierwszym zapisie
+        self.retention = RetentionWorker.from_env(lambda: self.shards.values(), retention)
+        self.init_status = "initialized"
+
+        # Shard anonimowy od razu - wczytuje istniejący log sprzed podziału
+        self.shard(None)
+
+    @classmethod
+    def from_env(cls, persist_dir: Optional[str] = None) -> "ShardedMemory":
+        """Konfiguracja z MEMORY_USER_MAX_BYTES / MEMORY_USER_MAX_RECORDS / MEMORY_SHARD_IDLE_TTL / MEMORY_MAX_OPEN_SHARDS"""
+        return cls(
+            persist_dir,
+            max_bytes=int(os.getenv("MEMORY_USER_MAX_BYTES", str(64 * 1024 * 1024))),
+            max_records=int(os.getenv("MEMORY_USER_MAX_RECORDS", "0")),
+            idle_ttl=float(os.getenv("MEMORY_SHARD_IDLE_TTL", "600")),
+            max_open=int(os.getenv("MEMORY_MAX_OPEN_SHARDS", "64"))
+        )
+
+    def _shard_dir(self, user: str) -> Optional[Path]:
+        if self.persist_dir is None:
+            return None
+        if user == ANONYMOUS:
+            return self.persist_dir
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", user)[:48]
+        digest = hashlib.sha256(user.encode("utf-8")).hexdigest()[:12]
+        return self.persist_dir / "users" / f"{slug}-{digest}"
+
+    def shard(self, user: Optional[str]) -> MemoryManager:
+        """Shard użytkownika (None = anonimowy); tworzony przy pierwszym użyciu"""
+        user = user or ANONYMOUS
+        self._last_used[user] = time.monotonic()
+        shard = self.shards.get(user)
+        if shard is not None:
+            return shard
+
+        directory = self._shard_dir(user)
+        if directory is not None and user != ANONYMOUS:
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / _OWNER_FILE).write_text(user, encoding="utf-8")
+
+        anonymous = user == ANONYMOUS
+        shard = MemoryManager(
+            persist_dir=str(directory) if directory is not None else None,
+            max_bytes=self.anonymous_max_bytes if anonymous else self.max_bytes,
+            max_records=None if anonymous else self.max_records,
+            embedder=self.embedder,
+            embed_pool=self.embed_pool
+        )
+        self.shards[user] = shard
+        return shard
+
+    def users(self) -> List[str]:
+        """Wszyscy użytkownicy: otwarte shardy i shardy zapisane na dysku (bez otwierania)"""
+        users: Set[str] = set(self.shards)
+        if self.persist_dir is not None:
+            for owner in (self.persist_dir / "users").glob(f"*/{_OWNER_FILE}"):
+                users.add(owner.read_text(encoding="utf-8"))
+        return sorted(users)
+
+    @asynccontextmanager
+    async def _lease(self, user: Optional[str]):
+        """Shard użytkownika, którego nie można zamknąć do końca operacji"""
+        user = user or ANONYMOUS
+        self._start_evictor()
+        shard = self.shard(user)
+        self._leases[user] += 1
+        try:
+            yield shard
+        finally:
+            self._leases[user] -= 1
+            self._last_used[user] = time.monotonic()
+
+    def _start_evictor(self):
+        if self._evictor is None or self._evictor.done():
+            self._evictor = asyncio.create_task(self._evict_loop())
+
+    async def _evict_loop(self):
+        interval = min(60.0, self.idle_ttl / 2) if self.idle_ttl else 30.0
+        while True:
+            await asyncio.sleep(max(1.0, interval))
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                print(f"⚠️ Błąd zamykania nieużywanych shardów: {e}")
+
+    async def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Zamknij shardy nieużywane od idle_ttl oraz najdawniej używane ponad max_open
+
+        Returns:
+            Liczba zamkniętych shardów
+        """
+        now = time.monotonic() if now is None else now
+        candidates = sorted(
+            (user for user in self.shards if user != ANONYMOUS and not self._leases[user]),
+            key=lambda user: self._last_used.get(user, 0.0)
+        )
+        evicted = 0
+        for user in candidates:
+            expired = bool(self.idle_ttl) and now - self._last_used.get(user, 0.0) >= self.idle_ttl
+            if not expired and len(self.shards) <= self.max_open:
+                break
+            if await self._evict(user):
+                evicted += 1
+        return evicted
+
+    async def _evict(self, user: str) -> bool:
+        """Zamknij shard, jeśli nikt go nie używa (zapis z kolejki trafia najpierw na dysk)"""
+        shard = self.shards.get(user)
+        if shard is None or user == ANONYMOUS or self._leases[user]:
+            return False
+        used = self._last_used.get(user)
+        if await shard.flush():
+            # Niezapisane interakcje są tylko w RAM - shard zostaje otwarty
+            return False
+        if self.shards.get(user) is not shard or self._leases[user] or self._last_used.get(user) != used:
+            return False
+        # Nowe zapytanie otworzy shard od nowa z dysku
+        del self.shards[user]
+        self._last_used.pop(user, None)
+        await shard.close()
+        self.evictions += 1
+        return True
+
+    async def store_interaction(
+        self, provider: str, task: str, result: Dict[str, Any], user: Optional[str] = None
+    ) -> bool:
+        """Zapisz interakcję w shardzie użytkownika"""
+        self.retention.start()
+        async with self._lease(user) as shard:
+            return await shard.store_interaction(provider, task, result)
+
+    async def store_interactions(self, interactions: List[Dict[str, Any]], user: Optional[str] = None) -> int:
+        """Zapisz wiele interakcji w shardzie użytkownika"""
+        self.retention.start()
+        async with self._lease(user) as shard:
+            return await shard.store_interactions(interactions)
+
+    async def search(self, query: str, user: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """Przeszukaj pamięć użytkownika (argumenty jak MemoryManager.search)"""
+        async with self._lease(user) as shard:
+            return await shard.search(query, **kwargs)
+
+    async def similar_tasks(self, task: str, user: Optional[str] = None, **kwargs) -> List[Dict[str, Any]]:
+        """Podobne zadania z pamięci użytkownika (argumenty jak MemoryManager.similar_tasks)"""
+        async with self._lease(user) as shard:
+            return await shard.similar_tasks(task, **kwargs)
+
+    async def get_history(
+        self, limit: int = 10, user: Optional[str] = None, cursor: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Historia użytkownika (cursor = id, od którego starsze interakcje)"""
+        async with self._lease(user) as shard:
+            return await shard.get_history(limit, cursor=cursor)
+
+    async def export(self, user: Optional[str] = None, **kwargs) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Eksport pamięci użytkownika partiami (argumenty jak MemoryManager.export)"""
+        async with self._lease(user) as shard:
+            async for chunk in shard.export(**kwargs):
+                yield chunk
+
+    async def clear(self, user: Optional[str] = None) -> bool:
+        """Wyczyść pamięć użytkownika"""
+        async with self._lease(user) as shard:
+            return await shard.clear()
+
+    async def admin_search(
+        self, query: str, limit: int = 10, offset: int = 0, **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Przeszukaj wszystkie shardy równolegle i scal top-k
+
+        Każdy shard zwraca swoje najlepsze `offset + limit` wyniki, więc
+        scalenie po score daje ten sam ranking co jeden wspólny indeks
+        (z dokładnością do statystyk BM25 liczonych per shard). Shardy
+        zamknięte są otwierane tylko na czas zapytania.
+        """
+        users = self.users()
+        # Shardy zamknięte otwierane tylko na czas zapytania, po kilka naraz
+        gate = asyncio.Semaphore(ADMIN_OPEN_CONCURRENCY)
+
+        async def search_shard(user: str) -> Dict[str, Any]:
+            # Surowe score - po zaokrągleniu remisy psułyby kolejność wymaganą przez heapq.merge
+            if user in self.shards:
+                async with self._lease(user) as shard:
+                    return await shard.search(query, limit=offset + limit, offset=0, round_scores=False, **kwargs)
+            async with gate:
+                async with self._lease(user) as shard:
+                    result = await shard.search(query, limit=offset + limit, offset=0, round_scores=False, **kwargs)
+                await self._evict(user)
+                return result
+
+        found = await asyncio.gather(*(search_shard(user) for user in users))
+        # Kolejność w shardzie: score malejąco, przy remisie nowsze id - klucz musi się z nią zgadzać
+        merged = heapq.merge(*(
+            [{**item, "user": user} for item in result["results"]]
+            for user, result in zip(users, found)
+        ), key=lambda item: (-item["score"], item["user"], -item["id"]))
+        results = [{**item, "score": round(item["score"], 4)} for item in islice(merged, offset, offset + limit)]
+        return {
+            "results": results,
+            "total": sum(result["total"] for result in found),
+            "shards": len(users)
+        }
+
+    async def compact(self) -> Dict[str, Any]:
+        """Retencja i kompakcja logów wszystkich otwartych shardów"""
+        policy = self.retention.policy
+        results = await asyncio.gather(*(shard.compact(policy) for shard in self.shards.values()))
+        summary = {"segments": 0, "kept": 0, "dropped": 0, "expired": 0, "trimmed": 0, "rolled_up": 0}
+        for result in results:
+            for key in summary:
+                summary[key] += result.get(key, 0)
+        return {**summary, "shards": len(results)}
+
+    def stats(self, user: Optional[str] = None) -> Dict[str, Any]:
+        """Statystyki shardu użytkownika i liczba otwartych shardów"""
+        return {
+            **self.shard(user).stats(),
+            "user": user or ANONYMOUS,
+            "shards": len(self.shards),
+            "evictions": self.evictions,
+            "quota": {"max_bytes": self.max_bytes, "max_records": self.max_records},
+            "retention_worker": self.retention.stats()
+        }
+
+    async def flush(self) -> int:
+        """Poczekaj na zapis zaległych interakcji we wszystkich shardach (zwraca liczbę niezapisanych)"""
+        return sum(await asyncio.gather(*(shard.flush() for shard in self.shards.values())))
+
+    async def close(self) -> int:
+        """Zamknij wszystkie shardy (zwraca liczbę interakcji, których nie udało się zapisać)"""
+        await self.retention.close()
+        if self._evictor is not None:
+            self._evictor.cancel()
+            try:
+                await self._evictor
+            except asyncio.CancelledError:
+                pass
+            self._evictor = None
+        unwritten = sum(await asyncio.gather(*(shard.close() for shard in self.shards.values())))
+        self.embed_pool.shutdown(wait=False)
+        return unwritten
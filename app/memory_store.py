@@ -0,0 +1,297 @@
+"""
+Memory Store - Trwały, segmentowany log append-only dla pamięci interakcji
+"""
+import os
+import json
+import mmap
+import time
+import zlib
+import struct
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterator, Callable
+
+from app.memory_records import payload_dict
+
+
+# Ramka rekordu: długość payloadu (uint32) + CRC32 payloadu (uint32) + payload JSON
+_HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+
+
+class SegmentLog:
+    """
+    Log append-only podzielony na segmenty
+
+    - rekordy są ramkowane (długość + CRC), więc odczyt przy starcie to
+      przesuwanie się po zmapowanym pliku (mmap), bez szukania końców linii
+    - niekompletna lub uszkodzona końcówka ostatniego segmentu (crash
+      w trakcie zapisu) jest obcinana przy otwarciu
+    - po przekroczeniu `segment_bytes` aktywny segment jest zamykany
+      i zaczyna się nowy
+    - kompakcja przepisuje zamknięte segmenty do jednego, pomijając
+      odrzucone rekordy
+    - payload to JSON rekordu (`append`) albo gotowa ramka binarna
+      (`append_payloads`, InteractionRecord.encode); `read_all` zwraca
+      słowniki dla obu, `read_payloads` - surowe bajty
+    """
+
+    FSYNC_POLICIES = ("always", "interval", "never")
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        fsync: str = "interval",
+        fsync_interval: float = 1.0
+    ):
+        """
+        Inicjalizacja
+        Args:
+            directory: Katalog segmentów
+            segment_bytes: Rozmiar, po którym następuje rollover segmentu
+            fsync: Polityka fsync: always / interval / never
+            fsync_interval: Odstęp fsync dla polityki interval (s)
+        """
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Nieznana polityka fsync: {fsync}")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_policy = fsync
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._last_fsync = time.monotonic()
+        self._segments: List[int] = sorted(
+            int(p.stem) for p in self.directory.glob(f"*{SEGMENT_SUFFIX}") if p.stem.isdigit()
+        )
+        if not self._segments:
+            self._segments.append(1)
+
+        self._recover_tail()
+        self._active = open(self._path(self._segments[-1]), "ab")
+        self.appended = 0
+        self.compactions = 0
+
+    @classmethod
+    def from_env(cls, directory: str) -> "SegmentLog":
+        """Konfiguracja z MEMORY_SEGMENT_BYTES / MEMORY_FSYNC / MEMORY_FSYNC_INTERVAL"""
+        return cls(
+            directory,
+            segment_bytes=int(os.getenv("MEMORY_SEGMENT_BYTES", str(64 * 1024 * 1024))),
+            fsync=os.getenv("MEMORY_FSYNC", "interval"),
+            fsync_interval=float(os.getenv("MEMORY_FSYNC_INTERVAL", "1.0"))
+        )
+
+    def _path(self, seq: int) -> Path:
+        return self.directory / f"{seq:08d}{SEGMENT_SUFFIX}"
+
+    def _recover_tail(self):
+        """Obetnij uszkodzoną końcówkę ostatniego segmentu"""
+        path = self._path(self._segments[-1])
+        if not path.exists():
+            return
+        valid_end = 0
+        for _, end in self._scan(path):
+            valid_end = end
+        if valid_end < path.stat().st_size:
+            print(f"⚠️ Obcinam uszkodzoną końcówkę segmentu {path.name} ({valid_end} B)")
+            with open(path, "r+b") as f:
+                f.truncate(valid_end)
+
+    @staticmethod
+    def _scan(path: Path) -> Iterator[tuple]:
+        """Iteruj po poprawnych ramkach segmentu: (payload, offset końca)"""
+        with open(path, "rb") as f:
+            yield from SegmentLog._scan_file(f)
+
+    @staticmethod
+    def _scan_file(f) -> Iterator[tuple]:
+        """Jak `_scan`, dla już otwartego pliku (także usuniętego z katalogu)"""
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offset = 0
+            while offset + _HEADER.size <= size:
+                length, crc = _HEADER.unpack_from(mm, offset)
+                start = offset + _HEADER.size
+                end = start + length
+                if end > size:
+                    break
+                payload = mm[start:end]
+                if zlib.crc32(payload) != crc:
+                    break
+                yield payload, end
+                offset = end
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+    @staticmethod
+    def _frame(payload: bytes) -> bytes:
+        return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def append(self, record: Dict[str, Any]):
+        """Dopisz rekord"""
+        self.append_batch([record])
+
+    def append_batch(self, records: List[Dict[str, Any]]):
+        """Dopisz wiele rekordów (JSON) jednym zapisem"""
+        self.append_payloads([self._encode(r) for r in records])
+
+    def append_payloads(self, payloads: List[bytes]):
+        """Dopisz gotowe payloady jednym zapisem"""
+        if not payloads:
+            return
+        data = b"".join(self._frame(p) for p in payloads)
+        with self._lock:
+            self._active.write(data)
+            self._active.flush()
+            self.appended += len(payloads)
+            self._maybe_fsync()
+            if self._active.tell() >= self.segment_bytes:
+                self._rollover()
+
+    def _maybe_fsync(self, force: bool = False):
+        now = time.monotonic()
+        if (
+            force
+            or self.fsync_policy == "always"
+            or (self.fsync_policy == "interval" and now - self._last_fsync >= self.fsync_interval)
+        ):
+            os.fsync(self._active.fileno())
+            self._last_fsync = now
+
+    def _rollover(self):
+        """Zamknij aktywny segment i rozpocznij nowy (wywoływane pod blokadą)"""
+        self._maybe_fsync(force=self.fsync_policy != "never")
+        self._active.close()
+        self._segments.append(self._segments[-1] + 1)
+        self._active = open(self._path(self._segments[-1]), "ab")
+
+    def read_all(self) -> Iterator[Dict[str, Any]]:
+        """Odczytaj wszystkie rekordy w kolejności zapisu (jako słowniki, jak `read_payloads`)"""
+        for payload in self.read_payloads():
+            yield payload_dict(payload)
+
+    def read_payloads(self) -> Iterator[bytes]:
+        """
+        Surowe payloady wszystkich rekordów w kolejności zapisu
+
+        Segmenty są otwierane przy starcie odczytu: kompakcja w trakcie
+        usuwa i podmienia pliki, ale otwarte deskryptory wciąż czytają
+        migawkę (ewentualne duplikaty id pomija wywołujący).
+        """
+        files = []
+        try:
+            with self._lock:
+                self._active.flush()
+                for seq in self._segments:
+                    try:
+                        files.append(open(self._path(seq), "rb"))
+                    except FileNotFoundError:
+                        continue
+            for f in files:
+                for payload, _ in self._scan_file(f):
+                    yield payload
+        finally:
+            for f in files:
+                f.close()
+
+    def compact(
+        self,
+        keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        rewrite: Optional[Dict[int, bytes]] = None,
+        seal: bool = False
+    ) -> Dict[str, int]:
+        """
+        Przepisz zamknięte segmenty do jednego
+
+        Args:
+            keep: Filtr rekordów (None = zachowaj wszystkie, usuń duplikaty id)
+            rewrite: Nowe wersje rekordów po id - gotowe payloady (zapisywane zamiast starych)
+            seal: Najpierw zamknij aktywny segment, żeby objąć też najnowsze rekordy
+
+        Nowy segment zastępuje najstarszy atomowo (os.replace), pozostałe
+        są usuwane. Przerwanie w trakcie zostawia co najwyżej duplikaty,
+        które są pomijane przy odczycie (deduplikacja po "id").
+        """
+        with self._lock:
+            if seal and self._active.tell() > 0:
+                self._rollover()
+            sealed = list(self._segments[:-1])
+        if not sealed:
+            return {"segments": 0, "kept": 0, "dropped": 0}
+
+        target = self._path(sealed[0])
+        tmp = target.with_suffix(".compact")
+        kept = dropped = 0
+        seen = set()
+        with open(tmp, "wb") as out:
+            for seq in sealed:
+                for payload, _ in self._scan(self._path(seq)):
+                    record = payload_dict(payload)
+                    record_id = record.get("id")
+                    if rewrite and record_id in rewrite and record_id not in seen:
+                        payload = rewrite[record_id]
+                        record = payload_dict(payload)
+                    if record_id in seen or (keep is not None and not keep(record)):
+                        dropped += 1
+                        continue
+                    if record_id is not None:
+                        seen.add(record_id)
+                    out.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+                    kept += 1
+            out.flush()
+            os.fsync(out.fileno())
+
+        os.replace(tmp, target)
+        for seq in sealed[1:]:
+            self._path(seq).unlink(missing_ok=True)
+        with self._lock:
+            self._segments = [s for s in self._segments if s not in sealed[1:]]
+        self.compactions += 1
+        return {"segments": len(sealed), "kept": kept, "dropped": dropped}
+
+    def truncate(self):
+        """Usuń wszystkie segmenty i zacznij od pustego logu"""
+        with self._lock:
+            self._active.close()
+            for seq in self._segments:
+                self._path(seq).unlink(missing_ok=True)
+            self._segments = [self._segments[-1] + 1]
+            self._active = open(self._path(self._segments[-1]), "ab")
+
+    def flush(self):
+        """Wymuś zapis na dysk"""
+        with self._lock:
+            self._active.flush()
+            if self.fsync_policy != "never":
+                self._maybe_fsync(force=True)
+
+    def close(self):
+        """Zamknij log"""
+        with self._lock:
+            if not self._active.closed:
+                self._active.flush()
+                if self.fsync_policy != "never":
+                    os.fsync(self._active.fileno())
+                self._active.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki logu"""
+        with self._lock:
+            segments = list(self._segments)
+        sizes = [self._path(s).stat().st_size for s in segments if self._path(s).exists()]
+        return {
+            "directory": str(self.directory),
+            "segments": len(segments),
+            "bytes": sum(sizes),
+            "appended": self.appended,
+            "compactions": self.compactions,
+            "fsync": self.fsync_policy
+        }
@@ -0,0 +1,382 @@
+"""
+Memory Vectors - Lokalne embeddingi i indeks wektorowy (NumPy) dla pamięci
+"""
+import os
+import zlib
+import asyncio
+from concurrent.futures import Executor
+from typing import List, Dict, Any, Optional, Tuple, Callable, Sequence
+
+import numpy as np
+
+from app.memory_index import tokenize
+
+
+class HashingEmbedder:
+    """
+    Embeddingi bez modelu i bez sieci (hashing trick)
+
+    Cechy: słowa oraz n-gramy znakowe słów (odporność na odmianę
+    i literówki), haszowane CRC32 do `dim` wymiarów ze znakiem z bitu
+    hasza. Wagi log(1 + tf), wektory znormalizowane L2 - iloczyn
+    skalarny to podobieństwo kosinusowe.
+    """
+
+    def __init__(
+        self,
+        dim: int = 512,
+        char_ngrams: int = 3,
+        ngram_weight: float = 0.5,
+        cache_size: int = 200000
+    ):
+        """
+        Inicjalizacja
+        Args:
+            dim: Wymiar wektora
+            char_ngrams: Długość n-gramów znakowych (0 = tylko słowa)
+            ngram_weight: Waga n-gramu względem całego słowa
+            cache_size: Liczba słów z zapamiętanymi cechami
+        """
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.ngram_weight = ngram_weight
+        self.cache_size = cache_size
+        self._cache: Dict[str, Tuple[Tuple[int, ...], Tuple[float, ...]]] = {}
+
+    def _token_features(self, token: str) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+        """Kolumny i wagi cech słowa (z pamięcią podręczną - słowa się powtarzają)"""
+        cached = self._cache.get(token)
+        if cached is not None:
+            return cached
+
+        features = [(token, 1.0)]
+        n = self.char_ngrams
+        if n and len(token) > n:
+            padded = f"#{token}#"
+            features.extend((padded[i:i + n], self.ngram_weight) for i in range(len(padded) - n + 1))
+
+        cols = []
+        values = []
+        for feature, weight in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            cols.append(h % self.dim)
+            values.append(weight if h & 0x80000000 else -weight)
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        cached = self._cache[token] = (tuple(cols), tuple(values))
+        return cached
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Embeddingi partii tekstów: macierz (len(texts), dim) float32"""
+        # Słowa -> lokalne id; cechy liczone raz na unikalne słowo w partii
+        vocab: Dict[str, int] = {}
+        token_ids: List[int] = []
+        doc_lengths: List[int] = []
+        for text in texts:
+            tokens = tokenize(text)
+            token_ids.extend([vocab.setdefault(t, len(vocab)) for t in tokens])
+            doc_lengths.append(len(tokens))
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if not token_ids:
+            return matrix
+
+        features = [self._token_features(t) for t in vocab]
+        feature_counts = np.array([len(cols) for cols, _ in features], dtype=np.int64)
+        feature_starts = np.cumsum(feature_counts) - feature_counts
+        feature_cols = np.fromiter(
+            (c for cols, _ in features for c in cols), dtype=np.int64, count=int(feature_counts.sum())
+        )
+        feature_values = np.fromiter(
+            (v for _, values in features for v in values), dtype=np.float64, count=int(feature_counts.sum())
+        )
+
+        # Rozwinięcie (dokument, słowo) -> (dokument, cecha) bez pętli Pythona
+        ids = np.array(token_ids, dtype=np.int64)
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), doc_lengths)
+        counts = feature_counts[ids]
+        offsets = np.cumsum(counts) - counts
+        positions = np.repeat(feature_starts[ids] - offsets, counts) + np.arange(int(counts.sum()))
+        # bincount po spłaszczonym indeksie (wiersz * dim + kolumna) sumuje kolizje
+        flat = np.repeat(rows, counts) * self.dim + feature_cols[positions]
+        matrix = np.bincount(
+            flat, weights=feature_values[positions], minlength=len(texts) * self.dim
+        ).astype(np.float32).reshape(len(texts), self.dim)
+
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embedding pojedynczego tekstu"""
+        return self.embed_batch([text])[0]
+
+
+class VectorIndex:
+    """
+    Indeks wektorowy na macierzy NumPy
+
+    Każdy doc_id ma swój wiersz macierzy; wiersze usuniętych dokumentów
+    są używane ponownie, więc macierz nie rośnie przy stałej liczbie
+    dokumentów. Do `ivf_threshold` dokumentów wyszukiwanie
+    to pełny iloczyn macierz-wektor (brute force). Powyżej - indeks IVF:
+    centroidy k-means (sferyczne), każdy dokument przypisany do
+    najbliższego centroidu, zapytanie liczy podobieństwo tylko dla
+    dokumentów z `nprobe` najbliższych list. Indeks jest trenowany
+    ponownie, gdy liczba dokumentów podwoi się od ostatniego treningu
+    (`needs_training` / `train_in` - k-means w puli wątków).
+    """
+
+    def __init__(self, dim: int, ivf_threshold: int = 20000, nlist: int = 0, nprobe: int = 16):
+        """
+        Inicjalizacja
+        Args:
+            dim: Wymiar wektorów
+            ivf_threshold: Liczba dokumentów, od której używany jest IVF
+            nlist: Liczba list IVF (0 = sqrt(liczba dokumentów))
+            nprobe: Liczba przeszukiwanych list
+        """
+        self.dim = dim
+        self.ivf_threshold = ivf_threshold
+        self.nlist = nlist
+        self.nprobe = nprobe
+
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._present = np.zeros(0, dtype=bool)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._row_of: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._rows = 0
+        self._count = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_at = 0
+        # Trening w tle: wiersze zmienione w jego trakcie, epoka unieważniana przez clear()
+        self._training = False
+        self._dirty: List[np.ndarray] = []
+        self._epoch = 0
+
+    @classmethod
+    def from_env(cls, dim: int) -> "VectorIndex":
+        """Konfiguracja z MEMORY_IVF_THRESHOLD / MEMORY_IVF_NLIST / MEMORY_IVF_NPROBE"""
+        return cls(
+            dim,
+            ivf_threshold=int(os.getenv("MEMORY_IVF_THRESHOLD", "20000")),
+            nlist=int(os.getenv("MEMORY_IVF_NLIST", "0")),
+            nprobe=int(os.getenv("MEMORY_IVF_NPROBE", "16"))
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _reserve(self, rows: int):
+        capacity = len(self._vectors)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 1024)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self._rows] = self._vectors[:self._rows]
+        present = np.zeros(capacity, dtype=bool)
+        present[:self._rows] = self._present[:self._rows]
+        assign = np.full(capacity, -1, dtype=np.int32)
+        assign[:self._rows] = self._assign[:self._rows]
+        ids = np.full(capacity, -1, dtype=np.int64)
+        ids[:self._rows] = self._ids[:self._rows]
+        self._vectors, self._present, self._assign, self._ids = vectors, present, assign, ids
+
+    def _row_for(self, doc_id: int) -> int:
+        row = self._row_of.get(doc_id)
+        if row is None:
+            row = self._free.pop() if self._free else self._rows
+            self._rows = max(self._rows, row + 1)
+            self._row_of[doc_id] = row
+            self._count += 1
+        return row
+
+    def add(self, doc_ids: Sequence[int], vectors: np.ndarray):
+        """Dodaj wektory (wiersze `vectors` odpowiadają `doc_ids`)"""
+        if not len(doc_ids):
+            return
+        self._reserve(self._rows + len(doc_ids))
+        rows = np.fromiter((self._row_for(int(d)) for d in doc_ids), dtype=np.int64, count=len(doc_ids))
+        self._vectors[rows] = vectors
+        self._present[rows] = True
+        self._ids[rows] = np.asarray(doc_ids, dtype=np.int64)
+
+        if self._centroids is not None:
+            self._assign[rows] = np.argmax(vectors @ self._centroids.T, axis=1)
+        if self._training:
+            self._dirty.append(rows)
+
+    def remove(self, doc_id: int):
+        """Usuń wektor dokumentu (wiersz wraca do puli wolnych)"""
+        row = self._row_of.pop(doc_id, None)
+        if row is not None:
+            self._present[row] = False
+            self._free.append(row)
+            self._count -= 1
+
+    def clear(self):
+        """Wyczyść indeks"""
+        self._present[:] = False
+        self._row_of.clear()
+        self._free.clear()
+        self._rows = 0
+        self._count = 0
+        self._centroids = None
+        self._trained_at = 0
+        self._epoch += 1
+
+    def needs_training(self) -> bool:
+        """Czy liczba dokumentów przekroczyła próg (ponownego) treningu IVF"""
+        return (
+            not self._training
+            and self._count >= self.ivf_threshold
+            and self._count >= 2 * self._trained_at
+        )
+
+    def train(self, iterations: int = 10, sample: int = 64, seed: int = 0):
+        """Wytrenuj centroidy IVF (k-means na próbce) i przypisz dokumenty"""
+        rows, data, nlist = self._training_sample(sample, seed)
+        if rows is None:
+            return
+        centroids = self._kmeans(data, nlist, iterations, seed)
+        self._install(rows, centroids, self._nearest(self._vectors, rows, centroids))
+
+    async def train_in(self, executor: Optional[Executor], iterations: int = 10, sample: int = 64, seed: int = 0):
+        """
+        Trening jak `train`, ale k-means i przypisanie liczone w puli wątków
+
+        Wyszukiwanie działa w tym czasie na starych centroidach (lub brute
+        force); wiersze dodane w trakcie są przypisywane ponownie po treningu.
+        """
+        if self._training:
+            return
+        rows, data, nlist = self._training_sample(sample, seed)
+        if rows is None:
+            return
+        self._training = True
+        self._dirty = []
+        epoch = self._epoch
+        try:
+            loop = asyncio.get_running_loop()
+            centroids = await loop.run_in_executor(executor, self._kmeans, data, nlist, iterations, seed)
+            labels = await loop.run_in_executor(executor, self._nearest, self._vectors, rows, centroids)
+            if epoch == self._epoch:
+                self._install(rows, centroids, labels)
+        finally:
+            self._training = False
+            self._dirty = []
+
+    def _training_sample(self, sample: int, seed: int):
+        """(obecne wiersze, kopia próbki treningowej, nlist) lub (None, None, 0)"""
+        rows = np.flatnonzero(self._present[:self._rows])
+        if not len(rows):
+            return None, None, 0
+        nlist = self.nlist or int(np.clip(np.sqrt(len(rows)), 16, 4096))
+        nlist = min(nlist, len(rows))
+        rng = np.random.default_rng(seed)
+        train_rows = rng.choice(rows, size=min(len(rows), nlist * sample), replace=False)
+        return rows, self._vectors[train_rows], nlist
+
+    @staticmethod
+    def _kmeans(data: np.ndarray, nlist: int, iterations: int, seed: int) -> np.ndarray:
+        """Sferyczny k-means (bez stanu indeksu - bezpieczny w wątku)"""
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = sums / norms
+        return centroids.astype(np.float32)
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, rows: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Najbliższy centroid dla wierszy (partiami, bez kopii całej macierzy)"""
+        labels = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), 65536):
+            chunk = rows[start:start + 65536]
+            labels[start:start + 65536] = np.argmax(vectors[chunk] @ centroids.T, axis=1)
+        return labels
+
+    def _install(self, rows: np.ndarray, centroids: np.ndarray, labels: np.ndarray):
+        """Podmień centroidy i przypisania; wiersze zmienione w trakcie treningu od nowa"""
+        self._centroids = centroids
+        self._assign[rows] = labels
+        if self._dirty:
+            dirty = np.unique(np.concatenate(self._dirty))
+            dirty = dirty[self._present[dirty]]
+            self._assign[dirty] = self._nearest(self._vectors, dirty, centroids)
+        self._trained_at = len(rows)
+
+    def _score(self, query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc_id kandydatów, podobieństwa) - cała macierz lub listy IVF"""
+        present = self._present[:self._rows]
+        if self._centroids is None or self._count < self.ivf_threshold:
+            # Brute force na widoku macierzy (bez kopiowania wierszy)
+            scores = self._vectors[:self._rows] @ query
+            rows = np.flatnonzero(present)
+            return rows, scores[rows]
+        nprobe = min(self.nprobe, len(self._centroids))
+        probe = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.flatnonzero(present & np.isin(self._assign[:self._rows], probe))
+        return rows, self._vectors[rows] @ query
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        offset: int = 0,
+        min_score: float = 0.0,
+        predicate: Optional[Callable[[int], bool]] = None
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Najbliżsi sąsiedzi (podobieństwo kosinusowe)
+
+        Args:
+            query: Znormalizowany wektor zapytania
+            k: Liczba wyników
+            offset: Pominięte najlepsze wyniki (paginacja)
+            min_score: Minimalne podobieństwo
+            predicate: Filtr doc_id (np. provider, zakres czasu)
+
+        Returns:
+            ([(doc_id, score)], liczba dokumentów powyżej min_score)
+        """
+        rows, scores = self._score(query)
+        if not len(rows):
+            return [], 0
+
+        keep = scores >= min_score
+        ids, scores = self._ids[rows[keep]], scores[keep]
+        if predicate is not None:
+            mask = np.fromiter((predicate(int(d)) for d in ids), dtype=bool, count=len(ids))
+            ids, scores = ids[mask], scores[mask]
+
+        total = len(ids)
+        wanted = offset + k
+        if total > wanted:
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+        else:
+            top = np.arange(total)
+        # Przy remisie nowsze dokumenty (wyższe doc_id) pierwsze
+        top = top[np.lexsort((-ids[top], -scores[top]))][offset:]
+        return [(int(ids[i]), float(scores[i])) for i in top], total
+
+    def stats(self) -> Dict[str, Any]:
+        """Rozmiar indeksu"""
+        return {
+            "vectors": self._count,
+            "dim": self.dim,
+            "mode": "ivf" if self._centroids is not None and self._count >= self.ivf_threshold else "brute_force",
+            "nlist": len(self._centroids) if self._centroids is not None else 0,
+            "nprobe": self.nprobe,
+            "bytes": int(self._vectors.nbytes)
+        }
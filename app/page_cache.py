@@ -0,0 +1,309 @@
+"""
+Page Cache - Cache wyekstrahowanej treści stron z warunkową rewalidacją HTTP
+"""
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Mapping, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import httpx
+
+from app.http_clients import get_client_registry
+
+
+# Parametry śledzące pomijane w kluczu cache
+_TRACKING_PARAMS = re.compile(r"^(utm_.*|gclid|fbclid|msclkid|mc_cid|mc_eid|_ga|ref_src)$", re.IGNORECASE)
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Klucz cache: schemat i host małymi literami, bez domyślnego portu,
+    fragmentu i parametrów śledzących, z posortowanym query
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _TRACKING_PARAMS.match(k)
+    ))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def _max_age(cache_control: str) -> Optional[float]:
+    """Świeżość z Cache-Control (None = brak dyrektywy, 0 = zawsze rewaliduj)"""
+    directives = [d.strip().lower() for d in cache_control.split(",")]
+    if "no-cache" in directives:
+        return 0.0
+    for directive in directives:
+        if directive.startswith("max-age="):
+            try:
+                return max(0.0, float(directive[8:]))
+            except ValueError:
+                return None
+    return None
+
+
+class PageEntry:
+    """Migawka strony z walidatorami HTTP"""
+
+    __slots__ = ("url", "content", "etag", "last_modified", "stored_at", "fresh_until", "size", "revalidations")
+
+    def __init__(
+        self,
+        url: str,
+        content: Dict[str, Any],
+        etag: Optional[str],
+        last_modified: Optional[str],
+        fresh_until: float
+    ):
+        self.url = url
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.time()
+        self.fresh_until = fresh_until
+        self.size = sum(len(v) for v in content.values() if isinstance(v, str))
+        self.revalidations = 0
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    Cache treści stron (tekst / HTML) kluczowany znormalizowanym URL
+    i wariantem renderu (skrót profilu nawigacji - blokowane skrypty czy
+    wait_until zmieniają wyrenderowany tekst)
+
+    - wpis jest świeży przez `ttl` (lub krócej wg Cache-Control) - trafienie
+      nie dotyka ani przeglądarki, ani sieci
+    - po tym czasie wpis z ETag / Last-Modified jest rewalidowany
+      warunkowym GET (If-None-Match / If-Modified-Since) przez
+      współdzielony klient httpx; 304 przedłuża świeżość, każda inna
+      odpowiedź usuwa wpis (strona do ponownego renderu)
+    - wpisy starsze niż `max_age` i wpisy bez walidatorów po `ttl` wypadają
+    - LRU ograniczone liczbą wpisów i sumą rozmiarów treści
+    - strony z Cache-Control: no-store nie są zapisywane
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 600,
+        max_age: float = 86400,
+        revalidate_timeout: float = 5.0,
+        enabled: bool = True
+    ):
+        """
+        Inicjalizacja
+        Args:
+            max_entries: Maksymalna liczba stron
+            max_bytes: Maksymalny łączny rozmiar treści (znaki)
+            ttl: Czas świeżości bez rewalidacji (s)
+            max_age: Maksymalny wiek wpisu mimo rewalidacji (s)
+            revalidate_timeout: Timeout warunkowego żądania (s)
+            enabled: Włącz cache
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_age = max_age
+        self.revalidate_timeout = revalidate_timeout
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple[str, str], PageEntry]" = OrderedDict()
+        self.bytes = 0
+
+        self.hits = 0
+        self.revalidated = 0
+        self.changed = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revalidation_errors = 0
+        self.uncacheable = 0
+
+    @classmethod
+    def from_env(cls) -> "PageCache":
+        """Konfiguracja z PAGE_CACHE_*"""
+        return cls(
+            max_entries=int(os.getenv("PAGE_CACHE_SIZE", "512")),
+            max_bytes=int(os.getenv("PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl=float(os.getenv("PAGE_CACHE_TTL", "600")),
+            max_age=float(os.getenv("PAGE_CACHE_MAX_AGE", "86400")),
+            revalidate_timeout=float(os.getenv("PAGE_CACHE_REVALIDATE_TIMEOUT", "5")),
+            enabled=os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+        )
+
+    def _drop(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    async def get(self, url: str, need_html: bool = False, variant: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Treść strony z cache (None = trzeba wyrenderować)
+
+        Args:
+            url: Adres strony
+            need_html: Wymagany HTML (wpisy z samym tekstem nie wystarczą)
+            variant: Wariant renderu (NavigationProfile.fingerprint)
+
+        Returns:
+            Migawka z kluczem "cache": {"status": fresh / revalidated, "age", ...}
+        """
+        if not self.enabled:
+            return None
+        key = (normalize_url(url), variant)
+        entry = self._entries.get(key)
+        if entry is None or (need_html and "html" not in entry.content):
+            self.misses += 1
+            return None
+
+        now = time.time()
+        if now - entry.stored_at > self.max_age or (now >= entry.fresh_until and not entry.validators):
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        status = "fresh"
+        if now >= entry.fresh_until:
+            if not await self._revalidate(entry):
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            status = "revalidated"
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self.hits += 1
+        return {
+            **entry.content,
+            "cache": {
+                "status": status,
+                "age": round(now - entry.stored_at, 1),
+                "revalidations": entry.revalidations,
+                "etag": entry.etag,
+                "last_modified": entry.last_modified
+            }
+        }
+
+    async def _revalidate(self, entry: PageEntry) -> bool:
+        """Warunkowy GET; True = 304 (treść aktualna)"""
+        client = get_client_registry().get("web", "")
+        try:
+            # Strumień zamykany bez czytania ciała - przy 200 nie pobieramy całej strony
+            async with client.stream(
+                "GET", entry.url, headers=entry.validators,
+                follow_redirects=True, timeout=self.revalidate_timeout
+            ) as response:
+                not_modified = response.status_code == 304
+                headers = response.headers
+        except httpx.HTTPError:
+            self.revalidation_errors += 1
+            return False
+
+        if not not_modified:
+            self.changed += 1
+            return False
+        self.revalidated += 1
+        entry.revalidations += 1
+        entry.etag = headers.get("etag", entry.etag)
+        entry.last_modified = headers.get("last-modified", entry.last_modified)
+        entry.fresh_until = time.time() + self._freshness(headers)
+        return True
+
+    def _freshness(self, headers: Mapping[str, str]) -> float:
+        max_age = _max_age(headers.get("cache-control", ""))
+        return self.ttl if max_age is None else min(self.ttl, max_age)
+
+    def put(
+        self, url: str, content: Dict[str, Any], headers: Optional[Mapping[str, str]] = None, variant: str = ""
+    ) -> bool:
+        """
+        Zapisz migawkę strony
+
+        Args:
+            url: Adres żądany przez klienta (klucz)
+            content: Treść (title, text, html, url)
+            headers: Nagłówki odpowiedzi dokumentu (małe litery, jak w Playwright)
+            variant: Wariant renderu (NavigationProfile.fingerprint)
+
+        Returns:
+            True jeśli zapisano
+        """
+        if not self.enabled:
+            return False
+        headers = headers or {}
+        if "no-store" in headers.get("cache-control", "").lower():
+            self.uncacheable += 1
+            return False
+
+        key = (normalize_url(url), variant)
+        entry = PageEntry(
+            # Rewalidacja idzie pod adres końcowy (po przekierowaniach)
+            content.get("url") or url,
+            content,
+            headers.get("etag"),
+            headers.get("last-modified"),
+            time.time() + self._freshness(headers)
+        )
+        if entry.size > self.max_bytes:
+            self.uncacheable += 1
+            return False
+        self._drop(key)
+        self._entries[key] = entry
+        self.bytes += entry.size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+        return True
+
+    def invalidate(self, url: Optional[str] = None) -> int:
+        """Usuń wpisy dla `url` we wszystkich wariantach (None = wszystkie); zwraca liczbę usuniętych"""
+        if url is None:
+            count = len(self._entries)
+            self._entries.clear()
+            self.bytes = 0
+            return count
+        normalized = normalize_url(url)
+        keys = [key for key in self._entries if key[0] == normalized]
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki cache stron"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "max_age": self.max_age,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "changed": self.changed,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "revalidation_errors": self.revalidation_errors,
+            "uncacheable": self.uncacheable
+        }
@@ -2,12 +2,20 @@
 Perplexity API Wrapper - Integracja z Sonar API
 """
 import os
+import json
 import asyncio
 import httpx
-from typing import Optional, Dict, Any, List
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, AsyncIterator, Union
 from datetime import datetime
 from enum import Enum
 
+from app.response_cache import ResponseCache, make_cache_key, get_response_cache
+from app.singleflight import SingleFlight
+from app.resilience import RetryPolicy, CircuitOpenError, get_breaker
+from app.http_clients import get_client_registry
+from app.rate_limit import RateLimitExceeded, get_rate_limiter, estimate_tokens
+
 
 class PerplexityModel(str, Enum):
     """Dostępne modele Perplexity"""
@@ -20,24 +28,33 @@ class PerplexityModel(str, Enum):
 class PerplexityAPI:
     """Wrapper dla Perplexity Sonar API"""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[ResponseCache] = None):
         """
         Inicjalizacja
         Args:
             api_key: Klucz API (domyślnie z PERPLEXITY_API_KEY)
+            cache: Cache odpowiedzi (domyślnie globalny, konfiguracja z LLM_CACHE_*)
         """
         self.api_key = api_key or os.getenv("PERPLEXITY_API_KEY")
-        self.base_url = "https://api.perplexity.ai"
+        self.base_url = os.getenv("PERPLEXITY_BASE_URL", "https://api.perplexity.ai")
         self.model = PerplexityModel.SONAR_HUGE
-        self.timeout = 60
+        self.timeout = httpx.Timeout(
+            float(os.getenv("PERPLEXITY_TIMEOUT", "60")),
+            connect=float(os.getenv("PERPLEXITY_CONNECT_TIMEOUT", "5"))
+        )
 
         if not self.api_key:
             raise ValueError("❌ PERPLEXITY_API_KEY not set")
 
-        self.client = httpx.AsyncClient(
-            timeout=self.timeout,
-            headers={"Authorization": f"Bearer {self.api_key}"}
-        )
+        self.cache = cache if cache is not None else get_response_cache()
+        self.inflight = SingleFlight()
+        self.retry = RetryPolicy()
+        self.breaker = get_breaker("perplexity")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Współdzielony klient z puli (jeden na klucz API)"""
+        return get_client_registry().get("perplexity", self.api_key, base_url=self.base_url)
 
     async def query(
         self,
@@ -45,7 +62,9 @@ class PerplexityAPI:
         model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2048,
-        system: Optional[str] = None
+        system: Optional[str] = None,
+        use_cache: bool = True,
+        user: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Wyślij zapytanie do Perplexity API
@@ -56,44 +75,158 @@ class PerplexityAPI:
             temperature: Temperatura (0-2)
             max_tokens: Max tokeny w odpowiedzi
             system: System prompt
+            use_cache: False = pomiń cache odpowiedzi
+            user: Użytkownik (limit zapytań per użytkownik)
 
         Returns:
             Słownik z odpowiedzią API
         """
         try:
-            model = model or self.model
+            payload = self._build_payload(prompt, model, temperature, max_tokens, system)
 
-            payload = {
-                "model": model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": system or "You are a helpful AI assistant."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "stream": False
-            }
+            key = make_cache_key(payload)
+            if use_cache:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    return cached
+            else:
+                self.cache.record_bypass()
 
-            response = await self.client.post(
-                f"{self.base_url}/chat/completions",
-                json=payload
-            )
+            await get_rate_limiter().acquire_user(user)
 
-            response.raise_for_status()
-            return response.json()
+            if not use_cache:
+                # Pominięcie cache oznacza świeżą odpowiedź - bez dołączania do zapytań w locie
+                return await self._post_completion(key, payload)
+
+            # Identyczne zapytania w locie współdzielą jedno wywołanie
+            return await self.inflight.do(key, lambda: self._post_completion(key, payload))
 
+        except CircuitOpenError as e:
+            return {
+                "error": str(e),
+                "success": False,
+                "circuit_open": True
+            }
+        except RateLimitExceeded as e:
+            return {
+                "error": str(e),
+                "success": False,
+                "rate_limited": True
+            }
         except httpx.HTTPError as e:
             return {
                 "error": str(e),
                 "success": False
             }
 
+    async def _post_completion(self, key: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Wywołaj /chat/completions (z ponowieniami) i zapisz odpowiedź w cache"""
+        await get_rate_limiter().acquire_provider("perplexity", self._estimate_tokens(payload))
+        response = await self._post_with_retry(payload)
+        data = response.json()
+        await self.cache.set(key, data)
+        return data
+
+    @staticmethod
+    def _estimate_tokens(payload: Dict[str, Any]) -> int:
+        """Szacunkowy koszt zapytania w tokenach (limit TPM)"""
+        text = "".join(m.get("content", "") for m in payload.get("messages", []))
+        return estimate_tokens(text, payload.get("max_tokens") or 0)
+
+    async def _post_with_retry(self, payload: Dict[str, Any]) -> httpx.Response:
+        """POST /chat/completions przez circuit breaker i politykę ponowień"""
+        return await self.retry.run(
+            lambda: self.client.post(
+                f"{self.base_url}/chat/completions", json=payload, timeout=self.timeout
+            ),
+            self.breaker
+        )
+
+    async def query_stream(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        system: Optional[str] = None,
+        user: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Wyślij zapytanie w trybie streamingu (SSE)
+
+        Zwraca kolejne fragmenty tekstu w miarę ich nadejścia.
+        Zamknięcie generatora (np. rozłączenie klienta) przerywa
+        połączenie z Perplexity.
+
+        Raises:
+            httpx.HTTPError: Błąd połączenia lub status != 2xx
+            RateLimitExceeded: Zbyt długie oczekiwanie na limit
+        """
+        payload = self._build_payload(prompt, model, temperature, max_tokens, system, stream=True)
+
+        await get_rate_limiter().acquire("perplexity", user, self._estimate_tokens(payload))
+
+        self.breaker.before_call()
+        recorded = False
+        try:
+            async with self.client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                self.breaker.record_success()
+                recorded = True
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    delta = chunk.get("choices", [{}])[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+        except (httpx.TransportError, httpx.HTTPStatusError):
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Anulowanie przed odpowiedzią - zwolnij slot próbny half-open
+            if not recorded:
+                self.breaker.release()
+            raise
+
+    def _build_payload(
+        self,
+        prompt: str,
+        model: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        system: Optional[str],
+        stream: bool = False
+    ) -> Dict[str, Any]:
+        """Zbuduj payload dla /chat/completions"""
+        return {
+            "model": model or self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": system or "You are a helpful AI assistant."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+
     async def search(
         self,
         query: str,
@@ -121,19 +254,17 @@ class PerplexityAPI:
                 "search_focus": focus
             }
 
-            response = await self.client.post(
-                f"{self.base_url}/chat/completions",
-                json=payload
-            )
-
-            response.raise_for_status()
+            await get_rate_limiter().acquire_provider("perplexity", self._estimate_tokens(payload))
+            response = await self._post_with_retry(payload)
             return response.json()
 
-        except httpx.HTTPError as e:
+        except (httpx.HTTPError, CircuitOpenError, RateLimitExceeded) as e:
             return {"error": str(e), "success": False}
 
-    async def code_review(self, code: str) -> str:
-        """Przegląd kodu AI"""
+    async def code_review(
+        self, code: str, stream: bool = False, use_cache: bool = True, user: Optional[str] = None
+    ) -> Union[str, AsyncIterator[str]]:
+        """Przegląd kodu AI (stream=True zwraca iterator fragmentów)"""
         prompt = f"""Przeanalizuj poniższy kod i podaj:
 1. Potencjalne problemy
 2. Sugestie ulepszeń
@@ -145,10 +276,15 @@ Kod:
 {code}
 ```"""
 
-        result = await self.query(prompt, temperature=0.3)
+        if stream:
+            return self.query_stream(prompt, temperature=0.3, user=user)
+        result = await self.query(prompt, temperature=0.3, use_cache=use_cache, user=user)
         return result.get("choices", [{}])[0].get("message", {}).get("content", "")
 
-    async def generate_comment(self, context: str, comment_type: str = "github") -> str:
+    async def generate_comment(
+        self, context: str, comment_type: str = "github", use_cache: bool = True,
+        user: Optional[str] = None
+    ) -> str:
         """Generuj komentarze na GitHub / Social Media"""
         prompts = {
             "github": f"Wygeneruj profesjonalny komentarz na GitHub dotyczący: {context}",
@@ -158,24 +294,33 @@ Kod:
         }
 
         prompt = prompts.get(comment_type, prompts["github"])
-        result = await self.query(prompt, temperature=0.7, max_tokens=500)
+        result = await self.query(prompt, temperature=0.7, max_tokens=500, use_cache=use_cache, user=user)
         return result.get("choices", [{}])[0].get("message", {}).get("content", "")
 
-    async def summarize(self, text: str, max_length: int = 300) -> str:
-        """Podsumuj tekst"""
+    async def summarize(
+        self, text: str, max_length: int = 300, stream: bool = False, use_cache: bool = True,
+        user: Optional[str] = None
+    ) -> Union[str, AsyncIterator[str]]:
+        """Podsumuj tekst (stream=True zwraca iterator fragmentów)"""
         prompt = f"Podsumuj poniższy tekst w max {max_length} znakach:\n\n{text}"
-        result = await self.query(prompt, temperature=0.3, max_tokens=200)
+        if stream:
+            return self.query_stream(prompt, temperature=0.3, max_tokens=200, user=user)
+        result = await self.query(prompt, temperature=0.3, max_tokens=200, use_cache=use_cache, user=user)
         return result.get("choices", [{}])[0].get("message", {}).get("content", "")
 
-    async def translate(self, text: str, target_language: str = "pl") -> str:
-        """Przetłumacz tekst"""
+    async def translate(
+        self, text: str, target_language: str = "pl", stream: bool = False, use_cache: bool = True,
+        user: Optional[str] = None
+    ) -> Union[str, AsyncIterator[str]]:
+        """Przetłumacz tekst (stream=True zwraca iterator fragmentów)"""
         prompt = f"Przetłumacz na {target_language}:\n\n{text}"
-        result = await self.query(prompt, temperature=0.3, max_tokens=2000)
+        if stream:
+            return self.query_stream(prompt, temperature=0.3, max_tokens=2000, user=user)
+        result = await self.query(prompt, temperature=0.3, max_tokens=2000, use_cache=use_cache, user=user)
         return result.get("choices", [{}])[0].get("message", {}).get("content", "")
 
     async def close(self):
-        """Zamknij client"""
-        await self.client.aclose()
+        """Zamknij zasoby (klienta HTTP i cache zamykane są przy shutdown)"""
 
 
 # Globalna instancja
@@ -190,9 +335,29 @@ async def get_perplexity_client() -> PerplexityAPI:
     return _perplexity_client
 
 
+# Klienci dla kluczy użytkowników - jedna instancja na klucz, żeby single-flight
+# i polityka ponowień nie były tworzone od zera przy każdym zapytaniu
+_keyed_clients: "OrderedDict[str, PerplexityAPI]" = OrderedDict()
+MAX_KEYED_CLIENTS = 256
+
+
+def get_perplexity_client_for_key(api_key: str) -> PerplexityAPI:
+    """Pobierz lub utwórz klienta dla klucza użytkownika (LRU, MAX_KEYED_CLIENTS)"""
+    client = _keyed_clients.get(api_key)
+    if client is None:
+        client = PerplexityAPI(api_key=api_key)
+        _keyed_clients[api_key] = client
+        while len(_keyed_clients) > MAX_KEYED_CLIENTS:
+            _keyed_clients.popitem(last=False)
+    else:
+        _keyed_clients.move_to_end(api_key)
+    return client
+
+
 async def close_perplexity_client():
     """Zamknij globalną instancję"""
     global _perplexity_client
     if _perplexity_client:
         await _perplexity_client.close()
         _perplexity_client = None
+    _keyed_clients.clear()
@@ -0,0 +1,182 @@
+"""
+Provider API - Wywołania HTTP providerów LLM przez współdzielony rejestr klientów
+"""
+import os
+import json
+from typing import Optional, Dict, Any, Tuple, AsyncIterator
+
+from app.http_clients import PROVIDER_BASE_URLS, get_client_registry
+from app.resilience import RetryPolicy
+
+
+# Provider (MultiLLM.PROVIDERS) -> (format API, domyślny model)
+PROVIDER_API = {
+    "perplexity": ("openai", "sonar"),
+    "gpt": ("openai", "gpt-4o-mini"),
+    "claude": ("anthropic", "claude-3-5-haiku-latest"),
+    "gemini": ("gemini", "gemini-1.5-flash"),
+    "deepseek": ("openai", "deepseek-chat"),
+    "qwen": ("openai", "qwen-turbo"),
+    "kimi": ("openai", "moonshot-v1-8k"),
+    "grok": ("openai", "grok-beta"),
+    "agnes": ("openai", "agnes"),
+}
+
+DEFAULT_MAX_TOKENS = 1024
+
+# Formaty API ze streamingiem SSE (stream_provider)
+STREAM_APIS = {"openai", "anthropic", "gemini"}
+
+
+def env_prefix(key_env: str) -> str:
+    """Prefiks zmiennych providera: OPENAI_API_KEY -> OPENAI (OPENAI_BASE_URL, OPENAI_MODEL)"""
+    return key_env[:-len("_API_KEY")] if key_env.endswith("_API_KEY") else key_env
+
+
+def provider_endpoint(provider: str, key_env: str) -> Tuple[str, str]:
+    """
+    Adres bazowy i model providera (nadpisywane przez <PREFIX>_BASE_URL / <PREFIX>_MODEL)
+
+    Raises:
+        ValueError: Provider bez znanego adresu API (np. agnes bez AGNES_BASE_URL)
+    """
+    prefix = env_prefix(key_env)
+    base_url = os.getenv(f"{prefix}_BASE_URL") or PROVIDER_BASE_URLS.get(provider)
+    if not base_url:
+        raise ValueError(f"Brak adresu API providera '{provider}' ({prefix}_BASE_URL)")
+    return base_url.rstrip("/"), os.getenv(f"{prefix}_MODEL") or PROVIDER_API[provider][1]
+
+
+def supports_stream(provider: str) -> bool:
+    """Czy provider ma API ze streamingiem odpowiedzi"""
+    return provider in PROVIDER_API and PROVIDER_API[provider][0] in STREAM_APIS
+
+
+def build_request(
+    api: str, model: str, task: str, max_tokens: int, stream: bool = False
+) -> Tuple[str, Dict[str, Any]]:
+    """Ścieżka i payload zapytania w formacie danego API (stream=True - odpowiedź jako SSE)"""
+    if api == "anthropic":
+        payload = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": task}]
+        }
+        if stream:
+            payload["stream"] = True
+        return "/messages", payload
+    if api == "gemini":
+        method = "streamGenerateContent?alt=sse" if stream else "generateContent"
+        return f"/models/{model}:{method}", {
+            "contents": [{"role": "user", "parts": [{"text": task}]}],
+            "generationConfig": {"maxOutputTokens": max_tokens}
+        }
+    payload = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": task}]
+    }
+    if stream:
+        payload["stream"] = True
+    return "/chat/completions", payload
+
+
+def parse_response(api: str, data: Dict[str, Any]) -> str:
+    """
+    Tekst odpowiedzi
+
+    Raises:
+        KeyError, IndexError, TypeError: Nieoczekiwany format odpowiedzi
+    """
+    if api == "anthropic":
+        return "".join(block.get("text", "") for block in data["content"] if block.get("type") == "text")
+    if api == "gemini":
+        return "".join(part.get("text", "") for part in data["candidates"][0]["content"]["parts"])
+    return data["choices"][0]["message"]["content"]
+
+
+def parse_stream_event(api: str, data: Dict[str, Any]) -> str:
+    """Fragment tekstu ze zdarzenia SSE (pusty dla zdarzeń bez treści)"""
+    if api == "anthropic":
+        if data.get("type") != "content_block_delta":
+            return ""
+        return data.get("delta", {}).get("text", "")
+    if api == "gemini":
+        candidates = data.get("candidates") or [{}]
+        return "".join(part.get("text", "") for part in candidates[0].get("content", {}).get("parts", []))
+    choices = data.get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or ""
+
+
+async def call_provider(
+    provider: str,
+    key_env: str,
+    task: str,
+    credential: str,
+    retry: RetryPolicy,
+    max_tokens: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Wyślij zadanie do providera klientem z rejestru (provider, credential)
+
+    Circuit breaker obsługuje wywołujący (MultiLLM), tu tylko ponowienia.
+
+    Returns:
+        {"text", "model", "usage"}
+
+    Raises:
+        httpx.HTTPError: Błąd połączenia lub status != 2xx po ponowieniach
+        ValueError: Brak adresu API
+        KeyError, IndexError, TypeError: Nieoczekiwany format odpowiedzi
+    """
+    api = PROVIDER_API[provider][0]
+    base_url, model = provider_endpoint(provider, key_env)
+    path, payload = build_request(api, model, task, max_tokens or DEFAULT_MAX_TOKENS)
+    client = get_client_registry().get(provider, credential, base_url=base_url)
+    response = await retry.run(lambda: client.post(path, json=payload))
+    data = response.json()
+    return {
+        "text": parse_response(api, data),
+        "model": data.get("model", model),
+        "usage": data.get("usage") or data.get("usageMetadata")
+    }
+
+
+async def stream_provider(
+    provider: str,
+    key_env: str,
+    task: str,
+    credential: str,
+    max_tokens: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Wyślij zadanie w trybie streamingu i zwracaj fragmenty tekstu w miarę nadejścia
+
+    Bez ponowień - część odpowiedzi mogła już trafić do klienta.
+    Zamknięcie generatora przerywa połączenie z providerem.
+
+    Raises:
+        httpx.HTTPError: Błąd połączenia lub status != 2xx
+        ValueError: Brak adresu API lub provider bez streamingu
+    """
+    if not supports_stream(provider):
+        raise ValueError(f"Provider '{provider}' nie obsługuje streamingu")
+    api = PROVIDER_API[provider][0]
+    base_url, model = provider_endpoint(provider, key_env)
+    path, payload = build_request(api, model, task, max_tokens or DEFAULT_MAX_TOKENS, stream=True)
+    client = get_client_registry().get(provider, credential, base_url=base_url)
+    async with client.stream("POST", path, json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                event = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            delta = parse_stream_event(api, event)
+            if delta:
+                yield delta
@@ -0,0 +1,194 @@
+"""
+Provider Stats - Statystyki opóźnień i błędów providerów dla routingu adaptacyjnego
+"""
+import os
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any, Iterable
+
+
+class ProviderStats:
+    """
+    EWMA opóźnienia, p95 z okna przesuwnego i EWMA współczynnika błędów
+
+    Współczynnik błędów wygasa też z czasem (połowa co `error_half_life`
+    sekund bez wywołań) - inaczej provider po serii błędów byłby na końcu
+    rankingu na zawsze i nigdy nie dostałby zapytania, które by go poprawiło.
+    """
+
+    def __init__(self, alpha: float = 0.2, window: int = 200, error_half_life: float = 60.0):
+        """
+        Inicjalizacja
+        Args:
+            alpha: Waga nowej próbki w EWMA (0-1)
+            window: Liczba ostatnich próbek do liczenia percentyli
+            error_half_life: Czas połowicznego wygasania błędów bez wywołań (s, 0 = bez wygasania)
+        """
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self.samples: deque = deque(maxlen=window)
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.last_call: Optional[float] = None
+
+    def record(self, latency: float, ok: bool):
+        """Dodaj próbkę z wywołania"""
+        now = time.time()
+        self.error_rate = self.current_error_rate(now)
+        self.calls += 1
+        self.last_call = now
+        if not ok:
+            self.errors += 1
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+
+        # Opóźnienia liczymy tylko z udanych wywołań - błędy mają własną wagę
+        if ok:
+            self.samples.append(latency)
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency += self.alpha * (latency - self.ewma_latency)
+
+    def current_error_rate(self, now: Optional[float] = None) -> float:
+        """EWMA błędów wygaszona o czas od ostatniego wywołania"""
+        if self.last_call is None or self.error_half_life <= 0:
+            return self.error_rate
+        idle = max(0.0, (now or time.time()) - self.last_call)
+        return self.error_rate * 0.5 ** (idle / self.error_half_life)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentyl opóźnienia z okna (q w zakresie 0-100)"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self.percentile(95)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Stan statystyk w formie słownika"""
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.current_error_rate(), 4),
+            "ewma_latency": round(self.ewma_latency, 4) if self.ewma_latency is not None else None,
+            "p50": self.percentile(50),
+            "p95": self.p95,
+            "last_call": self.last_call
+        }
+
+
+class AdaptiveRouter:
+    """
+    Wybór providera na podstawie wyniku (niższy = lepszy)
+
+    score = w_latency * EWMA + w_p95 * p95 + w_errors * error_rate + w_cost * koszt_tieru
+
+    Providery bez próbek dostają opóźnienie `latency_prior`, dzięki czemu
+    są próbowane zanim router zbierze o nich dane.
+    """
+
+    TIER_COST = {
+        "premium": 1.0,
+        "general": 0.6,
+        "specialized": 0.5,
+        "custom": 0.5,
+        "regional": 0.3,
+    }
+
+    DEFAULT_WEIGHTS = {
+        "latency": 1.0,
+        "p95": 0.5,
+        "errors": 5.0,
+        "cost": 1.0,
+    }
+
+    def __init__(
+        self,
+        tiers: Dict[str, str],
+        weights: Optional[Dict[str, float]] = None,
+        latency_prior: float = 1.0,
+        error_half_life: Optional[float] = None
+    ):
+        """
+        Inicjalizacja
+        Args:
+            tiers: Mapa provider -> tier (z MultiLLM.PROVIDERS)
+            weights: Wagi składników wyniku (domyślnie z ROUTER_WEIGHT_*)
+            latency_prior: Zakładane opóźnienie (s) providera bez próbek
+            error_half_life: Wygasanie błędów bez wywołań (s, ROUTER_ERROR_HALF_LIFE)
+        """
+        self.tiers = tiers
+        self.weights = {**self.weights_from_env(), **(weights or {})}
+        self.latency_prior = latency_prior
+        self.error_half_life = (
+            error_half_life if error_half_life is not None
+            else float(os.getenv("ROUTER_ERROR_HALF_LIFE", "60"))
+        )
+        self.stats: Dict[str, ProviderStats] = {}
+
+    @classmethod
+    def weights_from_env(cls) -> Dict[str, float]:
+        """Wagi z ROUTER_WEIGHT_LATENCY / _P95 / _ERRORS / _COST"""
+        return {
+            name: float(os.getenv(f"ROUTER_WEIGHT_{name.upper()}", default))
+            for name, default in cls.DEFAULT_WEIGHTS.items()
+        }
+
+    def get_stats(self, provider: str) -> ProviderStats:
+        """Statystyki providera (tworzone przy pierwszym użyciu)"""
+        if provider not in self.stats:
+            self.stats[provider] = ProviderStats(error_half_life=self.error_half_life)
+        return self.stats[provider]
+
+    def record(self, provider: str, latency: float, ok: bool):
+        """Zapisz wynik wywołania providera"""
+        self.get_stats(provider).record(latency, ok)
+
+    def score(self, provider: str) -> float:
+        """Wynik providera (niższy = lepszy)"""
+        stats = self.stats.get(provider)
+        latency = self.latency_prior
+        p95 = self.latency_prior
+        error_rate = 0.0
+        if stats is not None:
+            if stats.ewma_latency is not None:
+                latency = stats.ewma_latency
+                p95 = stats.p95 or latency
+            error_rate = stats.current_error_rate()
+
+        cost = self.TIER_COST.get(self.tiers.get(provider, ""), 0.5)
+        w = self.weights
+        return (
+            w["latency"] * latency
+            + w["p95"] * p95
+            + w["errors"] * error_rate
+            + w["cost"] * cost
+        )
+
+    def rank(self, candidates: Iterable[str]) -> List[str]:
+        """Posortuj kandydatów od najlepszego"""
+        return sorted(candidates, key=self.score)
+
+    def choose(self, candidates: Iterable[str]) -> Optional[str]:
+        """Wybierz najlepszego kandydata"""
+        ranked = self.rank(candidates)
+        return ranked[0] if ranked else None
+
+    def scoreboard(self, candidates: Iterable[str]) -> List[Dict[str, Any]]:
+        """Ranking kandydatów z wynikami i statystykami"""
+        board = []
+        for provider in self.rank(candidates):
+            stats = self.stats.get(provider)
+            board.append({
+                "provider": provider,
+                "tier": self.tiers.get(provider),
+                "score": round(self.score(provider), 4),
+                **(stats.snapshot() if stats else ProviderStats().snapshot())
+            })
+        return board
@@ -0,0 +1,177 @@
+"""
+Rate Limit - Token buckety per provider i per użytkownik z kolejką oczekujących
+"""
+import os
+import time
+import asyncio
+from typing import Optional, Dict, Any
+
+
+class RateLimitExceeded(Exception):
+    """Zapytanie czekałoby w kolejce dłużej niż pozwala limit"""
+
+    def __init__(self, key: str, wait: float):
+        super().__init__(f"Limit zapytań '{key}' przekroczony (oczekiwanie {wait:.1f}s)")
+        self.key = key
+        self.wait = wait
+
+
+class TokenBucket:
+    """
+    Token bucket z uczciwą kolejką FIFO
+
+    Oczekujący ustawiają się w kolejce na blokadzie (asyncio.Lock jest FIFO),
+    więc tokeny trafiają do zapytań w kolejności przybycia.
+    """
+
+    def __init__(self, key: str, rate: float, capacity: float):
+        """
+        Inicjalizacja
+        Args:
+            key: Nazwa bucketa (np. provider:gpt:rpm, user:jan)
+            rate: Uzupełnianie w tokenach na sekundę
+            capacity: Pojemność (maksymalny burst)
+        """
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        self.waiting = 0
+        self.acquired = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0, max_wait: float = 10.0) -> float:
+        """
+        Pobierz tokeny, czekając w kolejce co najwyżej `max_wait` sekund
+
+        Returns:
+            Czas oczekiwania w sekundach
+
+        Raises:
+            RateLimitExceeded: Oczekiwanie przekroczyłoby max_wait
+        """
+        tokens = min(tokens, self.capacity)
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill()
+                deficit = tokens - self._tokens
+                if deficit > 0:
+                    wait = deficit / self.rate
+                    if (time.monotonic() - started) + wait > max_wait:
+                        self.rejected += 1
+                        raise RateLimitExceeded(self.key, wait)
+                    self.delayed += 1
+                    await asyncio.sleep(wait)
+                    self._refill()
+                self._tokens -= tokens
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+        return waited
+
+    def metrics(self) -> Dict[str, Any]:
+        """Metryki bucketa"""
+        self._refill()
+        return {
+            "rate_per_min": round(self.rate * 60, 2),
+            "capacity": self.capacity,
+            "available": round(self._tokens, 2),
+            "queue_depth": self.waiting,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "avg_wait": round(self.total_wait / self.acquired, 4) if self.acquired else 0.0,
+            "max_wait": round(self.max_wait_seen, 4)
+        }
+
+
+def estimate_tokens(text: str, max_tokens: int = 0) -> int:
+    """Zgrubna liczba tokenów zapytania (~4 znaki/token + limit odpowiedzi)"""
+    return max(1, len(text) // 4) + max_tokens
+
+
+class RateLimiter:
+    """
+    Limity lokalne przed wywołaniem providera
+
+    Konfiguracja z env (0 lub brak = bez limitu):
+        RATE_LIMIT_<PROVIDER>_RPM / RATE_LIMIT_<PROVIDER>_TPM
+        RATE_LIMIT_DEFAULT_RPM - dla providerów bez własnego limitu
+        RATE_LIMIT_USER_RPM    - na użytkownika (sesja extension / JWT sub)
+        RATE_LIMIT_MAX_WAIT    - maksymalne oczekiwanie w kolejce (s)
+    """
+
+    def __init__(self, max_wait: Optional[float] = None):
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("RATE_LIMIT_MAX_WAIT", "10"))
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+
+    def _bucket(self, key: str, env_name: str, fallback_env: Optional[str] = None) -> Optional[TokenBucket]:
+        """Bucket dla klucza (None gdy limit nie jest skonfigurowany)"""
+        if key not in self._buckets:
+            per_minute = float(os.getenv(env_name) or (os.getenv(fallback_env) if fallback_env else None) or 0)
+            self._buckets[key] = (
+                TokenBucket(key, rate=per_minute / 60.0, capacity=per_minute) if per_minute > 0 else None
+            )
+        return self._buckets[key]
+
+    async def acquire_user(self, user: Optional[str]) -> float:
+        """Limit per użytkownik (anonimowe zapytania nie są limitowane)"""
+        if not user:
+            return 0.0
+        bucket = self._bucket(f"user:{user}", "RATE_LIMIT_USER_RPM")
+        return await bucket.acquire(1, self.max_wait) if bucket else 0.0
+
+    async def acquire_provider(self, provider: str, tokens: int = 0) -> float:
+        """Limit RPM i TPM providera"""
+        name = provider.upper()
+        waited = 0.0
+        rpm = self._bucket(f"provider:{provider}:rpm", f"RATE_LIMIT_{name}_RPM", "RATE_LIMIT_DEFAULT_RPM")
+        if rpm:
+            waited += await rpm.acquire(1, self.max_wait)
+        tpm = self._bucket(f"provider:{provider}:tpm", f"RATE_LIMIT_{name}_TPM")
+        if tpm and tokens:
+            waited += await tpm.acquire(tokens, max(0.0, self.max_wait - waited))
+        return waited
+
+    async def acquire(self, provider: str, user: Optional[str] = None, tokens: int = 0) -> float:
+        """Limit użytkownika, potem providera"""
+        waited = await self.acquire_user(user)
+        return waited + await self.acquire_provider(provider, tokens)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Metryki wszystkich aktywnych bucketów"""
+        buckets = {key: b.metrics() for key, b in self._buckets.items() if b is not None}
+        return {
+            "max_wait": self.max_wait,
+            "queue_depth": sum(b["queue_depth"] for b in buckets.values()),
+            "buckets": buckets
+        }
+
+
+# Globalna instancja
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Pobierz lub utwórz globalny limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -0,0 +1,63 @@
+"""
+Request User - Użytkownik zapytania (sesja extension lub JWT) bez efektów ubocznych importu
+"""
+import os
+from typing import Optional, Dict, Any
+
+from fastapi import Depends, Header, HTTPException
+
+try:
+    from jose import JWTError, jwt
+    JOSE_AVAILABLE = True
+except ImportError:
+    JWTError = jwt = None
+    JOSE_AVAILABLE = False
+
+
+# JWT settings - bez własnego SECRET_KEY tokeny JWT nie są ani wydawane, ani akceptowane
+DEFAULT_SECRET_KEY = "your-super-secret-key-change-this"
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+ALGORITHM = "HS256"
+JWT_ENABLED = JOSE_AVAILABLE and SECRET_KEY not in ("", DEFAULT_SECRET_KEY)
+
+if not JWT_ENABLED:
+    print("⚠️ JWT wyłączone: ustaw SECRET_KEY (inny niż domyślny) i zainstaluj python-jose")
+
+# In-memory session tokens extension (in production: Redis)
+EXTENSION_SESSIONS: Dict[str, Dict[str, Any]] = {}
+
+
+def verify_token(token: str) -> Optional[str]:
+    """Verify JWT token and return username (None, gdy JWT wyłączone)"""
+    if not JWT_ENABLED:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            return None
+        return username
+    except JWTError:
+        return None
+
+
+async def get_request_user(
+    x_extension_token: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None)
+) -> Optional[str]:
+    """Użytkownik zapytania: sesja extension lub JWT (sub); None = anonimowy"""
+    if x_extension_token:
+        session = EXTENSION_SESSIONS.get(x_extension_token)
+        if session and not session.get("expired"):
+            return session["username"]
+    if authorization and authorization.lower().startswith("bearer "):
+        return verify_token(authorization[len("bearer "):])
+    return None
+
+
+async def get_admin_user(user: Optional[str] = Depends(get_request_user)) -> str:
+    """Użytkownik z uprawnieniami admina (lista MEMORY_ADMIN_USERS)"""
+    admins = {u.strip() for u in os.getenv("MEMORY_ADMIN_USERS", "").split(",") if u.strip()}
+    if not user or user not in admins:
+        raise HTTPException(status_code=403, detail="Wymagane uprawnienia administratora")
+    return user
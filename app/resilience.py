@@ -0,0 +1,242 @@
+"""
+Resilience - Circuit breakery per provider i polityka ponowień z jitterem
+"""
+import os
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, Awaitable, Callable
+
+import httpx
+
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Circuit breaker providera jest otwarty"""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"Circuit breaker '{provider}' otwarty (ponów za {retry_in:.1f}s)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker: closed -> open -> half-open -> closed
+
+    Po `failure_threshold` kolejnych błędach breaker otwiera się na
+    `recovery_timeout` sekund. Potem przepuszcza `half_open_max_calls`
+    zapytań próbnych - sukces zamyka obwód, błąd ponownie go otwiera.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.rejected = 0
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        """Aktualny stan (open przechodzi w half_open po recovery_timeout)"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def is_available(self) -> bool:
+        """Czy breaker przepuści zapytanie (bez rezerwowania slotu próbnego)"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN:
+            return self._half_open_calls < self.half_open_max_calls
+        return False
+
+    def before_call(self):
+        """
+        Zarezerwuj wywołanie
+
+        Raises:
+            CircuitOpenError: Obwód otwarty lub brak slotów próbnych
+        """
+        if not self.is_available():
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.retry_in())
+        if self._state == self.HALF_OPEN:
+            self._half_open_calls += 1
+
+    def release(self):
+        """Zwolnij slot próbny wywołania zakończonego bez wyniku (np. anulowanego)"""
+        if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_success(self):
+        """Odnotuj udane wywołanie"""
+        self._failures = 0
+        self._state = self.CLOSED
+
+    def record_failure(self):
+        """Odnotuj nieudane wywołanie"""
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.opened_count += 1
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def retry_in(self) -> float:
+        """Sekundy do przejścia w half-open"""
+        if self._state != self.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Stan breakera"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "retry_in": round(self.retry_in(), 2),
+            "opened_count": self.opened_count,
+            "rejected": self.rejected
+        }
+
+
+class RetryPolicy:
+    """Ponowienia z ograniczonym wykładniczym backoffem i pełnym jitterem"""
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None
+    ):
+        """
+        Inicjalizacja
+        Args:
+            max_attempts: Łączna liczba prób (RETRY_MAX_ATTEMPTS)
+            base_delay: Bazowe opóźnienie w sekundach (RETRY_BASE_DELAY)
+            max_delay: Górny limit opóźnienia (RETRY_MAX_DELAY)
+        """
+        self.max_attempts = max_attempts or int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("RETRY_MAX_DELAY", "10"))
+        self.retries = 0
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Opóźnienie przed próbą `attempt + 1` (Retry-After ma pierwszeństwo)"""
+        if retry_after is not None:
+            return min(self.max_delay, max(0.0, retry_after))
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[httpx.Response]],
+        breaker: Optional[CircuitBreaker] = None
+    ) -> httpx.Response:
+        """
+        Wykonaj wywołanie HTTP z ponowieniami
+
+        Ponawiane są błędy połączenia, timeouty oraz statusy 408/425/429/5xx.
+        Każda próba przechodzi przez breaker (jeśli podany).
+
+        Raises:
+            CircuitOpenError: Breaker otwarty
+            httpx.HTTPError: Ostatni błąd po wyczerpaniu prób
+        """
+        attempt = 0
+        while True:
+            if breaker is not None:
+                breaker.before_call()
+            try:
+                response = await call()
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                retryable = e.response.status_code in RETRYABLE_STATUSES
+                self._record(breaker, ok=not retryable)
+                if not retryable or attempt + 1 >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt, parse_retry_after(e.response))
+            except httpx.TransportError:
+                self._record(breaker, ok=False)
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+            except BaseException:
+                # Anulowanie (przegrany hedge, rozłączony klient) nie jest wynikiem -
+                # slot próbny half-open musi wrócić, inaczej breaker zostaje zablokowany
+                if breaker is not None:
+                    breaker.release()
+                raise
+            else:
+                self._record(breaker, ok=True)
+                return response
+
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _record(breaker: Optional[CircuitBreaker], ok: bool):
+        if breaker is None:
+            return
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """Odczytaj nagłówek Retry-After (sekundy lub data HTTP)"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+# Rejestr breakerów per provider
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Pobierz lub utwórz breaker providera (konfiguracja z CIRCUIT_*)"""
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(
+            provider,
+            failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+            recovery_timeout=float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30")),
+            half_open_max_calls=int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "1"))
+        )
+    return _breakers[provider]
+
+
+def breakers_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Stan wszystkich breakerów"""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
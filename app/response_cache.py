@@ -0,0 +1,233 @@
+"""
+Response Cache - LRU + TTL cache odpowiedzi LLM z opcjonalnym tierem dyskowym
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+
+
+def make_cache_key(payload: Dict[str, Any]) -> str:
+    """Klucz cache z modelu, wiadomości, temperatury i max_tokens"""
+    material = {
+        "model": payload.get("model"),
+        "messages": payload.get("messages"),
+        "temperature": payload.get("temperature"),
+        "max_tokens": payload.get("max_tokens"),
+    }
+    raw = json.dumps(material, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache odpowiedzi z limitem rozmiaru (LRU) i czasem życia (TTL)
+
+    Tier dyskowy (sqlite) jest czytany i zapisywany w wątku
+    (asyncio.to_thread), żeby I/O i commity nie blokowały pętli zdarzeń.
+    """
+
+    DISK_FILE = "llm_cache.sqlite3"
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 3600,
+        persist_dir: Optional[str] = None,
+        max_disk_entries: Optional[int] = None
+    ):
+        """
+        Inicjalizacja
+        Args:
+            max_size: Maksymalna liczba wpisów w pamięci
+            ttl: Czas życia wpisu w sekundach
+            persist_dir: Katalog tieru dyskowego (None = tylko pamięć)
+            max_disk_entries: Limit wpisów na dysku (domyślnie 10x max_size)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries or max_size * 10
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._disk_writes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypassed = 0
+
+        if persist_dir:
+            self._open_disk(persist_dir)
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Utwórz cache na podstawie zmiennych środowiskowych"""
+        return cls(
+            max_size=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+            persist_dir=os.getenv("LLM_CACHE_DIR") or None
+        )
+
+    def _open_disk(self, persist_dir: str):
+        """Otwórz (lub utwórz) bazę tieru dyskowego"""
+        try:
+            path = Path(persist_dir)
+            path.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path / self.DISK_FILE), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_expires ON responses(expires_at)")
+            self._db.commit()
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ Cache dyskowy niedostępny: {e}")
+            self._db = None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Pobierz odpowiedź z cache (None przy braku lub wygaśnięciu)"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                # Wpis zachowuje pierwotny termin ważności z dysku
+                expires_at, value = row
+                self.disk_hits += 1
+                self._put_memory(key, value, expires_at)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        """Zapisz odpowiedź w cache"""
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, value, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+
+    def record_bypass(self):
+        """Odnotuj zapytanie z pominięciem cache"""
+        self.bypassed += 1
+
+    def _put_memory(self, key: str, value: Dict[str, Any], expires_at: float):
+        """Wstaw do tieru pamięciowego z ewikcją LRU"""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Odczytaj wpis z tieru dyskowego (wątek): (expires_at, odpowiedź)"""
+        try:
+            with self._db_lock:
+                if self._db is None:
+                    return None
+                row = self._db.execute(
+                    "SELECT expires_at, value FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None or row[0] <= now:
+                return None
+            return row[0], json.loads(row[1])
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            print(f"⚠️ Błąd odczytu cache: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: Dict[str, Any], expires_at: float):
+        """Zapisz wpis w tierze dyskowym (wątek)"""
+        try:
+            raw = json.dumps(value, ensure_ascii=False)
+            with self._db_lock:
+                if self._db is None:
+                    return
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, expires_at, value) VALUES (?, ?, ?)",
+                    (key, expires_at, raw)
+                )
+                self._disk_writes += 1
+                if self._disk_writes % 100 == 0:
+                    self._prune_disk()
+                self._db.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"⚠️ Błąd zapisu cache: {e}")
+
+    def _prune_disk(self):
+        """Usuń wygasłe wpisy i przytnij tier dyskowy do limitu"""
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki cache"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "bypassed": self.bypassed,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "persistent": self._db is not None
+        }
+
+    def clear(self):
+        """Wyczyść oba tiery"""
+        self._entries.clear()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        """Zamknij tier dyskowy"""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Globalna instancja
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Pobierz lub utwórz globalny cache odpowiedzi"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache.from_env()
+    return _response_cache
+
+
+def close_response_cache():
+    """Zamknij globalny cache"""
+    global _response_cache
+    if _response_cache:
+        _response_cache.close()
+        _response_cache = None
@@ -8,13 +8,24 @@ from typing import Optional, Dict, Any
 import secrets
 import json
 from datetime import datetime
-from app.auth import SessionLocal, User
+from app.auth import open_session, verify_password, User
+from app.request_user import EXTENSION_SESSIONS, get_request_user, get_admin_user  # noqa: F401
 import os
 
 router = APIRouter(prefix="/api/extension", tags=["Chrome Extension"])
 
-# In-memory session tokens (in production: Redis)
-EXTENSION_SESSIONS: Dict[str, Dict[str, Any]] = {}
+# Provider (MultiLLM.PROVIDERS) -> kolumna z kluczem API w modelu User
+USER_KEY_COLUMNS = {
+    "perplexity": "perplexity_key",
+    "gpt": "openai_key",
+    "claude": "anthropic_key",
+    "gemini": "google_key",
+    "deepseek": "deepseek_key",
+    "qwen": "qwen_key",
+    "kimi": "moonshot_key",
+    "grok": "grok_key",
+    "agnes": "agnes_key",
+}
 
 
 class ExtensionLogin(BaseModel):
@@ -28,7 +39,7 @@ class ExtensionSession(BaseModel):
     """Sesja extension"""
     username: str
     token: str
-    api_keys: Dict[str, Optional[str]]
+    api_keys: Dict[str, bool]  # provider -> czy użytkownik ma klucz
     available_providers: list
 
 
@@ -52,7 +63,7 @@ async def extension_login(login: ExtensionLogin) -> ExtensionSession:
     Użytkownik loguje się na konto → wytyczka otrzymuje token sesji
     Token przesyłany w każdym requestcie zamiast API keys
     """
-    db = SessionLocal()
+    db = open_session()
     
     try:
         # Szukaj użytkownika
@@ -61,10 +72,9 @@ async def extension_login(login: ExtensionLogin) -> ExtensionSession:
         if not user or not user.is_active:
             raise HTTPException(status_code=401, detail="User not found")
         
-        # Weryfikuj hasło
-        # TODO: od app.auth import verify_password
-        # if not verify_password(login.password, user.hashed_password):
-        #     raise HTTPException(status_code=401, detail="Wrong password")
+        # Weryfikuj hasło (sesja extension wyznacza użytkownika pamięci i admina)
+        if not user.hashed_password or not verify_password(login.password, user.hashed_password):
+            raise HTTPException(status_code=401, detail="Wrong password")
         
         # Utwórz session token
         token = secrets.token_urlsafe(32)
@@ -148,9 +158,9 @@ async def extension_execute(
     from app.llm_router import MultiLLM
     from app.main import multi_llm
     
+    username = session["username"]
+    db = open_session()
     try:
-        username = session["username"]
-        db = SessionLocal()
         user = db.query(User).filter(User.username == username).first()
         
         if not user:
@@ -163,15 +173,35 @@ async def extension_execute(
         if not task:
             raise HTTPException(status_code=400, detail="Missing task")
         
-        # TODO: Uruchom zadanie z API keys użytkownika
-        # Zamiast globalnych kluczy, użyj user.api_keys
+        # Klucze użytkownika -> klienci z rejestru (bez nowego TLS)
+        user_keys = {
+            p: getattr(user, column) for p, column in USER_KEY_COLUMNS.items() if getattr(user, column, None)
+        }
+        user_key = user_keys.get(provider)
+        
+        if provider == "perplexity" and user_key:
+            from app.perplexity_api import get_perplexity_client_for_key
+            
+            client = get_perplexity_client_for_key(user_key)
+            api_response = await client.query(task, user=username)
+            output = api_response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            success = "error" not in api_response
+        elif multi_llm is not None:
+            if provider == "auto":
+                llm_result = await multi_llm.execute_auto(task, user=username, api_keys=user_keys)
+            else:
+                llm_result = await multi_llm.execute(provider, task, api_key=user_key, user=username)
+            output = llm_result.get("result", llm_result.get("error"))
+            success = bool(llm_result.get("success"))
+        else:
+            raise HTTPException(status_code=503, detail="LLM Router nie zainicjalizowany")
         
         result = {
-            "status": "success",
+            "status": "success" if success else "error",
             "provider": provider,
             "task": task,
             "username": username,
-            "result": "Processing...",
+            "result": output,
             "timestamp": datetime.utcnow().isoformat()
         }
         
@@ -0,0 +1,75 @@
+"""
+Single-flight - Łączenie identycznych zapytań w locie w jedno wywołanie upstream
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Call:
+    """Wywołanie w locie współdzielone przez oczekujących"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Koalescencja zapytań o tym samym kluczu
+
+    Pierwsze zapytanie (lider) uruchamia wywołanie jako osobny task,
+    kolejne (followerzy) czekają na ten sam wynik. Anulowanie dowolnego
+    oczekującego nie anuluje wywołania - jest ono przerywane dopiero,
+    gdy nie czeka na nie już nikt.
+    """
+
+    def __init__(self):
+        """Inicjalizacja"""
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Wykonaj wywołanie lub dołącz do trwającego
+
+        Args:
+            key: Klucz zapytania (model + payload)
+            factory: Funkcja tworząca korutynę wywołania upstream
+
+        Returns:
+            Wynik współdzielony przez wszystkich oczekujących
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call):
+        """Usuń zakończone wywołanie z rejestru"""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki koalescencji"""
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / total, 4) if total else 0.0
+        }
@@ -0,0 +1,69 @@
+"""
+Streaming - Server-Sent Events dla odpowiedzi LLM
+"""
+import json
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Sformatuj pojedyncze zdarzenie SSE"""
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
+async def sse_stream(
+    chunks: AsyncIterator[str],
+    request: Request,
+    on_complete: Optional[Callable[[str], Awaitable[Any]]] = None
+) -> AsyncIterator[str]:
+    """
+    Przekaż fragmenty tekstu jako zdarzenia SSE
+
+    Args:
+        chunks: Iterator fragmentów z providera
+        request: Request klienta (do wykrycia rozłączenia)
+        on_complete: Callback z pełnym tekstem po zakończeniu streamu
+
+    Rozłączenie klienta zamyka iterator `chunks`, co anuluje
+    wywołanie upstream. Callback nie jest wtedy wywoływany.
+    """
+    parts = []
+    try:
+        async for chunk in chunks:
+            if await request.is_disconnected():
+                return
+            parts.append(chunk)
+            yield sse_event({"delta": chunk}, event="token")
+    except Exception as e:
+        yield sse_event({"error": str(e)}, event="error")
+        return
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose:
+            await aclose()
+
+    content = "".join(parts)
+    if on_complete:
+        await on_complete(content)
+    yield sse_event({"content": content}, event="done")
+
+
+def sse_response(
+    chunks: AsyncIterator[str],
+    request: Request,
+    on_complete: Optional[Callable[[str], Awaitable[Any]]] = None
+) -> StreamingResponse:
+    """Zwróć StreamingResponse z nagłówkami SSE"""
+    return StreamingResponse(
+        sse_stream(chunks, request, on_complete),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
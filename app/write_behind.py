@@ -0,0 +1,195 @@
+"""
+Write-behind - Kolejka zapisów grupowanych w partie i zapisywanych w tle
+"""
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class WriteBehindQueue:
+    """
+    Zapis w tle (write-behind)
+
+    `put` tylko wstawia element do kolejki; osobny task zbiera elementy
+    w partie (do `max_batch` sztuk lub `max_delay` sekund od pierwszego
+    elementu partii) i przekazuje je do `sink`. Pełna kolejka
+    (`max_queue`) blokuje `put` - backpressure zamiast nieograniczonego
+    wzrostu pamięci. `close` zapisuje wszystko, co zostało w kolejce.
+
+    Nieudany zapis partii jest ponawiany (do `max_retries` razy, z rosnącym
+    opóźnieniem). Partia, której nie udało się zapisać, nie jest
+    porzucana - trafia na początek następnej partii, a `flush` / `close`
+    zwracają liczbę elementów wciąż niezapisanych.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[List[Any]], Awaitable[Any]],
+        max_batch: int = 256,
+        max_delay: float = 0.05,
+        max_queue: int = 10000,
+        max_retries: int = 3,
+        retry_delay: float = 0.1,
+        name: str = "write-behind"
+    ):
+        """
+        Inicjalizacja
+        Args:
+            sink: Korutyna zapisująca partię elementów
+            max_batch: Maksymalny rozmiar partii
+            max_delay: Maksymalny czas zbierania partii (s)
+            max_queue: Pojemność kolejki (0 = bez limitu)
+            max_retries: Ponowienia nieudanego zapisu partii
+            retry_delay: Opóźnienie pierwszego ponowienia (s, podwajane, maks. 5 s)
+            name: Nazwa do logów
+        """
+        self.sink = sink
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.max_retries = max(0, max_retries)
+        self.retry_delay = retry_delay
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Elementy z partii, których zapis się nie udał (dopisywane na początek następnej)
+        self._unwritten: List[Any] = []
+        self._write_lock = asyncio.Lock()
+
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+
+    @classmethod
+    def from_env(cls, sink: Callable[[List[Any]], Awaitable[Any]], name: str = "write-behind") -> "WriteBehindQueue":
+        """Konfiguracja z MEMORY_WRITE_BATCH / _DELAY / _QUEUE / _RETRIES / _RETRY_DELAY"""
+        return cls(
+            sink,
+            max_batch=int(os.getenv("MEMORY_WRITE_BATCH", "256")),
+            max_delay=float(os.getenv("MEMORY_WRITE_DELAY", "0.05")),
+            max_queue=int(os.getenv("MEMORY_WRITE_QUEUE", "10000")),
+            max_retries=int(os.getenv("MEMORY_WRITE_RETRIES", "3")),
+            retry_delay=float(os.getenv("MEMORY_WRITE_RETRY_DELAY", "0.1")),
+            name=name
+        )
+
+    def start(self):
+        """Uruchom task zapisujący (wymaga działającej pętli zdarzeń)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, item: Any):
+        """Wstaw element; czeka tylko, gdy kolejka jest pełna"""
+        self.start()
+        if self._queue.full():
+            self.backpressure_waits += 1
+        await self._queue.put(item)
+        self.enqueued += 1
+
+    async def _run(self):
+        """Pętla zbierająca partie"""
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._write(batch)
+            for _ in batch:
+                queue.task_done()
+
+    async def _write(self, batch: List[Any]):
+        """Zapisz partię (z wcześniej niezapisanymi elementami na początku) z ponowieniami"""
+        async with self._write_lock:
+            batch = self._unwritten + batch
+            self._unwritten = []
+            if not batch:
+                return
+            attempt = 0
+            while True:
+                try:
+                    await self.sink(batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                    return
+                except Exception as e:
+                    if attempt >= self.max_retries:
+                        self.failed += len(batch)
+                        self._unwritten = batch
+                        print(f"❌ Błąd zapisu w tle ({self.name}, {len(batch)} elementów, zostają w kolejce): {e}")
+                        return
+                self.retries += 1
+                await asyncio.sleep(min(5.0, self.retry_delay * (2 ** attempt)))
+                attempt += 1
+
+    async def flush(self) -> int:
+        """
+        Poczekaj, aż wszystkie wstawione elementy zostaną zapisane
+
+        Returns:
+            Liczba elementów, których nie udało się zapisać (0 = wszystko na dysku)
+        """
+        if self._queue is not None and self._task is not None and not self._task.done():
+            await self._queue.join()
+        if self._unwritten:
+            # Ostatnia próba dla elementów z nieudanych partii
+            await self._write([])
+        return len(self._unwritten)
+
+    async def close(self) -> int:
+        """
+        Zapisz zaległe elementy i zatrzymaj task
+
+        Returns:
+            Liczba elementów, których nie udało się zapisać (utraconych)
+        """
+        unwritten = await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if unwritten:
+            print(f"❌ Zamknięto kolejkę zapisu ({self.name}) z {unwritten} niezapisanymi elementami")
+        return unwritten
+
+    def discard(self) -> int:
+        """Porzuć elementy z nieudanych partii (np. po wyczyszczeniu magazynu); zwraca ich liczbę"""
+        dropped, self._unwritten = len(self._unwritten), []
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki kolejki"""
+        return {
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "max_batch": self.max_batch,
+            "max_delay": self.max_delay,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "unwritten": len(self._unwritten),
+            "retries": self.retries,
+            "batches": self.batches,
+            "avg_batch": round(self.written / self.batches, 2) if self.batches else 0.0,
+            "backpressure_waits": self.backpressure_waits
+        }
@@ -0,0 +1,3 @@
+"""
+Offline benchmarki (mock LLM + scenariusze obciążeniowe)
+"""
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+mock_llm.py - Lokalny zamiennik API /chat/completions do benchmarków
+
+Odpowiada w formacie OpenAI/Perplexity (zwykła odpowiedź i SSE) z
+konfigurowalnym rozkładem opóźnień, wstrzykiwaniem błędów i liczbą
+tokenów. Nie wymaga sieci ani kluczy API.
+
+Uruchomienie:
+    python -m benchmarks.mock_llm --port 8900 --latency lognormal:0.3:0.5 --error-rate 0.05
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Optional, Dict, Any, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class LatencyModel:
+    """
+    Rozkład opóźnień w sekundach
+
+    Specyfikacja:
+        fixed:0.2              - stałe 200 ms
+        uniform:0.05:0.5       - jednostajny
+        normal:0.3:0.1         - normalny (średnia, odchylenie), obcięty do 0
+        lognormal:0.3:0.6      - log-normalny (mediana, sigma) - długi ogon
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, *params = spec.split(":")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in {"fixed", "uniform", "normal", "lognormal"}:
+            raise ValueError(f"Nieznany rozkład opóźnień: {spec}")
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            return p[0] if p else 0.0
+        if self.kind == "uniform":
+            return random.uniform(p[0], p[1])
+        if self.kind == "normal":
+            return max(0.0, random.gauss(p[0], p[1]))
+        return random.lognormvariate(0, p[1]) * p[0]
+
+
+class MockLLMConfig:
+    """Konfiguracja zachowania serwera"""
+
+    def __init__(
+        self,
+        latency: str = "fixed:0.05",
+        error_rate: float = 0.0,
+        error_statuses: Optional[List[int]] = None,
+        retry_after: Optional[float] = 1.0,
+        completion_tokens: int = 64,
+        token_delay: float = 0.005
+    ):
+        """
+        Args:
+            latency: Specyfikacja LatencyModel (czas do pierwszego bajtu)
+            error_rate: Odsetek zapytań kończonych błędem (0-1)
+            error_statuses: Losowane statusy błędów
+            retry_after: Nagłówek Retry-After dla 429 (None = brak)
+            completion_tokens: Liczba tokenów odpowiedzi
+            token_delay: Odstęp między tokenami w trybie streamingu (s)
+        """
+        self.latency = LatencyModel(latency)
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [429, 500, 503]
+        self.retry_after = retry_after
+        self.completion_tokens = completion_tokens
+        self.token_delay = token_delay
+
+
+def create_app(config: Optional[MockLLMConfig] = None) -> FastAPI:
+    """Utwórz aplikację mock serwera"""
+    config = config or MockLLMConfig()
+    app = FastAPI(title="Mock LLM API")
+    app.state.config = config
+    app.state.requests = 0
+    app.state.errors = 0
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body: Dict[str, Any] = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(config.latency.sample())
+
+        if random.random() < config.error_rate:
+            app.state.errors += 1
+            status = random.choice(config.error_statuses)
+            headers = {}
+            if status == 429 and config.retry_after is not None:
+                headers["Retry-After"] = str(config.retry_after)
+            return JSONResponse({"error": {"message": "mock error", "code": status}}, status_code=status, headers=headers)
+
+        messages = body.get("messages", [])
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+        completion_tokens = min(config.completion_tokens, body.get("max_tokens") or config.completion_tokens)
+        tokens = [f"tok{i} " for i in range(completion_tokens)]
+        model = body.get("model", "mock")
+
+        if body.get("stream"):
+            async def events():
+                for token in tokens:
+                    chunk = {"choices": [{"index": 0, "delta": {"content": token}}], "model": model}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    if config.token_delay:
+                        await asyncio.sleep(config.token_delay)
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {
+            "id": f"mock-{app.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests, "errors": app.state.errors, "latency": config.latency.spec}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock LLM /chat/completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="fixed:0.05", help="fixed:S | uniform:A:B | normal:M:SD | lognormal:MED:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-statuses", default="429,500,503")
+    parser.add_argument("--completion-tokens", type=int, default=64)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    import uvicorn
+    config = MockLLMConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",") if s],
+        completion_tokens=args.completion_tokens,
+        token_delay=args.token_delay
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+run.py - Offline benchmark MultiLLM, PerplexityAPI i endpointów FastAPI
+
+Uruchamia lokalny mock /chat/completions (benchmarks/mock_llm.py) jako
+osobny proces i mierzy przepustowość, p50/p95/p99 oraz czas CPU na
+zapytanie (tylko proces benchmarku - mock ma własny proces).
+
+Uruchomienie:
+    python -m benchmarks.run --requests 500 --concurrency 32
+    python -m benchmarks.run --scenarios perplexity_query,api_execute --latency lognormal:0.2:0.6 --error-rate 0.05
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from typing import Optional, List, Dict, Any, Awaitable, Callable
+
+
+# Prefiksy zmiennych providerów MultiLLM (<PREFIX>_API_KEY / <PREFIX>_BASE_URL)
+MOCKED_PROVIDERS = ("PERPLEXITY", "OPENAI", "DEEPSEEK")
+UNMOCKED_PROVIDERS = ("ANTHROPIC", "GOOGLE", "QWEN", "MOONSHOT", "GROK", "AGNES")
+
+
+class BenchResult:
+    """Wynik jednego scenariusza"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    @staticmethod
+    def _percentile(ordered: List[float], q: float) -> Optional[float]:
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def report(self) -> Dict[str, Any]:
+        """Podsumowanie w milisekundach"""
+        ordered = sorted(self.latencies)
+        total = len(self.latencies) + self.errors
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "scenario": self.name,
+            "requests": total,
+            "errors": self.errors,
+            "throughput_rps": round(total / self.wall, 1) if self.wall else 0.0,
+            "p50_ms": ms(self._percentile(ordered, 50)),
+            "p95_ms": ms(self._percentile(ordered, 95)),
+            "p99_ms": ms(self._percentile(ordered, 99)),
+            "cpu_ms_per_req": round(self.cpu / total * 1000, 3) if total else 0.0
+        }
+
+
+async def drive(
+    name: str,
+    call: Callable[[int], Awaitable[bool]],
+    requests: int,
+    concurrency: int
+) -> BenchResult:
+    """Wykonaj `requests` wywołań z ograniczoną współbieżnością"""
+    result = BenchResult(name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            if ok:
+                result.latencies.append(time.perf_counter() - started)
+            else:
+                result.errors += 1
+
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    result.wall = time.perf_counter() - wall_started
+    result.cpu = time.process_time() - cpu_started
+    return result
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock_server(args) -> subprocess.Popen:
+    """Uruchom mock serwer w osobnym procesie i poczekaj na gotowość"""
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.mock_llm",
+        "--port", str(args.mock_port),
+        "--latency", args.latency,
+        "--error-rate", str(args.error_rate),
+        "--completion-tokens", str(args.completion_tokens),
+        "--token-delay", str(args.token_delay),
+    ])
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", args.mock_port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Mock LLM nie wystartował")
+
+
+async def run_scenarios(args) -> List[Dict[str, Any]]:
+    """Wykonaj wybrane scenariusze"""
+    # Import po ustawieniu zmiennych środowiskowych w main()
+    import httpx
+    from app.llm_router import MultiLLM
+    from app.perplexity_api import PerplexityAPI
+    from app.response_cache import ResponseCache
+
+    def prompt(i: int) -> str:
+        # Unikalne prompty omijają cache, chyba że --cached
+        return f"benchmark prompt {i % 16 if args.cached else i}"
+
+    cache = ResponseCache(max_size=4096, ttl=600)
+    perplexity = PerplexityAPI(api_key="bench-key", cache=cache)
+    multi_llm = MultiLLM()
+
+    async def perplexity_query(i: int) -> bool:
+        response = await perplexity.query(prompt(i))
+        return "error" not in response
+
+    async def perplexity_stream(i: int) -> bool:
+        chunks = 0
+        async for _ in perplexity.query_stream(prompt(i)):
+            chunks += 1
+        return chunks > 0
+
+    async def multillm_execute(i: int) -> bool:
+        result = await multi_llm.execute("gpt", prompt(i))
+        return bool(result.get("success"))
+
+    async def multillm_execute_auto(i: int) -> bool:
+        result = await multi_llm.execute_auto(prompt(i))
+        return bool(result.get("success"))
+
+    scenarios: Dict[str, Callable[[int], Awaitable[bool]]] = {
+        "perplexity_query": perplexity_query,
+        "perplexity_stream": perplexity_stream,
+        "multillm_execute": multillm_execute,
+        "multillm_execute_auto": multillm_execute_auto,
+    }
+
+    api_scenarios = {"api_execute", "api_execute_auto", "api_summarize"}
+    selected = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    reports = []
+
+    for name in selected:
+        if name in scenarios:
+            reports.append((await drive(name, scenarios[name], args.requests, args.concurrency)).report())
+
+    if api_scenarios & set(selected):
+        from app import main as app_main
+
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with app_main.app.router.lifespan_context(app_main.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+                async def api_execute(i: int) -> bool:
+                    r = await client.post("/api/agent/perplexity/execute", json={"task": prompt(i)})
+                    return r.status_code == 200
+
+                async def api_execute_auto(i: int) -> bool:
+                    r = await client.post("/api/agent/auto/execute", json={"task": prompt(i)})
+                    return r.status_code == 200
+
+                async def api_summarize(i: int) -> bool:
+                    r = await client.post("/api/perplexity/summarize", json={"text": prompt(i)})
+                    return r.status_code == 200
+
+                api_calls = {
+                    "api_execute": api_execute,
+                    "api_execute_auto": api_execute_auto,
+                    "api_summarize": api_summarize,
+                }
+                for name in selected:
+                    if name in api_calls:
+                        reports.append((await drive(name, api_calls[name], args.requests, args.concurrency)).report())
+
+    unknown = set(selected) - set(scenarios) - api_scenarios
+    for name in sorted(unknown):
+        print(f"⚠️ Nieznany scenariusz: {name}")
+
+    return reports
+
+
+def print_table(reports: List[Dict[str, Any]]):
+    """Wypisz wyniki jako tabelę"""
+    columns = ["scenario", "requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "cpu_ms_per_req"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in reports)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for report in reports:
+        print("  ".join(str(report[c]).ljust(widths[c]) for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark AI Browser Agent")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--scenarios",
+        default="perplexity_query,perplexity_stream,multillm_execute,multillm_execute_auto,api_execute,api_summarize"
+    )
+    parser.add_argument("--latency", default="lognormal:0.05:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--completion-tokens", type=int, default=64)
+    parser.add_argument("--token-delay", type=float, default=0.001)
+    parser.add_argument("--mock-port", type=int, default=0)
+    parser.add_argument("--mock-url", default=None, help="Użyj już działającego mock serwera")
+    parser.add_argument("--cached", action="store_true", help="Powtarzalne prompty (mierzy cache)")
+    parser.add_argument("--json", dest="json_path", default=None, help="Zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    args.mock_port = args.mock_port or _free_port()
+    mock_url = args.mock_url or f"http://127.0.0.1:{args.mock_port}"
+
+    # Środowisko offline: wszystkie wywołania idą do mocka, bez trwałych plików.
+    # MultiLLM widzi tylko providery z API zgodnym z /chat/completions mocka.
+    for prefix in MOCKED_PROVIDERS:
+        os.environ[f"{prefix}_BASE_URL"] = mock_url
+        os.environ.setdefault(f"{prefix}_API_KEY", "bench-key")
+    for prefix in UNMOCKED_PROVIDERS:
+        os.environ.pop(f"{prefix}_API_KEY", None)
+    os.environ.pop("LLM_CACHE_DIR", None)
+    os.environ["MEMORY_DIR"] = ""
+
+    process = None if args.mock_url else start_mock_server(args)
+    try:
+        reports = asyncio.run(run_scenarios(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print_table(reports)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": vars(args), "results": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Testy SemanticAnswerCache: tylko odpowiedzi providerów routera
+"""
+import asyncio
+
+from app.answer_cache import SemanticAnswerCache
+from app.llm_router import MultiLLM
+from app.memory_shards import ShardedMemory
+
+
+TASK = "Przetłumacz na angielski: dzień dobry, jak się masz"
+
+
+def _cache(memory) -> SemanticAnswerCache:
+    return SemanticAnswerCache(memory, threshold=0.9, max_age=0, same_provider=False, providers=MultiLLM.PROVIDERS)
+
+
+def test_translation_record_is_not_an_answer(tmp_path):
+    async def scenario():
+        memory = ShardedMemory(str(tmp_path))
+        await memory.store_interaction(
+            "perplexity-translate", TASK, {"content": "good morning, how are you", "model": "sonar", "streamed": True}
+        )
+        assert await _cache(memory).lookup(TASK) is None
+        await memory.close()
+
+    asyncio.run(scenario())
+
+
+def test_streamed_agent_record_is_returned_as_result(tmp_path):
+    async def scenario():
+        memory = ShardedMemory(str(tmp_path))
+        await memory.store_interaction("gpt", TASK, {"content": "Good morning", "model": "gpt", "streamed": True})
+        cached = await _cache(memory).lookup(TASK)
+        assert cached["result"] == "Good morning"
+        assert cached["provider"] == "gpt" and cached["cached"]
+        await memory.close()
+
+    asyncio.run(scenario())
+
+
+def test_same_provider_applies_to_auto_lookup(tmp_path):
+    async def scenario():
+        memory = ShardedMemory(str(tmp_path))
+        await memory.store_interaction("gpt", TASK, {"result": "Good morning", "success": True})
+        cache = SemanticAnswerCache(memory, threshold=0.9, max_age=0, providers=MultiLLM.PROVIDERS)
+        assert await cache.lookup(TASK, "claude") is None
+        assert (await cache.lookup(TASK, "gpt"))["result"] == "Good morning"
+        await memory.close()
+
+    asyncio.run(scenario())
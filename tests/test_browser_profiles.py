@@ -0,0 +1,28 @@
+"""
+Testy NavigationProfile: walidacja nadpisań z żądania
+"""
+import pytest
+
+from app.browser_profiles import PROFILES
+
+
+@pytest.mark.parametrize("overrides", [
+    {"block_types": [{}]},
+    {"block_types": [["image"]]},
+    {"block_patterns": [1]},
+    {"block_patterns": [None]},
+    {"block_types": "image"},
+    {"block_types": ["gif"]},
+    {"wait_until": "never"},
+])
+def test_invalid_overrides_raise_value_error(overrides):
+    with pytest.raises(ValueError):
+        PROFILES["lean"].with_overrides(overrides)
+
+
+def test_overrides_extend_profile():
+    profile = PROFILES["lean"].with_overrides({"block_types": ["script"], "block_patterns": ["ads.example"]})
+    assert profile.name == "lean+custom"
+    assert profile.blocked("script", "https://example.com/app.js")
+    assert profile.blocked("xhr", "https://ads.example/pixel")
+    assert not profile.blocked("document", "https://example.com/")
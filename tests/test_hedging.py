@@ -0,0 +1,33 @@
+"""
+Testy HedgePolicy: budżet zapytań zapasowych
+"""
+import asyncio
+
+from app.hedging import HedgePolicy, hedged_call
+
+
+def _hedge(policy: HedgePolicy) -> bool:
+    """Jedno zapytanie przez hedged_call z wolnym głównym providerem; True = wygrał zapasowy"""
+    async def primary():
+        await asyncio.sleep(0.05)
+        return {"success": True, "from": "primary"}
+
+    async def backup():
+        return {"success": True, "from": "backup"}
+
+    return asyncio.run(hedged_call(primary, backup, 0.001, policy))["from"] == "backup"
+
+
+def test_first_request_can_be_hedged():
+    policy = HedgePolicy(max_rate=0.05, burst=1)
+    assert _hedge(policy)
+    assert policy.stats()["hedged"] == 1
+
+
+def test_budget_limits_hedges_after_burst():
+    policy = HedgePolicy(max_rate=0.05, burst=1)
+    policy.requests, policy.hedged = 10, 1
+    assert not policy.allow_hedge()
+    policy.requests = 40
+    assert policy.allow_hedge()
+    assert policy.stats()["budget_denied"] == 1
@@ -0,0 +1,54 @@
+"""
+Testy MultiLLM: które błędy providera otwierają circuit breaker
+"""
+import asyncio
+
+import httpx
+import pytest
+
+import app.provider_api as provider_api
+import app.resilience as resilience
+from app.llm_router import MultiLLM
+from app.resilience import CircuitBreaker, RetryPolicy, get_breaker
+
+
+class _Registry:
+    """Rejestr klientów odpowiadający stałym statusem"""
+
+    def __init__(self, status: int):
+        self.status = status
+
+    def get(self, provider, credential, base_url=None):
+        transport = httpx.MockTransport(lambda request: httpx.Response(self.status, json={"error": "x"}))
+        return httpx.AsyncClient(base_url=base_url, transport=transport)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    router = MultiLLM()
+    router.retry = RetryPolicy(max_attempts=1, base_delay=0)
+    return router
+
+
+def _fail(llm: MultiLLM, monkeypatch, status: int, calls: int = 6):
+    monkeypatch.setattr(provider_api, "get_client_registry", lambda: _Registry(status))
+
+    async def scenario():
+        return [await llm.execute("gpt", f"zadanie {i}", use_cache=False) for i in range(calls)]
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("status", [400, 413, 422])
+def test_client_errors_do_not_open_circuit(llm, monkeypatch, status):
+    results = _fail(llm, monkeypatch, status)
+    assert not any(r["success"] for r in results)
+    assert get_breaker("gpt").state == CircuitBreaker.CLOSED
+    assert "gpt" not in llm.router.stats or llm.router.stats["gpt"].snapshot()["errors"] == 0
+
+
+def test_retryable_statuses_open_circuit(llm, monkeypatch):
+    _fail(llm, monkeypatch, 503)
+    assert get_breaker("gpt").state == CircuitBreaker.OPEN
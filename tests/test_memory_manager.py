@@ -0,0 +1,143 @@
+"""
+Testy MemoryManager: zakres dat, kompakcja i odbudowa z logu
+"""
+import asyncio
+import time
+
+from app.memory_manager import MemoryManager
+from app.memory_records import is_record_frame
+from app.memory_retention import RetentionPolicy
+
+
+def _manager() -> MemoryManager:
+    memory = MemoryManager()
+    for timestamp in ("2025-12-31T23:00:00", "2026-01-01T12:30:00", "2026-01-02T00:00:01"):
+        memory._append(memory._new_interaction("gpt", "raport kwartalny", {"output": "ok"}, timestamp))
+    return memory
+
+
+def test_date_only_until_includes_whole_day():
+    memory = _manager()
+    found = asyncio.run(memory.search("raport", until="2026-01-01"))
+    assert found["total"] == 2
+
+
+def test_datetime_until_is_exact():
+    memory = _manager()
+    found = asyncio.run(memory.search("raport", until="2026-01-01T12:00:00"))
+    assert found["total"] == 1
+
+
+def test_export_date_range_is_inclusive():
+    memory = _manager()
+
+    async def collect():
+        return [item async for chunk in memory.export(since="2026-01-01", until="2026-01-01") for item in chunk]
+
+    exported = asyncio.run(collect())
+    assert [item["timestamp"] for item in exported] == ["2026-01-01T12:30:00"]
+
+
+def test_concurrent_compactions_are_serialized(tmp_path, monkeypatch):
+    monkeypatch.setenv("MEMORY_SEGMENT_BYTES", "512")
+
+    async def scenario():
+        memory = MemoryManager(persist_dir=str(tmp_path))
+        for i in range(20):
+            await memory.store_interaction("gpt", f"zadanie {i}", {"output": "x" * 200})
+            await memory.flush()
+        first, second = await asyncio.gather(memory.compact_store(), memory.compact_store())
+        assert first["segments"] > 1
+        assert second["segments"] <= 1
+        assert not memory.compacting
+        await memory.close()
+        assert (await memory.compact_store())["segments"] == 0
+
+        reopened = MemoryManager(persist_dir=str(tmp_path))
+        assert len(reopened.records) == 20
+        await reopened.close()
+
+    asyncio.run(scenario())
+
+
+def test_reload_from_binary_frames_and_legacy_json(tmp_path):
+    big = {"content": "odpowiedź " * 200, "model": "gpt"}
+
+    async def scenario():
+        memory = MemoryManager(persist_dir=str(tmp_path))
+        await memory.store_interaction("gpt", "raport kwartalny", big)
+        await memory.store_interaction("claude", "krótkie pytanie", {"content": "krótka odpowiedź"})
+        await memory.flush()
+        # Rekord w starym formacie (JSON) w tym samym logu
+        memory.store.append({
+            "id": 2, "timestamp": "2026-01-01T12:30:00", "provider": "gpt",
+            "task": "stary raport", "result": {"content": "z logu JSON"}
+        })
+        assert all(is_record_frame(p) for p in list(memory.store.read_payloads())[:2])
+        await memory.close()
+
+        reopened = MemoryManager(persist_dir=str(tmp_path))
+        assert [r.id for r in reopened.records] == [0, 1, 2]
+        assert reopened.records.get(0).result == big
+        found = await reopened.search("krótka")
+        assert {r["id"] for r in found["results"]} == {1}
+        found = await reopened.search("raport")
+        assert {r["id"] for r in found["results"]} == {0, 2}
+        exported = [item async for chunk in reopened.export() for item in chunk]
+        assert [item["task"] for item in exported] == ["raport kwartalny", "krótkie pytanie", "stary raport"]
+        await reopened.close()
+
+    asyncio.run(scenario())
+
+
+def test_rollups_survive_restart_before_compaction(tmp_path):
+    policy = RetentionPolicy(rollup_after=60)
+
+    async def scenario():
+        memory = MemoryManager(persist_dir=str(tmp_path))
+        for i in range(4):
+            await memory.store_interaction("gpt", "dzienny raport", {"result": f"wersja {i}", "success": True})
+        await memory.store_interaction("gpt", "inne zadanie", {"result": "x", "success": True})
+        await memory.flush()
+        assert memory.apply_retention(policy, now=time.time() + 120)["rolled_up"] == 3
+        await memory.close()
+
+        reopened = MemoryManager(persist_dir=str(tmp_path))
+        assert [r.id for r in reopened.records] == [3, 4]
+        rollup = reopened.records.get(3).result
+        assert rollup["rollup"]["count"] == 4 and rollup["result"] == "wersja 3"
+        assert (await reopened.search("wersja"))["total"] == 1
+
+        # Kompakcja usuwa oryginały z logu; odbudowa daje ten sam stan
+        assert (await reopened.compact_store())["dropped"] >= 3
+        await reopened.close()
+        compacted = MemoryManager(persist_dir=str(tmp_path))
+        assert [r.id for r in compacted.records] == [3, 4]
+        assert compacted.records.get(3).result == rollup
+        assert not compacted.stats()["retention"]["pending_drops"]
+        await compacted.close()
+
+    asyncio.run(scenario())
+
+
+def test_pending_vectors_counter_tracks_buffer():
+    def walk(memory):
+        return sum(1 for _ in memory.records.after(memory._embedded["content"]))
+
+    async def scenario():
+        memory = MemoryManager(max_records=50)
+        for i in range(40):
+            await memory.store_interaction("gpt", f"zadanie {i}", {"content": f"odpowiedź {i}"})
+        assert memory.stats()["vectors"]["pending"] == walk(memory) == 40
+        await memory.sync_vectors()
+        assert memory.stats()["vectors"]["pending"] == 0
+        for i in range(30):
+            await memory.store_interaction("gpt", f"zadanie {i}", {"content": f"odpowiedź {i}"})
+        # Budżet usuwa najstarsze - część już z embeddingiem, część nie
+        assert memory.stats()["vectors"]["pending"] == walk(memory) == 30
+        memory.apply_retention(RetentionPolicy(max_records=10))
+        assert memory.stats()["vectors"]["pending"] == walk(memory) == 10
+        await memory.clear()
+        assert memory.stats()["vectors"]["pending"] == 0
+
+    asyncio.run(scenario())
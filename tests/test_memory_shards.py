@@ -0,0 +1,97 @@
+"""
+Testy ShardedMemory: zamykanie nieużywanych shardów
+"""
+import asyncio
+import time
+
+from app.memory_manager import MemoryManager
+from app.memory_shards import ShardedMemory
+
+
+def _result(text: str):
+    return {"output": text}
+
+
+def test_idle_shards_are_evicted_and_reopened_from_disk(tmp_path):
+    async def scenario():
+        memory = ShardedMemory(str(tmp_path), idle_ttl=60)
+        await memory.store_interaction("gpt", "raport ala", _result("a"), user="ala")
+        await memory.store_interaction("gpt", "raport ola", _result("o"), user="ola")
+        assert set(memory.shards) == {"anonymous", "ala", "ola"}
+
+        assert await memory.evict_idle(now=time.monotonic() + 120) == 2
+        assert set(memory.shards) == {"anonymous"}
+
+        found = await memory.search("raport", user="ala")
+        assert [r["task"] for r in found["results"]] == ["raport ala"]
+        await memory.close()
+
+    asyncio.run(scenario())
+
+
+def test_max_open_evicts_least_recently_used(tmp_path):
+    async def scenario():
+        memory = ShardedMemory(str(tmp_path), idle_ttl=0, max_open=2)
+        for user in ("ala", "ola", "ela"):
+            await memory.store_interaction("gpt", f"zadanie {user}", _result(user), user=user)
+        await memory.evict_idle()
+        assert set(memory.shards) == {"anonymous", "ela"}
+        await memory.close()
+
+    asyncio.run(scenario())
+
+
+def test_shard_in_use_is_not_evicted(tmp_path):
+    async def scenario():
+        memory = ShardedMemory(str(tmp_path), idle_ttl=60)
+        await memory.store_interaction("gpt", "eksport", _result("x"), user="ala")
+        export = memory.export(user="ala")
+        first = await export.__anext__()
+        assert await memory.evict_idle(now=time.monotonic() + 120) == 0
+        assert "ala" in memory.shards
+        await export.aclose()
+        assert [item["task"] for item in first] == ["eksport"]
+        await memory.close()
+
+    asyncio.run(scenario())
+
+
+def test_admin_search_does_not_keep_closed_shards(tmp_path):
+    async def scenario():
+        memory = ShardedMemory(str(tmp_path), idle_ttl=60)
+        await memory.store_interaction("gpt", "raport ala", _result("a"), user="ala")
+        await memory.store_interaction("gpt", "raport ola", _result("o"), user="ola")
+        await memory.close()
+
+        memory = ShardedMemory(str(tmp_path), idle_ttl=60)
+        found = await memory.admin_search("raport")
+        assert sorted(item["user"] for item in found["results"]) == ["ala", "ola"]
+        assert set(memory.shards) == {"anonymous"}
+        await memory.close()
+
+    asyncio.run(scenario())
+
+
+def test_admin_search_merges_on_raw_scores(tmp_path, monkeypatch):
+    scores = {"ala": [(1, 0.50004), (2, 0.50001)], "ola": [(7, 0.50003)]}
+
+    async def search(self, query, limit=10, offset=0, round_scores=True, **kwargs):
+        ranked = scores.get(getattr(self, "owner", None), [])
+        return {
+            "results": [{"id": i, "score": round(s, 4) if round_scores else s} for i, s in ranked],
+            "total": len(ranked)
+        }
+
+    async def scenario():
+        memory = ShardedMemory(str(tmp_path))
+        for user in scores:
+            await memory.store_interaction("gpt", f"raport {user}", _result(user), user=user)
+            memory.shards[user].owner = user
+        monkeypatch.setattr(MemoryManager, "search", search)
+        found = await memory.admin_search("raport", limit=3)
+        await memory.close()
+        return found
+
+    found = asyncio.run(scenario())
+    assert [(r["user"], r["id"]) for r in found["results"]] == [("ala", 1), ("ola", 7), ("ala", 2)]
+    assert {r["score"] for r in found["results"]} == {0.5}
@@ -0,0 +1,21 @@
+"""
+Testy SegmentLog: odczyt równoległy z kompakcją
+"""
+from app.memory_store import SegmentLog
+
+
+def test_read_all_survives_concurrent_compaction(tmp_path):
+    log = SegmentLog(str(tmp_path), segment_bytes=256, fsync="never")
+    log.append_batch([{"id": i, "task": f"zadanie {i}"} for i in range(50)])
+    for i in range(50, 100):
+        log.append({"id": i, "task": f"zadanie {i}"})
+
+    reader = log.read_all()
+    first = [next(reader)["id"] for _ in range(10)]
+    result = log.compact(keep=lambda record: record["id"] % 2 == 0, seal=True)
+    assert result["dropped"] > 0
+
+    ids = first + [record["id"] for record in reader]
+    assert ids == list(range(100))
+    assert [record["id"] for record in log.read_all()] == list(range(0, 100, 2))
+    log.close()
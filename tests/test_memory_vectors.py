@@ -0,0 +1,60 @@
+"""
+Testy VectorIndex: trening IVF w puli wątków
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.memory_vectors import VectorIndex
+
+
+def _vectors(count: int, dim: int = 32, seed: int = 1) -> np.ndarray:
+    data = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def test_add_does_not_train_synchronously():
+    index = VectorIndex(32, ivf_threshold=100, nlist=8)
+    index.add(list(range(200)), _vectors(200))
+    assert index.needs_training()
+    assert index.stats()["mode"] == "brute_force"
+
+
+def test_train_in_matches_train_and_reassigns_rows_added_meanwhile():
+    data = _vectors(400)
+    expected = VectorIndex(32, ivf_threshold=100, nlist=8)
+    expected.add(list(range(400)), data)
+    expected.train()
+
+    index = VectorIndex(32, ivf_threshold=100, nlist=8)
+    index.add(list(range(300)), data[:300])
+
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            training = asyncio.create_task(index.train_in(pool))
+            await asyncio.sleep(0)
+            assert not index.needs_training()
+            index.add(list(range(300, 400)), data[300:])
+            await training
+
+    asyncio.run(scenario())
+    assert index.stats()["mode"] == "ivf"
+    assert not index.needs_training()
+    query = data[350]
+    assert index.search(query, k=1)[0][0][0] == expected.search(query, k=1)[0][0][0] == 350
+
+
+def test_clear_discards_running_training():
+    index = VectorIndex(32, ivf_threshold=100, nlist=8)
+    index.add(list(range(200)), _vectors(200))
+
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            training = asyncio.create_task(index.train_in(pool))
+            await asyncio.sleep(0)
+            index.clear()
+            await training
+
+    asyncio.run(scenario())
+    assert index.stats()["nlist"] == 0
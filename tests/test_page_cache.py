@@ -0,0 +1,34 @@
+"""
+Testy PageCache: warianty renderu i unieważnianie
+"""
+import asyncio
+
+from app.browser_profiles import PROFILES
+from app.page_cache import PageCache
+
+
+def test_entries_are_keyed_by_profile_variant():
+    cache = PageCache()
+    lean = PROFILES["lean"]
+    no_scripts = lean.with_overrides({"block_types": ["script"]})
+    cache.put("https://example.com/a?utm_source=x", {"url": "https://example.com/a", "text": "pełny"}, variant=lean.fingerprint)
+
+    assert asyncio.run(cache.get("https://example.com/a", variant=no_scripts.fingerprint)) is None
+    hit = asyncio.run(cache.get("https://example.com/a", variant=lean.fingerprint))
+    assert hit["text"] == "pełny"
+
+
+def test_same_configuration_shares_variant():
+    overrides = {"block_patterns": ["ads.example"]}
+    assert PROFILES["lean"].with_overrides(overrides).fingerprint == PROFILES["lean"].with_overrides(overrides).fingerprint
+    assert PROFILES["lean"].fingerprint != PROFILES["text"].fingerprint
+    assert PROFILES["lean"].fingerprint != PROFILES["lean"].with_overrides(overrides).fingerprint
+
+
+def test_invalidate_drops_every_variant():
+    cache = PageCache()
+    for profile in PROFILES.values():
+        cache.put("https://example.com/", {"text": profile.name}, variant=profile.fingerprint)
+    cache.put("https://example.com/other", {"text": "inna"})
+    assert cache.invalidate("https://EXAMPLE.com/#top") == len(PROFILES)
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,69 @@
+"""
+Testy streamingu providerów: fragmenty SSE przekazywane w miarę nadejścia
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import app.provider_api as provider_api
+from app.llm_router import MultiLLM
+
+
+def _sse(*events) -> bytes:
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events).encode("utf-8") + b"data: [DONE]\n\n"
+
+
+class _Registry:
+    """Rejestr klientów z transportem zamiast sieci"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def get(self, provider, credential, base_url=None):
+        def record(request):
+            self.requests.append(request)
+            return self.handler(request)
+        return httpx.AsyncClient(base_url=base_url, transport=httpx.MockTransport(record))
+
+
+def _collect(chunks):
+    async def collect():
+        return [chunk async for chunk in chunks]
+    return asyncio.run(collect())
+
+
+def test_openai_deltas_are_streamed(monkeypatch):
+    body = _sse(
+        {"choices": [{"delta": {"role": "assistant"}}]},
+        {"choices": [{"delta": {"content": "Dzień"}}]},
+        {"choices": [{"delta": {"content": " dobry"}}]}
+    )
+    registry = _Registry(lambda request: httpx.Response(200, content=body))
+    monkeypatch.setattr(provider_api, "get_client_registry", lambda: registry)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    llm = MultiLLM()
+    llm.check_stream("gpt")
+    assert _collect(llm.execute_stream("gpt", "przywitaj się")) == ["Dzień", " dobry"]
+    assert json.loads(registry.requests[0].content)["stream"] is True
+
+
+def test_anthropic_content_block_deltas(monkeypatch):
+    body = _sse(
+        {"type": "message_start", "message": {}},
+        {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hej"}},
+        {"type": "message_stop"}
+    )
+    monkeypatch.setattr(provider_api, "get_client_registry", lambda: _Registry(lambda r: httpx.Response(200, content=body)))
+    chunks = provider_api.stream_provider("claude", "ANTHROPIC_API_KEY", "hej", "key")
+    assert _collect(chunks) == ["Hej"]
+
+
+def test_provider_without_base_url_is_rejected(monkeypatch):
+    monkeypatch.setenv("AGNES_API_KEY", "key")
+    monkeypatch.delenv("AGNES_BASE_URL", raising=False)
+    with pytest.raises(ValueError):
+        MultiLLM().check_stream("agnes")
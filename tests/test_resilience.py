@@ -0,0 +1,53 @@
+"""
+Testy circuit breakera: anulowane wywołanie próbne nie blokuje obwodu
+"""
+import asyncio
+
+import pytest
+
+from app.resilience import CircuitBreaker, RetryPolicy
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.0, half_open_max_calls=1)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    return breaker
+
+
+def test_cancelled_probe_releases_half_open_slot():
+    breaker = _half_open_breaker()
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        task = asyncio.create_task(RetryPolicy(max_attempts=1).run(hang, breaker))
+        await asyncio.sleep(0)
+        assert not breaker.is_available()  # slot próbny zajęty
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.is_available()
+
+
+def test_unexpected_error_releases_half_open_slot():
+    breaker = _half_open_breaker()
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(RetryPolicy(max_attempts=1).run(broken, breaker))
+    assert breaker.is_available()
+
+
+def test_release_is_noop_when_closed():
+    breaker = CircuitBreaker("test")
+    breaker.before_call()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.is_available()
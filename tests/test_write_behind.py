@@ -0,0 +1,54 @@
+"""
+Testy WriteBehindQueue: nieudane partie nie są porzucane
+"""
+import asyncio
+
+from app.write_behind import WriteBehindQueue
+
+
+class _Sink:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.written = []
+
+    async def __call__(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("dysk pełny")
+        self.written.extend(batch)
+
+
+def test_transient_failure_is_retried():
+    sink = _Sink(failures=2)
+
+    async def scenario():
+        queue = WriteBehindQueue(sink, max_delay=0, max_retries=3, retry_delay=0)
+        for i in range(5):
+            await queue.put(i)
+        assert await queue.flush() == 0
+        assert await queue.close() == 0
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert sink.written == [0, 1, 2, 3, 4]
+    assert stats["retries"] == 2 and stats["unwritten"] == 0
+
+
+def test_failed_batch_is_kept_and_reported():
+    sink = _Sink(failures=100)
+
+    async def scenario():
+        queue = WriteBehindQueue(sink, max_delay=0, max_retries=1, retry_delay=0)
+        await queue.put("a")
+        assert await queue.flush() == 1
+
+        sink.failures = 0
+        await queue.put("b")
+        assert await queue.flush() == 0
+        assert sink.written == ["a", "b"]
+
+        sink.failures = 100
+        await queue.put("c")
+        assert await queue.close() == 1
+
+    asyncio.run(scenario())